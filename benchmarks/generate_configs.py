@@ -0,0 +1,169 @@
+"""
+Synthetic Config Generator
+Deterministic storeConfig.json / BattlePass files of any size, plus changed versions of them
+
+Usage:
+    python benchmarks/generate_configs.py --items 100000 --change-rate 0.01 --out bench_data
+"""
+import os
+import sys
+import json
+import random
+import argparse
+from typing import Any, Dict, List, Optional
+
+# Known item sections and their share of all items
+SECTION_WEIGHTS = {
+    "animals": 0.06,
+    "skins": 0.34,
+    "hats": 0.22,
+    "glasses": 0.1,
+    "chests": 0.04,
+    "feet": 0.14,
+    "powerups": 0.1
+}
+
+RARITIES = ["common", "rare", "epic", "legendary", "mythic"]
+CURRENCIES = ["coins", "gems", "tickets"]
+WORDS = [
+    "Shadow", "Neon", "Golden", "Frost", "Pixel", "Royal", "Candy", "Storm", "Lucky", "Turbo",
+    "Bunny", "Dragon", "Panda", "Kitty", "Ninja", "Pirate", "Robot", "Wizard", "Knight", "Comet",
+    "Füchschen", "Été", "Sakura 桜", "Звезда"
+]
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+
+
+def generate_item(rng: random.Random, item_id: int) -> Dict[str, Any]:
+    """One store item with the fields the tool reads (title, rarity, hidden) and typical extras"""
+    item = {
+        "id": item_id,
+        "title": _title(rng),
+        "rarity": rng.choice(RARITIES),
+        "price": rng.randrange(50, 5000, 50),
+        "currency": rng.choice(CURRENCIES),
+        "hidden": rng.random() < 0.1,
+        "releaseDate": f"20{rng.randint(18, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "tags": rng.sample(["event", "season", "bundle", "limited", "vip", "starter"], rng.randint(0, 3))
+    }
+    if rng.random() < 0.3:
+        item["unlock"] = {"type": rng.choice(["level", "battlepass", "achievement"]), "value": rng.randint(1, 100)}
+    if rng.random() < 0.2:
+        item["variants"] = [{"id": f"{item_id}_{index}", "color": f"#{rng.randrange(0x1000000):06x}"}
+                            for index in range(rng.randint(1, 4))]
+    return item
+
+
+def generate_store_config(items: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    A storeConfig-shaped document with `items` items spread over all known sections,
+    plus a few top-level settings that aren't item maps.
+    """
+    rng = random.Random(seed)
+    config: Dict[str, Any] = {}
+    next_id = 1000
+    remaining = items
+    names = list(SECTION_WEIGHTS)
+    for index, section in enumerate(names):
+        count = remaining if index == len(names) - 1 else min(remaining, round(items * SECTION_WEIGHTS[section]))
+        remaining -= count
+        config[section] = {}
+        for _ in range(count):
+            config[section][str(next_id)] = generate_item(rng, next_id)
+            next_id += 1
+    config["version"] = "1.0.0"
+    config["settings"] = {"maintenance": False, "shopRotationHours": 24, "featured": [str(1000 + i) for i in range(min(items, 8))]}
+    return config
+
+
+def generate_battle_pass(tiers: int = 100, seed: int = 0) -> Dict[str, Any]:
+    """A BattlePass/<n>.json-shaped document (nested lists, not an item map)"""
+    rng = random.Random(seed)
+    return {
+        "season": seed + 1,
+        "title": _title(rng),
+        "startDate": "2025-01-01",
+        "tiers": [
+            {
+                "tier": tier,
+                "xp": 1000 + tier * 150,
+                "free": {"type": rng.choice(["coins", "gems", "item"]), "amount": rng.randint(1, 500)},
+                "premium": {"type": rng.choice(["coins", "gems", "item"]), "amount": rng.randint(1, 1500)}
+            }
+            for tier in range(1, tiers + 1)
+        ]
+    }
+
+
+def mutate_config(config: Dict[str, Any], change_rate: float = 0.01, seed: int = 1) -> Dict[str, Any]:
+    """
+    A changed copy of a generated config, like the next game release.
+
+    Args:
+        config: Document from generate_store_config()
+        change_rate: Fraction of items modified; a quarter as many are added and a tenth removed
+        seed: Seed for which items change
+    """
+    rng = random.Random(seed)
+    changed = json.loads(json.dumps(config))
+    sections = [name for name in SECTION_WEIGHTS if name in changed]
+    ids: List[tuple] = [(section, item_id) for section in sections for item_id in changed[section]]
+    if not ids:
+        return changed
+
+    modified = int(len(ids) * change_rate)
+    for section, item_id in rng.sample(ids, min(modified, len(ids))):
+        item = changed[section][item_id]
+        kind = rng.random()
+        if kind < 0.5:
+            item["price"] += 50
+        elif kind < 0.7:
+            item["hidden"] = not item["hidden"]
+        elif kind < 0.85:
+            item["tags"] = item["tags"] + ["sale"]
+        else:
+            item["title"] = _title(rng)
+
+    removed = int(len(ids) * change_rate / 10)
+    for section, item_id in rng.sample(ids, min(removed, len(ids))):
+        changed[section].pop(item_id, None)
+
+    next_id = max(int(item_id) for _, item_id in ids) + 1
+    for _ in range(int(len(ids) * change_rate / 4)):
+        section = rng.choice(sections)
+        changed[section][str(next_id)] = generate_item(rng, next_id)
+        next_id += 1
+
+    changed["version"] = f"1.0.{seed}"
+    return changed
+
+
+def write_config(config: Any, path: str):
+    """Write a document the way the game files are laid out (indent=2, UTF-8)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic storeConfig/BattlePass versions")
+    parser.add_argument("--items", type=int, default=10000, help="Items in the storeConfig")
+    parser.add_argument("--change-rate", type=float, default=0.01, help="Fraction of items changed per version")
+    parser.add_argument("--versions", type=int, default=2, help="Number of consecutive versions to write")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_data", help="Output folder")
+    args = parser.parse_args(argv)
+
+    config = generate_store_config(args.items, args.seed)
+    for version in range(1, args.versions + 1):
+        if version > 1:
+            config = mutate_config(config, args.change_rate, args.seed + version)
+        write_config(config, os.path.join(args.out, f"storeConfig_v{version}.json"))
+        write_config(generate_battle_pass(seed=args.seed + version // 2), os.path.join(args.out, "BattlePass", f"{version}.json"))
+    print(f"Wrote {args.versions} versions with {args.items} items to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Benchmark Suite
+Times the config hot paths on synthetic configs, records peak memory and checks for regressions
+
+Usage:
+    python benchmarks/run_benchmarks.py                          # 1k, 10k and 100k items
+    python benchmarks/run_benchmarks.py --sizes 1000 1000000     # up to 1M items
+    python benchmarks/run_benchmarks.py --save-baseline          # record results as the baseline
+    python benchmarks/run_benchmarks.py --tolerance 0.2          # fail on >20% slowdowns
+
+Exits with status 1 when a stage is slower, or uses more memory, than the stored baseline allows.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+import json_codec
+from config_comparator import ConfigComparator
+from config_patch import describe_operation
+from generate_configs import generate_store_config, generate_battle_pass, mutate_config
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_RATES = [0.01, 0.1]
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Timing differences below this are noise, whatever the relative change
+MIN_REGRESSION_SECONDS = 0.02
+
+
+def render_changes(changes: Dict[str, Any], comparator: ConfigComparator) -> int:
+    """Everything the bot and GUI derive from a change set: summary, field lines and the patch file"""
+    lines = list(changes["summary"])
+    for section_items in changes["modified"].values():
+        for item_changes in section_items.values():
+            lines.extend(describe_operation(op, item_changes["old"]) for op in item_changes["patch"])
+    for ops in changes["other"].values():
+        lines.extend(describe_operation(op) for op in ops)
+    patch = json_codec.dumps(comparator.export_patch(changes), indent=2)
+    return len(lines) + len(patch)
+
+
+def measure(func: Callable[[], Any], repeat: int, memory: bool) -> Tuple[float, Optional[int], Any]:
+    """Best wall time of `repeat` runs, then peak traced memory of one more run (if enabled)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak, result
+
+
+def run_case(items: int, rate: float, repeat: int, memory: bool) -> Dict[str, Dict[str, Any]]:
+    """All stages for one config size and change rate"""
+    old_config = generate_store_config(items, seed=items)
+    new_config = mutate_config(old_config, rate, seed=items + 1)
+    old_config["BattlePass"] = generate_battle_pass(seed=1)
+    new_config["BattlePass"] = generate_battle_pass(seed=2)
+    old_bytes = json_codec.dumps(old_config, indent=2, exact=True)
+    new_bytes = json_codec.dumps(new_config, indent=2, exact=True)
+
+    # No caches: every run does the full work
+    comparator = ConfigComparator()
+    results = {}
+    try:
+        stages = [
+            ("parse", lambda: json_codec.loads(new_bytes)),
+            ("compare_configs", lambda: comparator.compare_configs(old_config, new_config)),
+            ("compare_streams", lambda: comparator.compare_config_streams(old_bytes, new_bytes)),
+        ]
+        changes = None
+        for name, func in stages:
+            seconds, peak, result = measure(func, repeat, memory)
+            results[name] = {"seconds": seconds, "peak_bytes": peak}
+            if name == "compare_configs":
+                changes = result
+
+        stages = [
+            ("render", lambda: render_changes(changes, comparator)),
+            ("serialize_modified", lambda: "".join(comparator.iter_modified_config(new_bytes, changes))),
+            ("dump", lambda: json_codec.dumps(new_config, indent=2)),
+        ]
+        for name, func in stages:
+            seconds, peak, _ = measure(func, repeat, memory)
+            results[name] = {"seconds": seconds, "peak_bytes": peak}
+    finally:
+        comparator.close()
+
+    for stage in results.values():
+        stage["input_bytes"] = len(new_bytes)
+    return results
+
+
+def check_regressions(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+                      tolerance: float) -> List[str]:
+    """Stages that got slower, or use more memory, than the baseline allows"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        slower = current["seconds"] - previous["seconds"]
+        if current["seconds"] > previous["seconds"] * (1 + tolerance) and slower > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{key}: {previous['seconds']:.3f}s -> {current['seconds']:.3f}s")
+        if current.get("peak_bytes") and previous.get("peak_bytes") and \
+                current["peak_bytes"] > previous["peak_bytes"] * (1 + tolerance):
+            regressions.append(f"{key}: peak memory {previous['peak_bytes'] / 1e6:.1f} MB -> {current['peak_bytes'] / 1e6:.1f} MB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark config parsing, comparison, rendering and serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Item counts to benchmark")
+    parser.add_argument("--rates", type=float, nargs="+", default=DEFAULT_RATES, help="Change rates to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage (the best is kept)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory runs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get("results", {})
+
+    print(f"JSON backend: {json_codec.BACKEND}, Python {platform.python_version()}")
+    print(f"{'case':<34}{'seconds':>10}{'peak MB':>10}{'baseline':>10}")
+    results = {}
+    for items in args.sizes:
+        # Large configs are too slow to time repeatedly
+        repeat = args.repeat if items <= 100000 else 1
+        for rate in args.rates:
+            for stage, values in run_case(items, rate, repeat, not args.no_memory).items():
+                key = f"{items}/{rate}/{stage}"
+                results[key] = values
+                previous = baseline.get(key, {}).get("seconds")
+                peak = f"{values['peak_bytes'] / 1e6:.1f}" if values["peak_bytes"] is not None else "-"
+                previous = f"{previous:.3f}" if previous is not None else "-"
+                print(f"{key:<34}{values['seconds']:>10.3f}{peak:>10}{previous:>10}")
+
+    report = {
+        "backend": json_codec.BACKEND,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("No baseline to compare against (run with --save-baseline first)")
+        return 0
+    regressions = check_regressions(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Attachment Ingest Module
+Size budgets and streamed, validated downloads of uploaded config files
+"""
+import json
+import queue
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from config_stream import ConfigEventReader, ConfigShapeError, ITEM, START_SECTION, VALUE
+
+logger = logging.getLogger('funrun_monitor')
+
+DEFAULT_MAX_FILE_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 160 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is refused: over budget, not JSON, or not shaped like a config"""
+
+
+class ChunkFeed:
+    def __init__(self):
+        """
+        Blocking binary stream over chunks pushed from the event loop,
+        so a ConfigEventReader in a worker thread can parse a download as it arrives.
+        """
+        self.chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.pending = memoryview(b'')
+        self.finished = False
+
+    def feed(self, chunk: bytes):
+        if chunk:
+            self.chunks.put(chunk)
+
+    def finish(self):
+        """No more chunks: reads return b'' once the queued ones are consumed"""
+        self.chunks.put(None)
+
+    def read(self, size: int = -1) -> bytes:
+        while not self.pending:
+            if self.finished:
+                return b''
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.finished = True
+                return b''
+            self.pending = memoryview(chunk)
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return bytes(data)
+
+
+def validate_config_stream(stream) -> Dict[str, int]:
+    """
+    Parse a config from a stream without keeping it, raising as soon as it turns out
+    not to be JSON (json.JSONDecodeError, UnicodeDecodeError). Objects are read item by
+    item; whole-document configs such as BattlePass lists are accepted as top-level
+    arrays and decoded at the end. Any other top-level value raises ConfigShapeError.
+    Returns: {'sections': n, 'items': n} (both 0 for an array)
+    """
+    reader = ConfigEventReader(stream)
+    sections = items = 0
+    try:
+        for kind, _, _, _ in reader.events():
+            if kind == ITEM:
+                items += 1
+            elif kind in (START_SECTION, VALUE):
+                sections += 1
+    except ConfigShapeError:
+        if not isinstance(reader.document(), list):
+            raise ConfigShapeError("Config must be a JSON object or array at the top level") from None
+    return {'sections': sections, 'items': items}
+
+
+class AttachmentIngest:
+    def __init__(self, max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+                 chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        """
+        Downloads Discord attachments in chunks, checked against size budgets before the
+        first byte is fetched and parsed while they arrive, so a bad upload is rejected
+        as soon as it's known to be bad.
+
+        Args:
+            max_file_bytes: Largest accepted single file
+            max_total_bytes: Largest accepted total of all files of one command
+            chunk_size: Bytes read from the download at a time
+        """
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.chunk_size = chunk_size
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'AttachmentIngest':
+        """Budgets from the bot config (max_upload_mb, max_upload_total_mb)"""
+        return cls(
+            max_file_bytes=int(float(config.get('max_upload_mb', DEFAULT_MAX_FILE_BYTES / 1024 / 1024)) * 1024 * 1024),
+            max_total_bytes=int(float(config.get('max_upload_total_mb', DEFAULT_MAX_TOTAL_BYTES / 1024 / 1024)) * 1024 * 1024)
+        )
+
+    async def open(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_read=60))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def check_sizes(self, attachments: Sequence[Any]):
+        """Refuse attachments over the budgets, using the sizes Discord reports"""
+        for attachment in attachments:
+            if attachment.size > self.max_file_bytes:
+                raise UploadRejected(
+                    f"`{attachment.filename}` is {attachment.size / 1024 / 1024:.1f} MB "
+                    f"(the limit is {self.max_file_bytes / 1024 / 1024:.0f} MB per file)"
+                )
+        total = sum(attachment.size for attachment in attachments)
+        if total > self.max_total_bytes:
+            raise UploadRejected(
+                f"The files add up to {total / 1024 / 1024:.1f} MB "
+                f"(the limit is {self.max_total_bytes / 1024 / 1024:.0f} MB per command)"
+            )
+
+    async def read(self, attachment: Any) -> bytes:
+        """
+        Download one attachment while validating it in a worker thread.
+        Raises UploadRejected (and stops downloading) on invalid JSON, a document that
+        is neither an object nor an array, or more bytes than the file budget.
+        """
+        loop = asyncio.get_running_loop()
+        stream = ChunkFeed()
+        validation = loop.run_in_executor(None, validate_config_stream, stream)
+        chunks: List[bytes] = []
+        received = 0
+        try:
+            session = await self.open()
+            async with session.get(attachment.url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    received += len(chunk)
+                    if received > self.max_file_bytes:
+                        raise UploadRejected(
+                            f"`{attachment.filename}` is larger than {self.max_file_bytes / 1024 / 1024:.0f} MB"
+                        )
+                    chunks.append(chunk)
+                    stream.feed(chunk)
+                    if validation.done():
+                        # The parser stopped before the end of the download: the file is invalid
+                        break
+        except BaseException:
+            stream.finish()
+            # The parse result no longer matters, but must still be collected
+            validation.add_done_callback(lambda future: future.cancelled() or future.exception())
+            raise
+        stream.finish()
+
+        try:
+            summary = await validation
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            # Positions in decode errors are relative to the parser's buffer, so only the reason is shown
+            reason = e.msg if isinstance(e, json.JSONDecodeError) else e.reason
+            logger.info(f"Rejected {attachment.filename} after {received} bytes: {reason}")
+            raise UploadRejected(f"`{attachment.filename}` is not valid JSON ({reason})") from None
+        except ConfigShapeError as e:
+            logger.info(f"Rejected {attachment.filename} after {received} bytes: {str(e)}")
+            raise UploadRejected(f"`{attachment.filename}`: {str(e)}") from None
+        logger.debug(f"Downloaded {attachment.filename}: {received} bytes, {summary['sections']} sections, {summary['items']} items")
+        return b"".join(chunks)
+
+    async def read_all(self, attachments: Sequence[Any]) -> List[bytes]:
+        """Check the budgets for all attachments, then download them one by one"""
+        self.check_sizes(attachments)
+        return [await self.read(attachment) for attachment in attachments]
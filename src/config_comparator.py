@@ -3,109 +3,557 @@ Config Comparator Module
 Handles comparison and modification of storeConfig.json files
 """
 import json
-from typing import Dict, Any
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Any, Iterable, Iterator, List, Optional, Tuple
 import logging
+from config_stream import ConfigSource, ConfigShapeError, stream_diff, iter_events, iter_dump_config, load_source
+from config_fingerprint import ConfigFingerprint, FingerprintCache, content_hash
+from config_patch import diff, escape_pointer_token
+from diff_cache import DiffCache, diff_key
+import json_codec
 
 logger = logging.getLogger('funrun_monitor')
 
-class ConfigComparator:
-    def __init__(self):
-        self.sections_to_compare = ["animals", "skins", "hats", "glasses", "chests", "feet", "powerups"]
+
+def is_item_map(value: Any) -> bool:
+    """True for an object whose entries are all objects, i.e. a map of item id -> item"""
+    return isinstance(value, dict) and all(isinstance(item, dict) for item in value.values())
+
+
+def diff_item_section(old_section: Dict, new_section: Dict, old_hashes: Dict[str, str],
+                      new_hashes: Dict[str, str]) -> Tuple[Dict, Dict, Dict]:
+    """
+    Diff one item-map section. Module-level so it can run in a worker process.
+    Returns: (added_items, removed_items, modified_items)
+    """
+    # Find added items
+    added_items = {}
+    for item_id, item_data in new_section.items():
+        if item_id not in old_section:
+            added_items[item_id] = item_data
+    
+    # Find removed items
+    removed_items = {}
+    for item_id, item_data in old_section.items():
+        if item_id not in new_section:
+            removed_items[item_id] = item_data
     
-    def compare_configs(self, old_config: Dict, new_config: Dict) -> Dict[str, Any]:
+    # Find modified items
+    modified_items = {}
+    for item_id in old_section:
+        if item_id in new_section:
+            old_hash = old_hashes.get(item_id)
+            if old_hash is not None and old_hash == new_hashes.get(item_id):
+                continue
+            if old_section[item_id] != new_section[item_id]:
+                modified_items[item_id] = {
+                    "old": old_section[item_id],
+                    "new": new_section[item_id],
+                    "patch": diff(old_section[item_id], new_section[item_id])
+                }
+    
+    return added_items, removed_items, modified_items
+
+
+class ConfigComparator:
+    def __init__(self, owned_flag: str = "preOwned", fingerprint_cache: Optional[FingerprintCache] = None,
+                 discover_sections: bool = True, parallel_threshold: int = 200000, max_workers: Optional[int] = None,
+                 diff_cache: Optional[DiffCache] = None):
         """
-        Compare two storeConfig.json files and return detailed changes.
+        Args:
+            owned_flag: Item field set to true on new items by create_modified_config
+            fingerprint_cache: Where compare_config_streams keeps per-file fingerprints (no caching if None)
+            diff_cache: Where results are kept by the content hashes of both files (no caching if None)
+            discover_sections: Diff every top-level key instead of only the known item sections
+            parallel_threshold: Item count above which compare_configs diffs sections in worker processes
+            max_workers: Size of that process pool (defaults to the CPU count)
         """
-        changes = {
+        # Known item sections, always listed first in results
+        self.sections_to_compare = ["animals", "skins", "hats", "glasses", "chests", "feet", "powerups"]
+        self.owned_flag = owned_flag
+        self.fingerprint_cache = fingerprint_cache
+        self.diff_cache = diff_cache
+        self.discover = discover_sections
+        self.parallel_threshold = parallel_threshold
+        self.max_workers = max_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+    
+    def close(self):
+        """Shut down the worker processes, if any were started"""
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+    
+    def pool(self) -> ProcessPoolExecutor:
+        """The shared worker pool, started on first use"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+    
+    def cache_key(self, old_digest: str, new_digest: str) -> str:
+        """Diff cache key for two file contents under this comparator's section options"""
+        return diff_key(old_digest, new_digest, {
+            "discover": self.discover,
+            "sections": self.sections_to_compare
+        })
+    
+    def cached_changes(self, old_digest: str, new_digest: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """The cached change set for two file contents, computing and storing it on a miss"""
+        if not self.diff_cache:
+            return compute()
+        key = self.cache_key(old_digest, new_digest)
+        changes = self.diff_cache.get(key)
+        if changes is None:
+            changes = compute()
+            self.diff_cache.put(key, changes)
+        else:
+            logger.info(f"Using cached diff {key[:10]}")
+        return changes
+    
+    def cached_artifact(self, old_digest: str, new_digest: str, name: str, build: Callable[[], bytes]) -> bytes:
+        """A file generated from the comparison of two file contents, reused when cached"""
+        if not self.diff_cache:
+            return build()
+        return self.diff_cache.artifact(self.cache_key(old_digest, new_digest), name, build)
+    
+    def order_sections(self, names) -> List[str]:
+        """Known sections in their usual order, then any others alphabetically"""
+        names = set(names)
+        return [name for name in self.sections_to_compare if name in names] + \
+            sorted(name for name in names if name not in self.sections_to_compare)
+    
+    def discover_sections(self, config: Dict) -> List[str]:
+        """Every item-map section of a loaded config, known ones first"""
+        if not self.discover:
+            return [name for name in self.sections_to_compare if name in config]
+        return self.order_sections(name for name, value in config.items() if is_item_map(value))
+    
+    def fingerprint(self, config: Dict) -> ConfigFingerprint:
+        """Item and section hashes of a loaded config, for reuse across compare_configs calls"""
+        return ConfigFingerprint.from_config(config)
+    
+    @staticmethod
+    def _empty_changes() -> Dict[str, Any]:
+        return {
             "added": {},
             "removed": {},
             "modified": {},
+            "other": {},
+            "item_sections": [],
+            "new_sections": [],
+            "dropped_sections": [],
             "summary": []
         }
+    
+    def _finish(self, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Put every part of a change set in section order and write its summary"""
+        for change_type in ("added", "removed", "modified", "other"):
+            changes[change_type] = {
+                section: changes[change_type][section]
+                for section in self.order_sections(changes[change_type])
+            }
+        for key in ("item_sections", "new_sections", "dropped_sections"):
+            changes[key] = self.order_sections(changes[key])
         
-        for section in self.sections_to_compare:
-            old_section = old_config.get(section, {})
-            new_section = new_config.get(section, {})
-            
-            # Find added items
-            added_items = {}
-            for item_id, item_data in new_section.items():
-                if item_id not in old_section:
-                    added_items[item_id] = item_data
+        changes["summary"] = []
+        for section in self.order_sections(list(changes["item_sections"]) + list(changes["other"])):
+            if section in changes["new_sections"]:
+                changes["summary"].append(f"New section {section}")
+            if section in changes["dropped_sections"]:
+                changes["summary"].append(f"Dropped section {section}")
+            for change_type, verb in (("added", "Added"), ("removed", "Removed"), ("modified", "Modified")):
+                if section in changes[change_type]:
+                    changes["summary"].append(f"{verb} {len(changes[change_type][section])} {section}")
+            if section in changes["other"]:
+                changes["summary"].append(f"Changed {section or 'document'} ({len(changes['other'][section])} changes)")
+        return changes
+    
+    def _run_section_jobs(self, jobs: List[Tuple[str, Dict, Dict, Dict, Dict]]) -> List[Tuple[Dict, Dict, Dict]]:
+        """Diff item sections, in worker processes once the input is large enough to pay for it"""
+        size = sum(len(job[1]) + len(job[2]) for job in jobs)
+        if len(jobs) < 2 or size < self.parallel_threshold:
+            return [diff_item_section(*job[1:]) for job in jobs]
+        
+        logger.info(f"Diffing {len(jobs)} sections ({size} items) in parallel")
+        futures = [self.pool().submit(diff_item_section, *job[1:]) for job in jobs]
+        return [future.result() for future in futures]
+    
+    def compare_configs(self, old_config: Dict, new_config: Dict,
+                        old_fingerprint: Optional[ConfigFingerprint] = None,
+                        new_fingerprint: Optional[ConfigFingerprint] = None) -> Dict[str, Any]:
+        """
+        Compare two storeConfig.json files and return detailed changes.
+        Item-map sections report added/removed/modified items; any other top-level
+        value gets a field-level patch under changes["other"].
+        When fingerprints of both configs are given, identical sections are skipped and
+        only items whose hashes differ are deep-compared.
+        """
+        changes = self._empty_changes()
+        
+        if not isinstance(old_config, dict) or not isinstance(new_config, dict):
+            # Not shaped like a storeConfig (e.g. a top-level list): diff the whole document
+            ops = diff(old_config, new_config)
+            if ops:
+                changes["other"][""] = ops
+            return self._finish(changes)
+        
+        use_fingerprints = old_fingerprint is not None and new_fingerprint is not None
+        if self.discover:
+            names = self.order_sections(set(old_config) | set(new_config))
+        else:
+            names = self.sections_to_compare
+        
+        jobs = []
+        for section in names:
+            in_old, in_new = section in old_config, section in new_config
+            old_value, new_value = old_config.get(section, {}), new_config.get(section, {})
+            item_section = (not in_old or is_item_map(old_value)) and (not in_new or is_item_map(new_value))
+            if item_section:
+                changes["item_sections"].append(section)
             
-            # Find removed items
-            removed_items = {}
-            for item_id, item_data in old_section.items():
-                if item_id not in new_section:
-                    removed_items[item_id] = item_data
+            if use_fingerprints and old_fingerprint.section_unchanged(new_fingerprint, section):
+                continue
+            if in_new and not in_old:
+                changes["new_sections"].append(section)
+            elif in_old and not in_new:
+                changes["dropped_sections"].append(section)
             
-            # Find modified items
-            modified_items = {}
-            for item_id in old_section:
-                if item_id in new_section:
-                    if old_section[item_id] != new_section[item_id]:
-                        modified_items[item_id] = {
-                            "old": old_section[item_id],
-                            "new": new_section[item_id]
-                        }
+            if item_section:
+                jobs.append((
+                    section, old_value, new_value,
+                    old_fingerprint.items.get(section, {}) if use_fingerprints else {},
+                    new_fingerprint.items.get(section, {}) if use_fingerprints else {}
+                ))
+                continue
             
+            # Generic recursive fallback for everything that isn't an item map
+            path = "/" + escape_pointer_token(section)
+            if not in_old:
+                ops = [{"op": "add", "path": path, "value": new_value}]
+            elif not in_new:
+                ops = [{"op": "remove", "path": path}]
+            else:
+                ops = diff(old_value, new_value, path)
+            if ops:
+                changes["other"][section] = ops
+        
+        for (section, *_), (added_items, removed_items, modified_items) in zip(jobs, self._run_section_jobs(jobs)):
             if added_items:
                 changes["added"][section] = added_items
-                changes["summary"].append(f"Added {len(added_items)} {section}")
-            
             if removed_items:
                 changes["removed"][section] = removed_items
-                changes["summary"].append(f"Removed {len(removed_items)} {section}")
-            
             if modified_items:
                 changes["modified"][section] = modified_items
-                changes["summary"].append(f"Modified {len(modified_items)} {section}")
         
-        return changes
+        return self._finish(changes)
+    
+    def compare_config_streams(self, old_source: ConfigSource, new_source: ConfigSource,
+                               old_digest: Optional[str] = None, new_digest: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Same result as compare_configs, but reads both configs incrementally from
+        paths, bytes or binary streams, so only changed items are ever held in memory.
+        Fingerprints computed along the way are cached by file content, so a config seen
+        before (e.g. last release's new file) is not hashed again, and with a diff cache
+        a pair compared before is not diffed again.
+        Documents that aren't a top-level object are loaded whole and diffed generically.
+        
+        Args:
+            old_digest, new_digest: content_hash() of each source, if the caller already has it
+        """
+        for event in self.iter_changes(old_source, new_source, old_digest, new_digest, progress_every=0):
+            if event["event"] == "done":
+                return event["changes"]
+    
+    @staticmethod
+    def count_changes(changes: Dict[str, Any]) -> Dict[str, int]:
+        """Totals of a change set: added/removed/modified items and changed other sections"""
+        return {
+            "added": sum(len(items) for items in changes["added"].values()),
+            "removed": sum(len(items) for items in changes["removed"].values()),
+            "modified": sum(len(items) for items in changes["modified"].values()),
+            "other": len(changes["other"])
+        }
+    
+    def iter_changes(self, old_source: ConfigSource, new_source: ConfigSource,
+                     old_digest: Optional[str] = None, new_digest: Optional[str] = None,
+                     progress_every: int = 5000) -> Iterator[Dict[str, Any]]:
+        """
+        compare_config_streams as it happens: changes are yielded as soon as they're found,
+        so results can be shown long before huge files are fully processed.
+        
+        Yields:
+            {'event': 'progress', 'pass': 1-3, 'entries': n, 'counts': {...}}
+                every progress_every entries read (pass 1 hashes the old file, pass 2 reads
+                the new one, pass 3 re-reads the old one for removals and modifications)
+            {'event': 'change', 'type': 'added'|'removed'|'modified', 'section', 'id',
+             'item' (or 'old', 'new' and 'patch'), 'counts': {...}}
+            {'event': 'done', 'changes': the change set, 'counts': count_changes() of it}
+            
+            counts are running totals {'added', 'removed', 'modified'} of the changes so far.
+            Changes in sections that aren't item maps are counted as they're found, but end up
+            as patch operations under 'other' in the final change set.
+        """
+        digests = {}
+        if self.fingerprint_cache or self.diff_cache:
+            digests = {
+                "old": old_digest or content_hash(old_source),
+                "new": new_digest or content_hash(new_source)
+            }
+        if self.diff_cache:
+            changes = self.diff_cache.get(self.cache_key(digests["old"], digests["new"]))
+            if changes is not None:
+                logger.info("Using cached diff")
+                yield {"event": "done", "changes": changes, "counts": self.count_changes(changes)}
+                return
+        
+        fingerprints = {"old": None, "new": None}
+        if self.fingerprint_cache:
+            fingerprints = {role: self.fingerprint_cache.get(digest) for role, digest in digests.items()}
+        
+        def keep_fingerprint(role: str, fingerprint: ConfigFingerprint):
+            fingerprints[role] = fingerprint
+            if self.fingerprint_cache:
+                self.fingerprint_cache.put(digests[role], fingerprint)
+        
+        records = []
+        counts = {"added": 0, "removed": 0, "modified": 0}
+        try:
+            for record in stream_diff(old_source, new_source, None if self.discover else self.sections_to_compare,
+                                      old_fingerprint=fingerprints["old"], new_fingerprint=fingerprints["new"],
+                                      on_fingerprint=keep_fingerprint, progress_every=progress_every):
+                if record["type"] == "progress":
+                    yield {"event": "progress", "pass": record["pass"], "entries": record["entries"], "counts": dict(counts)}
+                    continue
+                if record["type"] == "modified":
+                    record["patch"] = diff(record["old"], record["new"])
+                records.append(record)
+                counts[record["type"]] += 1
+                yield dict(record, event="change", counts=dict(counts))
+        except ConfigShapeError:
+            changes = self.compare_configs(load_source(old_source), load_source(new_source))
+        else:
+            # Both fingerprints are known by now: cached, or computed during the diff
+            changes = self.build_changes(records, fingerprints["old"], fingerprints["new"])
+        
+        if self.diff_cache:
+            self.diff_cache.put(self.cache_key(digests["old"], digests["new"]), changes)
+        yield {"event": "done", "changes": changes, "counts": self.count_changes(changes)}
+    
+    async def aiter_changes(self, old_source: ConfigSource, new_source: ConfigSource,
+                            old_digest: Optional[str] = None, new_digest: Optional[str] = None,
+                            progress_every: int = 5000) -> AsyncIterator[Dict[str, Any]]:
+        """iter_changes() run in a worker thread, so the event loop stays responsive while diffing"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        finished = object()
+        
+        def produce():
+            try:
+                for event in self.iter_changes(old_source, new_source, old_digest, new_digest, progress_every):
+                    if stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            else:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+        
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                event = await queue.get()
+                if event is finished:
+                    break
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+        finally:
+            # Stop the worker if the caller gave up early (it notices at its next event)
+            stopped.set()
+        await producer
+    
+    def build_changes(self, records: Iterable[Dict[str, Any]], old_fingerprint: ConfigFingerprint,
+                      new_fingerprint: ConfigFingerprint) -> Dict[str, Any]:
+        """
+        Assemble a compare_configs-style change set from stream_diff records and the
+        fingerprints of both configs (used to tell item sections from everything else).
+        """
+        changes = self._empty_changes()
+        by_section: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            by_section.setdefault(record["section"], []).append(record)
+        
+        if self.discover:
+            names = old_fingerprint.names() | new_fingerprint.names()
+        else:
+            names = set(self.sections_to_compare)
+        for section in names:
+            in_old, in_new = section in old_fingerprint.names(), section in new_fingerprint.names()
+            item_section = (not in_old or old_fingerprint.is_item_section(section)) and \
+                (not in_new or new_fingerprint.is_item_section(section))
+            if item_section:
+                changes["item_sections"].append(section)
+            
+            if in_new and not in_old:
+                changes["new_sections"].append(section)
+            elif in_old and not in_new:
+                changes["dropped_sections"].append(section)
+            section_records = by_section.get(section)
+            if not section_records:
+                continue
+            
+            if item_section:
+                for record in section_records:
+                    if record["type"] == "modified":
+                        changes["modified"].setdefault(section, {})[record["id"]] = {
+                            "old": record["old"],
+                            "new": record["new"],
+                            "patch": record["patch"] if "patch" in record else diff(record["old"], record["new"])
+                        }
+                    else:
+                        changes[record["type"]].setdefault(section, {})[record["id"]] = record["item"]
+            else:
+                ops = self._section_patch(section, section_records, in_old, in_new,
+                                          section in old_fingerprint.values, section in new_fingerprint.values)
+                if ops:
+                    changes["other"][section] = ops
+        
+        return self._finish(changes)
+    
+    @staticmethod
+    def _section_patch(section: str, records: List[Dict[str, Any]], in_old: bool, in_new: bool,
+                       old_is_value: bool, new_is_value: bool) -> List[Dict[str, Any]]:
+        """Rebuild the generic patch of one non-item section from its stream_diff records"""
+        path = "/" + escape_pointer_token(section)
+        
+        def new_value() -> Any:
+            if new_is_value:
+                return next(record["item"] for record in records if record["type"] == "added" and record["id"] is None)
+            return {record["id"]: record["item"] for record in records if record["type"] == "added"}
+        
+        if not in_old:
+            return [{"op": "add", "path": path, "value": new_value()}]
+        if not in_new:
+            return [{"op": "remove", "path": path}]
+        if old_is_value != new_is_value:
+            return [{"op": "replace", "path": path, "value": new_value()}]
+        if old_is_value:
+            return diff(records[0]["old"], records[0]["new"], path)
+        
+        # Object sections: removals and modifications in old order, then additions (like diff())
+        ops = []
+        for record in records:
+            entry_path = f"{path}/{escape_pointer_token(record['id'])}"
+            if record["type"] == "removed":
+                ops.append({"op": "remove", "path": entry_path})
+            elif record["type"] == "modified":
+                ops.extend(diff(record["old"], record["new"], entry_path))
+        for record in records:
+            if record["type"] == "added":
+                ops.append({"op": "add", "path": f"{path}/{escape_pointer_token(record['id'])}", "value": record["item"]})
+        return ops
+    
+    def export_patch(self, changes: Dict) -> list:
+        """
+        The whole change set as one RFC 6902 patch that turns the old config into the new one.
+        Modified items contribute their field-level operations instead of full copies.
+        """
+        ops = []
+        for section in self.order_sections(list(changes["item_sections"]) + list(changes["other"])):
+            if section in changes["other"]:
+                ops.extend(changes["other"][section])
+                continue
+            section_path = "/" + escape_pointer_token(section)
+            if section in changes["new_sections"]:
+                ops.append({"op": "add", "path": section_path, "value": {}})
+            for item_id in changes["removed"].get(section, {}):
+                ops.append({"op": "remove", "path": f"{section_path}/{escape_pointer_token(item_id)}"})
+            for item_id, item_changes in changes["modified"].get(section, {}).items():
+                item_path = f"{section_path}/{escape_pointer_token(item_id)}"
+                for op in item_changes["patch"]:
+                    ops.append(dict(op, path=item_path + op["path"]))
+            for item_id, item_data in changes["added"].get(section, {}).items():
+                ops.append({"op": "add", "path": f"{section_path}/{escape_pointer_token(item_id)}", "value": item_data})
+            if section in changes["dropped_sections"]:
+                ops.append({"op": "remove", "path": section_path})
+        return ops
     
     def create_modified_config(self, new_config: Dict, changes: Dict) -> Dict:
         """
         Create a modified version of the new config with preOwned: true added to new items.
         Also changes any "hidden": true to "hidden": false in the entire config.
         """
-        modified_config = json.loads(json.dumps(new_config))  # Deep copy
+        modified_config = json_codec.loads(json_codec.dumps(new_config, exact=True))  # Deep copy
         
         # Add preOwned: true to all added items
         for section, items in changes["added"].items():
             if section in modified_config:
                 for item_id in items:
                     if item_id in modified_config[section]:
-                        modified_config[section][item_id]["preOwned"] = True
+                        modified_config[section][item_id][self.owned_flag] = True
         
         # Change all "hidden": true to "hidden": false throughout the entire config
-        for section in self.sections_to_compare:
-            if section in modified_config:
+        for section in changes.get("item_sections", self.sections_to_compare):
+            if isinstance(modified_config.get(section), dict):
                 for item_id, item_data in modified_config[section].items():
                     if isinstance(item_data, dict) and item_data.get("hidden") is True:
                         modified_config[section][item_id]["hidden"] = False
         
         return modified_config
     
-    def modify_config_by_ids(self, config: Dict, item_ids: list) -> tuple:
+    def iter_modified_config(self, new_source: ConfigSource, changes: Dict) -> Iterator[str]:
         """
-        Apply preOwned: true to specific item IDs in config.
-        Returns: (modified_config, modified_items, not_found_items)
+        Streaming version of create_modified_config: yields the modified config as text
+        (identical to json.dumps(..., indent=2, ensure_ascii=False)) while reading the
+        new config incrementally.
         """
-        modified_config = json.loads(json.dumps(config))  # Deep copy
-        modified_items = []
+        sections = set(changes.get("item_sections", self.sections_to_compare))
+        
+        def transform(section: str, item_id: str, item_data: Any) -> Any:
+            if section not in sections or not isinstance(item_data, dict):
+                return item_data
+            if item_id in changes["added"].get(section, {}):
+                item_data[self.owned_flag] = True
+            if item_data.get("hidden") is True:
+                item_data["hidden"] = False
+            return item_data
+        
+        return iter_dump_config(iter_events(new_source), transform)
+    
+    def flag_items(self, config: Any, item_ids: list) -> Tuple[List[Tuple[str, str, str]], List[str]]:
+        """
+        Set the owned flag on specific item IDs of a loaded config, in place.
+        Each id is looked up in every item section, known ones first.
+        Returns: ([(item_id, title, section)] flagged, item ids not found)
+        """
+        flagged_items = []
         not_found_items = []
         
+        sections = self.discover_sections(config) if isinstance(config, dict) else []
         for item_id in item_ids:
             found = False
-            for section in self.sections_to_compare:
-                if section in modified_config and item_id in modified_config[section]:
-                    modified_config[section][item_id]["preOwned"] = True
-                    item_title = modified_config[section][item_id].get('title', 'Unknown')
-                    modified_items.append(f"{item_id}: {item_title} ({section})")
+            for section in sections:
+                if item_id in config[section]:
+                    config[section][item_id][self.owned_flag] = True
+                    item_title = str(config[section][item_id].get('title', 'Unknown'))
+                    flagged_items.append((item_id, item_title, section))
                     found = True
                     break
             
             if not found:
                 not_found_items.append(item_id)
         
+        return flagged_items, not_found_items
+    
+    def modify_config_by_ids(self, config: Dict, item_ids: list) -> tuple:
+        """
+        Apply preOwned: true to specific item IDs in config.
+        Returns: (modified_config, modified_items, not_found_items)
+        """
+        modified_config = json_codec.loads(json_codec.dumps(config, exact=True))  # Deep copy
+        flagged_items, not_found_items = self.flag_items(modified_config, item_ids)
+        modified_items = [f"{item_id}: {item_title} ({section})" for item_id, item_title, section in flagged_items]
         return modified_config, modified_items, not_found_items
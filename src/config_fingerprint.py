@@ -0,0 +1,195 @@
+"""
+Config Fingerprint Module
+Per-item content hashes and Merkle-style section hashes for skipping unchanged config data
+"""
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger('funrun_monitor')
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Bumped whenever the cached fingerprint layout changes; older entries are ignored
+FINGERPRINT_VERSION = 2
+
+
+def item_hash(value: Any) -> str:
+    """Canonical content hash of a JSON value (key order and whitespace don't matter)"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def section_hash(item_hashes: Dict[str, str]) -> str:
+    """Merkle-style hash of a section: combines its item ids and item hashes in id order"""
+    digest = hashlib.blake2b(digest_size=16)
+    for item_id in sorted(item_hashes):
+        digest.update(item_id.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(item_hashes[item_id].encode('ascii'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+def content_hash(source: Any) -> str:
+    """SHA-256 of a config's raw bytes (path, bytes, seekable binary stream or callable opening one)"""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+        return digest.hexdigest()
+
+    owned = isinstance(source, str) or callable(source)
+    if isinstance(source, str):
+        stream = open(source, 'rb')
+    elif callable(source):
+        stream = source()
+    else:
+        stream = source
+        stream.seek(0)
+    try:
+        for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    finally:
+        if owned:
+            stream.close()
+    return digest.hexdigest()
+
+
+class ConfigFingerprint:
+    def __init__(self, items: Optional[Dict[str, Dict[str, str]]] = None):
+        """
+        Hashes of every item, grouped by section.
+
+        Args:
+            items: {section: {item_id: item_hash}}
+        """
+        self.items: Dict[str, Dict[str, str]] = items or {}
+        self.sections: Dict[str, str] = {name: section_hash(hashes) for name, hashes in self.items.items()}
+        # Top-level values that aren't objects: {name: value_hash}
+        self.values: Dict[str, str] = {}
+        # Object sections with at least one entry that isn't an object (so not an item map)
+        self.mixed_sections: Set[str] = set()
+
+    @classmethod
+    def from_config(cls, config: Dict, sections: Optional[Iterable[str]] = None) -> 'ConfigFingerprint':
+        """Fingerprint an already loaded config"""
+        fingerprint = cls()
+        for name in (sections if sections is not None else config):
+            if name not in config:
+                continue
+            value = config[name]
+            if isinstance(value, dict):
+                fingerprint.add_section(name)
+                for item_id, item in value.items():
+                    fingerprint.add_item(name, item_id, item_hash(item), isinstance(item, dict))
+            else:
+                fingerprint.add_value(name, item_hash(value))
+        return fingerprint.finish()
+
+    def add_section(self, section: str):
+        """Record an object section, even if it turns out to be empty"""
+        self.items.setdefault(section, {})
+
+    def add_item(self, section: str, item_id: str, hashed: str, is_object: bool = True):
+        """Record one item hash (call finish() once all items are added)"""
+        self.items.setdefault(section, {})[item_id] = hashed
+        if not is_object:
+            self.mixed_sections.add(section)
+
+    def add_value(self, name: str, hashed: str):
+        """Record a top-level value that isn't an object"""
+        self.values[name] = hashed
+
+    def finish(self) -> 'ConfigFingerprint':
+        """Recompute section hashes after add_item() calls"""
+        self.sections = {name: section_hash(hashes) for name, hashes in self.items.items()}
+        return self
+
+    def names(self) -> Set[str]:
+        """Every top-level key, objects and plain values alike"""
+        return set(self.items) | set(self.values)
+
+    def is_item_section(self, section: str) -> bool:
+        """True if the section is an object whose entries are all objects (an item map)"""
+        return section in self.items and section not in self.mixed_sections
+
+    def section_unchanged(self, other: 'ConfigFingerprint', section: str) -> bool:
+        """True if the top-level key is present in both fingerprints with identical contents"""
+        mine = self.sections.get(section, self.values.get(section))
+        return mine is not None and mine == other.sections.get(section, other.values.get(section))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': FINGERPRINT_VERSION,
+            'sections': self.sections,
+            'items': self.items,
+            'values': self.values,
+            'mixed_sections': sorted(self.mixed_sections)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ConfigFingerprint':
+        fingerprint = cls()
+        fingerprint.items = data.get('items', {})
+        fingerprint.sections = data.get('sections') or {
+            name: section_hash(hashes) for name, hashes in fingerprint.items.items()
+        }
+        fingerprint.values = data.get('values', {})
+        fingerprint.mixed_sections = set(data.get('mixed_sections', []))
+        return fingerprint
+
+
+class FingerprintCache:
+    def __init__(self, cache_dir: str = os.path.join("snapshots", "fingerprints"), max_entries: int = 64):
+        """
+        On-disk cache of fingerprints keyed by the SHA-256 of the config file's bytes.
+
+        Args:
+            cache_dir: Directory holding one JSON file per fingerprinted config
+            max_entries: Oldest fingerprints are removed beyond this many
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, digest: str) -> Optional[ConfigFingerprint]:
+        try:
+            with open(self._path(digest), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != FINGERPRINT_VERSION:
+                return None
+            return ConfigFingerprint.from_dict(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable fingerprint cache entry {digest}: {str(e)}")
+            return None
+
+    def put(self, digest: str, fingerprint: ConfigFingerprint):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(digest)}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(fingerprint.to_dict(), f, separators=(',', ':'))
+            os.replace(tmp_path, self._path(digest))
+            self.evict()
+        except Exception as e:
+            logger.error(f"Error caching fingerprint {digest}: {str(e)}")
+
+    def evict(self):
+        """Keep only the most recently written max_entries fingerprints"""
+        entries = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith('.json')
+        ]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
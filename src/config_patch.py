@@ -0,0 +1,175 @@
+"""
+Config Patch Module
+Field-level structural diff of config items as RFC 6902 (JSON Patch) operations
+"""
+import json
+import difflib
+from typing import Any, Dict, List, Optional, Sequence
+
+from config_fingerprint import item_hash
+
+# Element fields tried, in order, to match array entries by identity instead of position
+ARRAY_ID_KEYS = ("id", "key", "name", "type")
+
+
+def escape_pointer_token(token: Any) -> str:
+    """Escape one JSON Pointer reference token (RFC 6901)"""
+    return str(token).replace('~', '~0').replace('/', '~1')
+
+
+def parse_pointer(path: str) -> List[str]:
+    """Split a JSON Pointer into unescaped reference tokens"""
+    if not path:
+        return []
+    if not path.startswith('/'):
+        raise ValueError(f"Invalid JSON pointer: {path!r}")
+    return [token.replace('~1', '/').replace('~0', '~') for token in path[1:].split('/')]
+
+
+def _array_id_key(old: Sequence, new: Sequence) -> Optional[str]:
+    """A field that uniquely identifies every object in both arrays, if there is one"""
+    elements = list(old) + list(new)
+    if not elements or not all(isinstance(element, dict) for element in elements):
+        return None
+    for key in ARRAY_ID_KEYS:
+        if all(key in element for element in elements):
+            old_ids = [json.dumps(element[key], sort_keys=True) for element in old]
+            new_ids = [json.dumps(element[key], sort_keys=True) for element in new]
+            if len(set(old_ids)) == len(old_ids) and len(set(new_ids)) == len(new_ids):
+                return key
+    return None
+
+
+def _diff_arrays(old: Sequence, new: Sequence, path: str, ops: List[Dict[str, Any]]):
+    id_key = _array_id_key(old, new)
+    if id_key:
+        old_seq = [json.dumps(element[id_key], sort_keys=True) for element in old]
+        new_seq = [json.dumps(element[id_key], sort_keys=True) for element in new]
+    else:
+        old_seq = [item_hash(element) for element in old]
+        new_seq = [item_hash(element) for element in new]
+
+    # Walk the LCS opcodes back to front so every emitted index is still valid
+    # when the operations are applied in order
+    matcher = difflib.SequenceMatcher(None, old_seq, new_seq, autojunk=False)
+    for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+        if tag == 'equal':
+            if id_key:
+                # Same identities in the same order; their fields may still differ
+                for offset in range(i2 - i1):
+                    _diff_values(old[i1 + offset], new[j1 + offset], f"{path}/{i1 + offset}", ops)
+            continue
+
+        paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for offset in range(paired):
+            if id_key:
+                ops.append({'op': 'replace', 'path': f"{path}/{i1 + offset}", 'value': new[j1 + offset]})
+            else:
+                _diff_values(old[i1 + offset], new[j1 + offset], f"{path}/{i1 + offset}", ops)
+        for index in reversed(range(i1 + paired, i2)):
+            ops.append({'op': 'remove', 'path': f"{path}/{index}"})
+        for offset in range(paired, j2 - j1):
+            ops.append({'op': 'add', 'path': f"{path}/{i1 + offset}", 'value': new[j1 + offset]})
+
+
+def _diff_values(old: Any, new: Any, path: str, ops: List[Dict[str, Any]]):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, old_value in old.items():
+            child = f"{path}/{escape_pointer_token(key)}"
+            if key not in new:
+                ops.append({'op': 'remove', 'path': child})
+            elif old_value != new[key]:
+                _diff_values(old_value, new[key], child, ops)
+        for key, new_value in new.items():
+            if key not in old:
+                ops.append({'op': 'add', 'path': f"{path}/{escape_pointer_token(key)}", 'value': new_value})
+    elif isinstance(old, list) and isinstance(new, list):
+        if old != new:
+            _diff_arrays(old, new, path, ops)
+    elif old != new:
+        ops.append({'op': 'replace', 'path': path, 'value': new})
+
+
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """
+    Field-level diff of two JSON values.
+
+    Args:
+        old: Original value
+        new: Changed value
+        path: JSON Pointer prefix for every emitted path (e.g. "/skins/2050")
+
+    Returns: RFC 6902 operations ({'op', 'path', 'value'}) turning old into new when applied in order
+    """
+    ops: List[Dict[str, Any]] = []
+    _diff_values(old, new, path, ops)
+    return ops
+
+
+def apply_patch(document: Any, ops: Sequence[Dict[str, Any]]) -> Any:
+    """
+    Apply add/remove/replace operations to a document in place.
+    Returns the (possibly replaced) document root.
+    """
+    for op in ops:
+        tokens = parse_pointer(op['path'])
+        if not tokens:
+            if op['op'] == 'remove':
+                document = None
+            else:
+                document = op['value']
+            continue
+
+        parent = document
+        for token in tokens[:-1]:
+            parent = parent[int(token)] if isinstance(parent, list) else parent[token]
+        last = tokens[-1]
+
+        if isinstance(parent, list):
+            index = len(parent) if last == '-' else int(last)
+            if op['op'] == 'add':
+                parent.insert(index, op['value'])
+            elif op['op'] == 'remove':
+                del parent[index]
+            elif op['op'] == 'replace':
+                parent[index] = op['value']
+            else:
+                raise ValueError(f"Unsupported patch operation: {op['op']}")
+        else:
+            if op['op'] in ('add', 'replace'):
+                parent[last] = op['value']
+            elif op['op'] == 'remove':
+                del parent[last]
+            else:
+                raise ValueError(f"Unsupported patch operation: {op['op']}")
+    return document
+
+
+def _short(value: Any, limit: int = 60) -> str:
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def describe_operation(op: Dict[str, Any], old_item: Any = None) -> str:
+    """
+    One readable line for a patch operation, e.g. "price: 100 → 150".
+
+    Args:
+        op: Patch operation with a path relative to the item
+        old_item: The item before the change, used to show previous values
+    """
+    field = '.'.join(parse_pointer(op['path'])) or '(item)'
+    if op['op'] == 'remove':
+        return f"{field}: removed"
+    if op['op'] == 'add':
+        return f"{field}: added {_short(op['value'])}"
+
+    if old_item is not None:
+        try:
+            previous = old_item
+            for token in parse_pointer(op['path']):
+                previous = previous[int(token)] if isinstance(previous, list) else previous[token]
+            return f"{field}: {_short(previous)} → {_short(op['value'])}"
+        except (KeyError, IndexError, ValueError, TypeError):
+            pass
+    return f"{field}: → {_short(op['value'])}"
@@ -0,0 +1,398 @@
+"""
+Config Stream Module
+Incremental parsing, diffing and rewriting of storeConfig.json files with bounded memory
+"""
+import io
+import re
+import json
+import codecs
+import logging
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple, Union
+from config_fingerprint import ConfigFingerprint, item_hash
+import json_codec
+
+logger = logging.getLogger('funrun_monitor')
+
+CHUNK_SIZE = 64 * 1024
+
+# Event kinds produced by ConfigEventReader.events()
+START_SECTION = 'start_section'
+ITEM = 'item'
+END_SECTION = 'end_section'
+VALUE = 'value'
+
+# A config source: a file path, raw bytes, a seekable binary file, or a callable returning a fresh binary file
+ConfigSource = Union[str, bytes, BinaryIO, Callable[[], BinaryIO]]
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# Rest of a literal, number or \uXXXX escape that decoding stopped in
+_TOKEN_TAIL = re.compile(r'[-+.0-9A-Za-z]*')
+
+
+class ConfigShapeError(ValueError):
+    """Raised when a config is valid JSON but not shaped like a storeConfig (a top-level object)"""
+
+
+def open_source(source: ConfigSource) -> BinaryIO:
+    """Open a config source for a fresh pass from the beginning"""
+    if isinstance(source, str):
+        return open(source, 'rb')
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if callable(source):
+        return source()
+    source.seek(0)
+    return source
+
+
+def load_source(source: ConfigSource) -> Any:
+    """Read and decode a whole config source at once (for documents that can't be streamed)"""
+    stream = open_source(source)
+    try:
+        return json_codec.loads(stream.read())
+    finally:
+        if isinstance(source, str):
+            stream.close()
+
+
+class ConfigEventReader:
+    def __init__(self, stream: BinaryIO, chunk_size: int = CHUNK_SIZE):
+        """
+        Incremental reader for a storeConfig-shaped JSON document.
+
+        Only the top two levels (sections and their entries) are tokenized by hand;
+        each entry value is decoded on its own, so at most one item is in memory at a time.
+
+        Args:
+            stream: Binary stream positioned at the start of the document
+            chunk_size: Bytes read from the stream at a time
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Read the next chunk (of `size` bytes, default chunk_size) into the buffer, dropping the consumed prefix"""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buf += self.text_decoder.decode(b'', final=True)
+            return False
+        self.buf += self.text_decoder.decode(chunk)
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def _reached_end(self, error: json.JSONDecodeError) -> bool:
+        """Whether a decode error is only the end of the buffer, so the value may continue in the next chunk"""
+        if error.msg.startswith('Unterminated string'):
+            # The string's closing quote isn't in the buffer
+            return True
+        # Otherwise the decoder stopped at a token; it's cut off if the token runs to the end
+        return self._token_reaches_end(_WHITESPACE.match(self.buf, error.pos).end())
+
+    def _token_reaches_end(self, pos: int) -> bool:
+        return _TOKEN_TAIL.match(self.buf, pos).end() == len(self.buf)
+
+    def _value(self) -> Any:
+        """
+        Decode one complete JSON value, reading more input as needed.
+        Each decode attempt starts over at the value, so reads double in size while it
+        stays incomplete: a value spanning many chunks is decoded a few times, not once per chunk.
+        """
+        size = self.chunk_size
+        while True:
+            if not self._peek():
+                raise json.JSONDecodeError("Expecting value", self.buf, self.pos)
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                if self.eof or not self._reached_end(e):
+                    raise
+                self._fill(size)
+                size *= 2
+                continue
+            if self._token_reaches_end(end) and self._fill(size):
+                # A number at the end of the buffer may continue in the next chunk ("-12." then "5")
+                size *= 2
+                continue
+            self.pos = end
+            return value
+
+    def _key(self) -> str:
+        if self._peek() != '"':
+            raise json.JSONDecodeError("Expecting property name enclosed in double quotes", self.buf, self.pos)
+        key = self._value()
+        self._expect(':')
+        return key
+
+    def _separator(self, closing: str) -> bool:
+        """Consume ',' (returns True) or the closing bracket (returns False)"""
+        char = self._peek()
+        if char == ',':
+            self.pos += 1
+            return True
+        if char == closing:
+            self.pos += 1
+            return False
+        raise json.JSONDecodeError(f"Expecting ',' or '{closing}'", self.buf, self.pos)
+
+    def events(self) -> Iterator[Tuple[str, str, Optional[str], Any]]:
+        """
+        Yield (kind, section, key, value) events:
+            START_SECTION / END_SECTION around every top-level object,
+            ITEM for each entry inside it,
+            VALUE for top-level values that aren't objects.
+        """
+        if self._peek() != '{':
+            raise ConfigShapeError("Config must be a JSON object at the top level")
+        self.pos += 1
+
+        if self._peek() == '}':
+            self.pos += 1
+        else:
+            while True:
+                section = self._key()
+                if self._peek() == '{':
+                    self.pos += 1
+                    yield START_SECTION, section, None, None
+                    if self._peek() == '}':
+                        self.pos += 1
+                    else:
+                        while True:
+                            item_id = self._key()
+                            yield ITEM, section, item_id, self._value()
+                            if not self._separator('}'):
+                                break
+                    yield END_SECTION, section, None, None
+                else:
+                    yield VALUE, section, None, self._value()
+                if not self._separator('}'):
+                    break
+
+        if self._peek():
+            raise json.JSONDecodeError("Extra data", self.buf, self.pos)
+
+    def document(self) -> Any:
+        """
+        Decode the rest of the input as one JSON value, e.g. after events() refused a
+        document that isn't an object. The whole remaining input is held in memory.
+        """
+        while self._fill():
+            pass
+        value, end = self.json_decoder.raw_decode(self.buf, _WHITESPACE.match(self.buf, self.pos).end())
+        end = _WHITESPACE.match(self.buf, end).end()
+        if end < len(self.buf):
+            raise json.JSONDecodeError("Extra data", self.buf, end)
+        self.pos = end
+        return value
+
+
+def iter_events(source: ConfigSource, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, str, Optional[str], Any]]:
+    """Open a source and yield its parse events"""
+    stream = open_source(source)
+    try:
+        yield from ConfigEventReader(stream, chunk_size).events()
+    finally:
+        if isinstance(source, str):
+            stream.close()
+
+
+def iter_items(source: ConfigSource, sections: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str, Any]]:
+    """Yield (section, item_id, item) for every entry of the given sections (all sections if None)"""
+    wanted = set(sections) if sections is not None else None
+    for kind, section, item_id, value in iter_events(source):
+        if kind == ITEM and (wanted is None or section in wanted):
+            yield section, item_id, value
+
+
+def _fingerprint_event(fingerprint: ConfigFingerprint, kind: str, section: str, item_id: Optional[str], value: Any) -> Optional[str]:
+    """Add one parse event to a fingerprint; returns the entry hash for items and values"""
+    if kind == START_SECTION:
+        fingerprint.add_section(section)
+    elif kind == ITEM:
+        hashed = item_hash(value)
+        fingerprint.add_item(section, item_id, hashed, isinstance(value, dict))
+        return hashed
+    elif kind == VALUE:
+        hashed = item_hash(value)
+        fingerprint.add_value(section, hashed)
+        return hashed
+    return None
+
+
+def stream_diff(old_source: ConfigSource, new_source: ConfigSource,
+                sections: Optional[Iterable[str]] = None,
+                old_fingerprint: Optional[ConfigFingerprint] = None,
+                new_fingerprint: Optional[ConfigFingerprint] = None,
+                on_fingerprint: Optional[Callable[[str, ConfigFingerprint], None]] = None,
+                progress_every: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Diff two configs entry by entry without building either object graph.
+
+    Memory holds one content hash per old entry plus the changed entries only:
+        pass 1 hashes every old entry (skipped when old_fingerprint is given),
+        pass 2 streams the new config, emitting additions and collecting modified entries,
+        pass 3 streams the old config again to emit removals and modifications.
+
+    With both fingerprints known, sections whose hashes match are skipped without
+    hashing any of their items, and identical configs aren't read at all.
+
+    Args:
+        sections: Top-level keys to diff (all of them if None)
+        old_fingerprint, new_fingerprint: Cached fingerprints of the two sources, if known
+        on_fingerprint: Called with ('old'|'new', fingerprint) for every fingerprint
+            computed along the way, so the caller can cache it
+        progress_every: Also yield a progress record every this many entries read (0: never)
+
+    Yields: {'type': 'added'|'removed'|'modified', 'section', 'id', and 'item' or 'old'/'new'}
+        'id' is None for top-level values that aren't objects.
+        Progress records are {'type': 'progress', 'pass': 1-3, 'entries': entries read in that pass}.
+    """
+    def progress(pass_number: int, entries: int) -> Optional[Dict[str, Any]]:
+        if progress_every and entries % progress_every == 0:
+            return {'type': 'progress', 'pass': pass_number, 'entries': entries}
+        return None
+
+    wanted = set(sections) if sections is not None else None
+
+    def is_wanted(section: str) -> bool:
+        return wanted is None or section in wanted
+
+    if old_fingerprint is None:
+        old_fingerprint = ConfigFingerprint()
+        for entries, event in enumerate(iter_events(old_source), 1):
+            _fingerprint_event(old_fingerprint, *event)
+            record = progress(1, entries)
+            if record:
+                yield record
+        old_fingerprint.finish()
+        if on_fingerprint:
+            on_fingerprint('old', old_fingerprint)
+
+    unchanged: Set[str] = set()
+    if new_fingerprint is not None:
+        names = {name for name in old_fingerprint.names() | new_fingerprint.names() if is_wanted(name)}
+        unchanged = {name for name in names if old_fingerprint.section_unchanged(new_fingerprint, name)}
+        if names <= unchanged:
+            return
+
+    # Copies, since matched entries are popped below; top-level values use the id None
+    old_hashes: Dict[str, Dict[Optional[str], str]] = {
+        section: dict(hashes) for section, hashes in old_fingerprint.items.items()
+        if is_wanted(section) and section not in unchanged
+    }
+    for name, hashed in old_fingerprint.values.items():
+        if is_wanted(name) and name not in unchanged:
+            old_hashes.setdefault(name, {})[None] = hashed
+
+    collected = ConfigFingerprint() if new_fingerprint is None else None
+    modified_new: Dict[Tuple[str, Optional[str]], Any] = {}
+    # Every section is read when collecting, so the cached fingerprint covers the whole file
+    for entries, (kind, section, item_id, value) in enumerate(iter_events(new_source), 1):
+        record = progress(2, entries)
+        if record:
+            yield record
+        if collected is not None:
+            hashed = _fingerprint_event(collected, kind, section, item_id, value)
+        elif kind in (ITEM, VALUE) and is_wanted(section) and section not in unchanged:
+            if kind == ITEM:
+                hashed = new_fingerprint.items.get(section, {}).get(item_id)
+            else:
+                hashed = new_fingerprint.values.get(section)
+            hashed = hashed or item_hash(value)
+        else:
+            continue
+        if kind not in (ITEM, VALUE) or not is_wanted(section):
+            continue
+
+        old_hash = old_hashes.get(section, {}).pop(item_id, None)
+        if old_hash is None:
+            yield {'type': 'added', 'section': section, 'id': item_id, 'item': value}
+        elif old_hash != hashed:
+            modified_new[(section, item_id)] = value
+
+    if collected is not None and on_fingerprint:
+        on_fingerprint('new', collected.finish())
+
+    # Whatever is left in old_hashes was never seen in the new config
+    removed: Set[Tuple[str, Optional[str]]] = {
+        (section, item_id) for section, items in old_hashes.items() for item_id in items
+    }
+    del old_hashes
+    if not removed and not modified_new:
+        return
+
+    for entries, (kind, section, item_id, value) in enumerate(iter_events(old_source), 1):
+        record = progress(3, entries)
+        if record:
+            yield record
+        if kind not in (ITEM, VALUE):
+            continue
+        key = (section, item_id)
+        if key in removed:
+            yield {'type': 'removed', 'section': section, 'id': item_id, 'item': value}
+        elif key in modified_new:
+            # Only entries whose hashes differ get a deep comparison (1 == 1.0 hashes differently)
+            new_value = modified_new.pop(key)
+            if value != new_value:
+                yield {'type': 'modified', 'section': section, 'id': item_id, 'old': value, 'new': new_value}
+
+
+def _dump_nested(value: Any, indent: int) -> str:
+    """json.dumps(indent=2) of a value that sits `indent` spaces deep in the document"""
+    text = json.dumps(value, indent=2, ensure_ascii=False)
+    return text.replace('\n', '\n' + ' ' * indent)
+
+
+def iter_dump_config(events: Iterable[Tuple[str, str, Optional[str], Any]],
+                     transform: Optional[Callable[[str, str, Any], Any]] = None) -> Iterator[str]:
+    """
+    Re-serialize parse events as text identical to json.dumps(config, indent=2, ensure_ascii=False).
+
+    Args:
+        events: Events from iter_events()
+        transform: Optional callback (section, item_id, item) -> item applied to every entry
+    """
+    wrote_section = False
+    wrote_item = False
+    for kind, section, item_id, value in events:
+        if kind == START_SECTION or kind == VALUE:
+            yield ',\n  ' if wrote_section else '{\n  '
+            wrote_section = True
+            yield json.dumps(section, ensure_ascii=False) + ': '
+            if kind == VALUE:
+                yield _dump_nested(value, 2)
+            wrote_item = False
+        elif kind == ITEM:
+            if transform:
+                value = transform(section, item_id, value)
+            yield ',\n    ' if wrote_item else '{\n    '
+            wrote_item = True
+            yield json.dumps(item_id, ensure_ascii=False) + ': ' + _dump_nested(value, 4)
+        elif kind == END_SECTION:
+            yield '\n  }' if wrote_item else '{}'
+    yield '\n}' if wrote_section else '{}'
+
@@ -0,0 +1,141 @@
+"""
+Config Timeline Module
+Diff N ordered config versions in one pass: every adjacent step plus first-to-last
+"""
+import os
+import re
+import logging
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config_stream import ConfigSource, load_source
+from config_fingerprint import ConfigFingerprint, content_hash
+
+logger = logging.getLogger('funrun_monitor')
+
+# Below this many bytes in total, versions are parsed in-process
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+
+def parse_version(source: ConfigSource) -> Tuple[Any, Optional[ConfigFingerprint]]:
+    """Decode one version and fingerprint it. Module-level so it can run in a worker process."""
+    document = load_source(source)
+    fingerprint = ConfigFingerprint.from_config(document) if isinstance(document, dict) else None
+    return document, fingerprint
+
+
+def natural_key(name: str) -> List[Any]:
+    """Sort key that orders 'v2' before 'v10'"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def folder_versions(folder: str) -> List[str]:
+    """The .json files of a folder, in natural filename order"""
+    names = [name for name in os.listdir(folder) if name.lower().endswith('.json')]
+    return [os.path.join(folder, name) for name in sorted(names, key=natural_key)]
+
+
+def _source_size(source: ConfigSource) -> int:
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    return 0
+
+
+class ConfigTimeline:
+    def __init__(self, comparator, max_workers: Optional[int] = None, parallel_min_bytes: int = PARALLEL_MIN_BYTES):
+        """
+        Args:
+            comparator: ConfigComparator used for every diff (its worker pool is shared)
+            max_workers: Versions parsed ahead of the one being diffed (defaults to the CPU count)
+            parallel_min_bytes: Below this many bytes in total, versions are parsed in-process
+        """
+        self.comparator = comparator
+        self.max_workers = max_workers or os.cpu_count() or 2
+        self.parallel_min_bytes = parallel_min_bytes
+
+    def _parsed(self, sources: Sequence[ConfigSource]) -> Iterator[Tuple[Any, Optional[ConfigFingerprint]]]:
+        """
+        Yield (document, fingerprint) for each source in order, parsing each exactly once.
+        Large inputs are parsed in worker processes a few versions ahead, so at most
+        max_workers parsed versions wait in memory at any time.
+        """
+        if len(sources) < 3 or sum(_source_size(source) for source in sources) < self.parallel_min_bytes:
+            for source in sources:
+                yield parse_version(source)
+            return
+
+        pool = self.comparator.pool()
+        upcoming = iter(sources)
+        pending = deque()
+        for source in upcoming:
+            pending.append(pool.submit(parse_version, source))
+            if len(pending) >= self.max_workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            next_source = next(upcoming, None)
+            if next_source is not None:
+                pending.append(pool.submit(parse_version, next_source))
+            yield result
+
+    def _compare(self, old: Tuple[Any, Optional[ConfigFingerprint]], new: Tuple[Any, Optional[ConfigFingerprint]]) -> Dict[str, Any]:
+        (old_document, old_fingerprint), (new_document, new_fingerprint) = old, new
+        return self.comparator.compare_configs(old_document, new_document, old_fingerprint, new_fingerprint)
+
+    def diff_sources(self, sources: Sequence[ConfigSource], labels: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Diff ordered versions (oldest first).
+
+        Only the first, previous and current versions are held in memory; each step
+        reuses the fingerprints computed while parsing, so unchanged sections are skipped.
+
+        Returns: {
+            'labels': [...],
+            'steps': [{'from': label, 'to': label, 'changes': {...}}, ...],   # adjacent pairs
+            'cumulative': {...}                                                # first -> last
+        }
+        """
+        if len(sources) < 2:
+            raise ValueError("A timeline needs at least two versions")
+        labels = list(labels) if labels else [f"v{index + 1}" for index in range(len(sources))]
+
+        # With a diff cache, pairs compared before are reused (every version is still parsed once)
+        digests = [content_hash(source) for source in sources] if self.comparator.diff_cache else None
+
+        def compare(old_index: int, old, new_index: int, new) -> Dict[str, Any]:
+            if digests is None:
+                return self._compare(old, new)
+            return self.comparator.cached_changes(digests[old_index], digests[new_index], lambda: self._compare(old, new))
+
+        steps = []
+        first = previous = None
+        for index, parsed in enumerate(self._parsed(sources)):
+            if index == 0:
+                first = parsed
+            else:
+                steps.append({'from': labels[index - 1], 'to': labels[index], 'changes': compare(index - 1, previous, index, parsed)})
+            previous = parsed
+
+        last = len(sources) - 1
+        cumulative = compare(0, first, last, previous) if len(sources) > 2 else steps[0]['changes']
+        logger.info(f"Timeline diff of {len(sources)} versions done")
+        return {'labels': labels, 'steps': steps, 'cumulative': cumulative}
+
+    def diff_folder(self, folder: str) -> Dict[str, Any]:
+        """Diff every .json file of a folder, in natural filename order"""
+        paths = folder_versions(folder)
+        return self.diff_sources(paths, [os.path.basename(path) for path in paths])
+
+    def diff_snapshots(self, store, refs: Sequence[str]) -> Dict[str, Any]:
+        """Diff stored versions; only their changed items are ever loaded"""
+        if len(refs) < 2:
+            raise ValueError("A timeline needs at least two versions")
+        digests = [store.resolve(ref) for ref in refs]
+        steps = [
+            {'from': refs[index], 'to': refs[index + 1], 'changes': store.diff(digests[index], digests[index + 1], self.comparator)}
+            for index in range(len(digests) - 1)
+        ]
+        cumulative = store.diff(digests[0], digests[-1], self.comparator) if len(digests) > 2 else steps[0]['changes']
+        return {'labels': list(refs), 'steps': steps, 'cumulative': cumulative}
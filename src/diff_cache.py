@@ -0,0 +1,153 @@
+"""
+Diff Cache Module
+Comparison results keyed by the content hashes of both files, in memory and on disk
+"""
+import os
+import re
+import json
+import zlib
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import json_codec
+
+logger = logging.getLogger('funrun_monitor')
+
+# Bumped whenever the change set layout changes; older entries are never matched
+DIFF_CACHE_VERSION = 1
+
+CHANGES_FILE = "changes.json.z"
+
+
+def diff_key(old_digest: str, new_digest: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key for comparing two file contents with the given diff options"""
+    material = json.dumps([DIFF_CACHE_VERSION, old_digest, new_digest, options or {}], sort_keys=True)
+    return hashlib.blake2b(material.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _artifact_filename(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]', '_', name)
+
+
+class DiffCache:
+    def __init__(self, cache_dir: str = os.path.join("snapshots", "diffs"), max_bytes: int = 256 * 1024 * 1024,
+                 memory_entries: int = 16):
+        """
+        Change sets (and files generated from them) for previously compared pairs.
+
+        Args:
+            cache_dir: One directory per cached comparison
+            max_bytes: Least recently used comparisons are removed beyond this much disk space
+            memory_entries: Change sets also kept in memory, most recently used first
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _touch(self, key: str):
+        try:
+            os.utime(self._entry(key))
+        except OSError:
+            pass
+
+    def _remember(self, key: str, changes: Dict[str, Any]):
+        with self.lock:
+            self.memory[key] = changes
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached change set, or None. Shared between callers, so treat it as read-only."""
+        with self.lock:
+            changes = self.memory.get(key)
+            if changes is not None:
+                self.memory.move_to_end(key)
+        if changes is not None:
+            return changes
+
+        try:
+            with open(os.path.join(self._entry(key), CHANGES_FILE), 'rb') as f:
+                changes = json_codec.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable diff cache entry {key}: {str(e)}")
+            return None
+        self._touch(key)
+        self._remember(key, changes)
+        return changes
+
+    def put(self, key: str, changes: Dict[str, Any]):
+        self._remember(key, changes)
+        try:
+            data = zlib.compress(json_codec.dumps(changes), 6)
+            self._write(os.path.join(self._entry(key), CHANGES_FILE), data)
+            self.evict()
+        except Exception as e:
+            logger.error(f"Error caching diff {key}: {str(e)}")
+
+    def artifact(self, key: str, name: str, build: Callable[[], bytes]) -> bytes:
+        """
+        A file generated from a cached comparison (modified config, patch, ...),
+        built and stored on first use.
+        """
+        path = os.path.join(self._entry(key), _artifact_filename(name))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            self._touch(key)
+            return data
+        except FileNotFoundError:
+            pass
+
+        data = build()
+        try:
+            self._write(path, data)
+            self.evict()
+        except Exception as e:
+            logger.error(f"Error caching {name} for diff {key}: {str(e)}")
+        return data
+
+    def evict(self):
+        """Remove least recently used comparisons until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+                entries.append((os.path.getmtime(path), size, name))
+                total += size
+            except OSError:
+                continue
+        if total <= self.max_bytes:
+            return
+
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry(name), ignore_errors=True)
+            with self.lock:
+                self.memory.pop(name, None)
+            total -= size
+            logger.debug(f"Evicted cached diff {name}")
@@ -0,0 +1,204 @@
+"""
+Diff View Module
+Page-by-page browsing of a change set in Discord, each page rendered only when it's shown
+"""
+import bisect
+import logging
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+
+from config_patch import describe_operation
+
+logger = logging.getLogger('funrun_monitor')
+
+KINDS = ("added", "removed", "modified", "other")
+KIND_LABELS = {"added": "➕ Added", "removed": "➖ Removed", "modified": "✏️ Modified", "other": "🧩 Changed"}
+
+ENTRIES_PER_PAGE = 10
+# Embed limits (https://discord.com/developers/docs/resources/message#embed-object-embed-limits)
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_TITLE_LIMIT = 256
+# Longest text of one entry, so a full page stays well inside the description limit
+ENTRY_MAX_CHARS = 360
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class DiffPager:
+    def __init__(self, changes: Dict[str, Any], entries_per_page: int = ENTRIES_PER_PAGE):
+        """
+        Pages over every entry of a change set: added, removed and modified items,
+        then field changes of other sections. Only entry counts per section are
+        computed up front; page text is built from the change set when requested.
+        """
+        self.changes = changes
+        self.entries_per_page = entries_per_page
+        self.kind = "all"
+        self._layout()
+
+    def _layout(self):
+        """(kind, section, entry count) runs for the current filter, with their start offsets"""
+        self.runs: List[Tuple[str, str, int]] = []
+        self.starts: List[int] = []
+        total = 0
+        for kind in KINDS:
+            if self.kind not in ("all", kind):
+                continue
+            for section, entries in self.changes[kind].items():
+                if entries:
+                    self.runs.append((kind, section, len(entries)))
+                    self.starts.append(total)
+                    total += len(entries)
+        self.total = total
+
+    def counts(self) -> Dict[str, int]:
+        """Entries per kind (whatever the filter)"""
+        return {kind: sum(len(entries) for entries in self.changes[kind].values()) for kind in KINDS}
+
+    def set_kind(self, kind: str):
+        """Only page through one kind of change ('all' for everything)"""
+        self.kind = kind
+        self._layout()
+
+    @property
+    def page_count(self) -> int:
+        return max(1, -(-self.total // self.entries_per_page))
+
+    def _entries(self, start: int, count: int) -> List[Tuple[str, str, Any, Any]]:
+        """(kind, section, key, value) of `count` entries from offset `start`"""
+        found = []
+        run = bisect.bisect_right(self.starts, start) - 1
+        offset = start - self.starts[run] if run >= 0 else 0
+        while run < len(self.runs) and len(found) < count:
+            kind, section, _ = self.runs[run]
+            entries = self.changes[kind][section]
+            wanted = count - len(found)
+            if kind == "other":
+                found.extend((kind, section, index, op) for index, op in islice(enumerate(entries), offset, offset + wanted))
+            else:
+                found.extend((kind, section, key, value) for key, value in islice(entries.items(), offset, offset + wanted))
+            run += 1
+            offset = 0
+        return found
+
+    @staticmethod
+    def render_entry(kind: str, key: Any, value: Any) -> str:
+        if kind == "other":
+            return describe_operation(value)
+        item = value["new"] if kind == "modified" else value
+        title = item.get("title", "Unknown") if isinstance(item, dict) else "Unknown"
+        if kind != "modified":
+            rarity = item.get("rarity", "Unknown") if isinstance(item, dict) else "Unknown"
+            return f"`{key}` {title} (Rarity: {rarity})"
+        lines = [describe_operation(op, value["old"]) for op in value["patch"][:3]]
+        if len(value["patch"]) > 3:
+            lines.append(f"... and {len(value['patch']) - 3} more")
+        return f"`{key}` {title}\n" + "\n".join(f"  {line}" for line in lines)
+
+    def page_embed(self, page: int) -> discord.Embed:
+        """Embed for a 1-based page number"""
+        start = (page - 1) * self.entries_per_page
+        lines = []
+        current = None
+        for kind, section, key, value in self._entries(start, self.entries_per_page):
+            if (kind, section) != current:
+                current = (kind, section)
+                lines.append(f"**{KIND_LABELS[kind]} {section or 'document'}**")
+            lines.append(_clip(self.render_entry(kind, key, value), ENTRY_MAX_CHARS))
+
+        last = min(start + self.entries_per_page, self.total)
+        filter_label = "" if self.kind == "all" else f" ({self.kind})"
+        embed = discord.Embed(
+            title=_clip(f"🔍 Changes {start + 1}-{last} of {self.total}{filter_label}", EMBED_TITLE_LIMIT),
+            description=_clip("\n".join(lines) or "No changes", EMBED_DESCRIPTION_LIMIT),
+            color=0xffa500
+        )
+        embed.set_footer(text=f"Page {page}/{self.page_count}")
+        return embed
+
+
+class DiffPageView(discord.ui.View):
+    def __init__(self, summary: discord.Embed, changes: Dict[str, Any], owner_id: int, timeout: float = 600):
+        """
+        Buttons and a filter under a result embed. Page 0 is the summary embed itself,
+        pages 1.. list every change. When the view times out the change set is released.
+
+        Args:
+            summary: The embed the message already shows
+            owner_id: Only this user can turn pages
+            timeout: Seconds without interaction before the buttons stop working
+        """
+        super().__init__(timeout=timeout)
+        self.summary = summary
+        self.pager: Optional[DiffPager] = DiffPager(changes)
+        self.owner_id = owner_id
+        self.page = 0
+        self.message: Optional[discord.Message] = None
+
+        counts = self.pager.counts()
+        self.kind_select.options = [discord.SelectOption(label=f"All changes ({sum(counts.values())})", value="all", default=True)] + [
+            discord.SelectOption(label=f"{KIND_LABELS[kind]} ({count})", value=kind)
+            for kind, count in counts.items() if count
+        ]
+        self._update_buttons()
+
+    def _update_buttons(self):
+        last = self.pager.page_count if self.pager else 0
+        self.first_page.disabled = self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= last
+        self.page_label.label = "Summary" if self.page == 0 else f"{self.page}/{last}"
+
+    async def show(self, interaction: discord.Interaction, page: int):
+        self.page = max(0, min(page, self.pager.page_count))
+        self._update_buttons()
+        embed = self.summary if self.page == 0 else self.pager.page_embed(self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("Only the person who ran the command can turn these pages.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="⏮", style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, 0)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.primary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Summary", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_label(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page + 1)
+
+    @discord.ui.button(label="⏭", style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.pager.page_count)
+
+    @discord.ui.select(placeholder="Show: all changes", row=1)
+    async def kind_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        kind = select.values[0]
+        self.pager.set_kind(kind)
+        for option in select.options:
+            option.default = option.value == kind
+        await self.show(interaction, 1)
+
+    async def on_timeout(self):
+        # Release the change set; the message keeps its last page
+        self.pager = None
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException as e:
+                logger.debug(f"Could not disable diff page buttons: {str(e)}")
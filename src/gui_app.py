@@ -6,14 +6,25 @@ import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import asyncio
 import threading
+import time
+import multiprocessing
 import json
 import os
 import sys
 from datetime import datetime, timezone
 import logging
 from logging.handlers import RotatingFileHandler
-from uptodown_monitor import UptodownMonitor
+from update_monitor import StoreMonitor
+from poll_scheduler import PollScheduler
 from config_comparator import ConfigComparator
+from config_fingerprint import FingerprintCache, content_hash
+from config_patch import describe_operation
+from snapshot_store import SnapshotStore, snapshot_name
+from config_timeline import ConfigTimeline, folder_versions
+from diff_cache import DiffCache
+from item_index import ItemIndex
+from tree_diff import TreeDiff, format_report
+import json_codec
 from PIL import Image, ImageTk, ImageDraw
 import discord
 from discord.ext import commands
@@ -60,18 +71,36 @@ class FR4LeakingToolGUI(ctk.CTk):
         except Exception as e:
             logger.warning(f"Failed to load window icon: {e}")
         
-        # Initialize components
-        self.monitor = UptodownMonitor()
-        self.comparator = ConfigComparator()
-        self.auto_check_running = False
-        self.check_thread = None
-        
         # Discord bot components
         self.discord_bot = None
         self.discord_enabled = False
         self.discord_thread = None
         self.discord_config = self.load_discord_config()
         
+        # Initialize components
+        self.monitor = StoreMonitor(
+            package_name=self.discord_config.get('app_package', 'com.dirtybit.fire'),
+            app_store_id='1503294866'  # Fun Run 4 iOS App Store ID
+        )
+        self.comparator = ConfigComparator(fingerprint_cache=FingerprintCache(), diff_cache=DiffCache())
+        self.snapshots = SnapshotStore()
+        self.timeline = ConfigTimeline(self.comparator)
+        self.tree_diff = TreeDiff(self.comparator)
+        # Item search: the newest stored storeConfig, or the config picked in the modify tab
+        self.item_index = ItemIndex()
+        self.file_index = ItemIndex()
+        self.file_index_source = None
+        self.auto_check_running = False
+        self.auto_check_stop = threading.Event()
+        self.check_thread = None
+        self.scheduler = PollScheduler.from_config(self.discord_config)
+        self.scheduler.learn_release_times(self.monitor.release_times())
+        
+        # Long-lived event loop that owns the monitor's pooled HTTP session
+        self.monitor_loop = None
+        self.monitor_thread = None
+        self.start_monitor_loop()
+        
         # File paths
         self.old_config_path = None
         self.new_config_path = None
@@ -130,6 +159,22 @@ class FR4LeakingToolGUI(ctk.CTk):
             logger.error(f"Failed to load Discord config: {e}")
         return {}
     
+    def start_monitor_loop(self):
+        """Start the event loop used for store checks and open the pooled HTTP session"""
+        self.monitor_loop = asyncio.new_event_loop()
+        
+        def run_loop():
+            asyncio.set_event_loop(self.monitor_loop)
+            self.monitor_loop.run_forever()
+        
+        self.monitor_thread = threading.Thread(target=run_loop, daemon=True)
+        self.monitor_thread.start()
+        asyncio.run_coroutine_threadsafe(self.monitor.start(), self.monitor_loop)
+    
+    def run_monitor_task(self, coro):
+        """Run a coroutine on the monitor loop and wait for its result (call from worker threads only)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.monitor_loop).result()
+    
     def start_discord_bot(self):
         """Start Discord bot in a separate thread"""
         if self.discord_enabled:
@@ -516,7 +561,7 @@ class FR4LeakingToolGUI(ctk.CTk):
         
         self.auto_check_btn = ctk.CTkButton(
             control_frame,
-            text="    Start Auto-Check (15 min)",
+            text="    Start Auto-Check",
             image=self.icons.get('play'),
             compound="left",
             command=self.toggle_auto_check,
@@ -671,7 +716,35 @@ class FR4LeakingToolGUI(ctk.CTk):
             hover_color="#1d4ed8",
             corner_radius=10
         )
-        self.compare_execute_btn.pack(pady=(0, 25), padx=30, fill="x")
+        self.compare_execute_btn.pack(pady=(0, 10), padx=30, fill="x")
+        
+        self.compare_timeline_btn = ctk.CTkButton(
+            self.compare_tab,
+            text="    Compare Folder (Timeline)",
+            image=self.icons.get('compare'),
+            compound="left",
+            command=self.compare_folder_timeline,
+            height=44,
+            font=ctk.CTkFont(family="Segoe UI Variable", size=14, weight="bold"),
+            fg_color="#475569",
+            hover_color="#334155",
+            corner_radius=10
+        )
+        self.compare_timeline_btn.pack(pady=(0, 10), padx=30, fill="x")
+        
+        self.compare_tree_btn = ctk.CTkButton(
+            self.compare_tab,
+            text="    Compare Data Folders (Old → New)",
+            image=self.icons.get('compare'),
+            compound="left",
+            command=self.compare_data_folders,
+            height=44,
+            font=ctk.CTkFont(family="Segoe UI Variable", size=14, weight="bold"),
+            fg_color="#475569",
+            hover_color="#334155",
+            corner_radius=10
+        )
+        self.compare_tree_btn.pack(pady=(0, 25), padx=30, fill="x")
         
         # Results display group with label
         results_label = ctk.CTkLabel(
@@ -772,6 +845,41 @@ class FR4LeakingToolGUI(ctk.CTk):
         )
         self.item_ids_entry.pack(fill="x", padx=20, pady=(0, 20))
         
+        # Item search group with label
+        search_group_label = ctk.CTkLabel(
+            self.modify_tab,
+            text="ITEM SEARCH",
+            font=ctk.CTkFont(family="Segoe UI Variable", size=13, weight="bold"),
+            anchor="w"
+        )
+        search_group_label.pack(fill="x", padx=30, pady=(10, 5))
+        
+        search_frame = ctk.CTkFrame(self.modify_tab, corner_radius=12)
+        search_frame.pack(fill="x", pady=(0, 20), padx=30)
+        
+        search_inner_frame = ctk.CTkFrame(search_frame, fg_color="transparent")
+        search_inner_frame.pack(fill="x", pady=20, padx=20)
+        
+        self.search_entry = ctk.CTkEntry(
+            search_inner_frame,
+            placeholder_text="e.g., golden dragon rarity:epic hidden:true section:skins",
+            height=40,
+            font=ctk.CTkFont(family="Segoe UI Variable", size=14),
+            corner_radius=8
+        )
+        self.search_entry.pack(side="left", fill="x", expand=True)
+        self.search_entry.bind("<Return>", lambda event: self.search_items())
+        
+        ctk.CTkButton(
+            search_inner_frame,
+            text="Search",
+            command=self.search_items,
+            width=110,
+            height=40,
+            font=ctk.CTkFont(family="Segoe UI Variable", size=13),
+            corner_radius=8
+        ).pack(side="right", padx=(10, 0))
+        
         # Modify button group with label
         action_group_label = ctk.CTkLabel(
             self.modify_tab,
@@ -902,7 +1010,7 @@ class FR4LeakingToolGUI(ctk.CTk):
     # Functionality methods
     def update_version_display(self):
         """Update the version display"""
-        version = self.monitor.current_version or "Not detected"
+        version = self.monitor.current_versions.get('play_store') or "Not detected"
         self.current_version_label.configure(text=f"Current Version: {version}")
         
         last_check = self.monitor.last_check or "Never"
@@ -940,12 +1048,7 @@ class FR4LeakingToolGUI(ctk.CTk):
         self.check_now_btn.configure(state="disabled", text="Checking...")
         
         def check_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            has_update, version, info = loop.run_until_complete(
-                self.monitor.check_uptodown_update()
-            )
-            loop.close()
+            has_update, version, info = self.run_monitor_task(self.monitor.check_update())
             
             self.after(0, lambda: self.handle_update_result(has_update, version, info))
             
@@ -978,37 +1081,38 @@ class FR4LeakingToolGUI(ctk.CTk):
                 image=self.icons.get('pause'),
                 fg_color="#dc2626"
             )
-            self.add_status_log("Auto-check started (15 minute interval)")
+            self.add_status_log("Auto-check started (adaptive interval)")
             self.start_auto_check()
         else:
             self.auto_check_running = False
+            self.auto_check_stop.set()
             self.auto_check_btn.configure(
-                text="  Start Auto-Check (15 min)",
+                text="  Start Auto-Check",
                 image=self.icons.get('play'),
                 fg_color="#16a34a"
             )
             self.add_status_log("Auto-check stopped")
             
     def start_auto_check(self):
-        """Start automatic checking thread"""
-        def auto_check_loop():
-            while self.auto_check_running:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                has_update, version, info = loop.run_until_complete(
-                    self.monitor.check_uptodown_update()
-                )
-                loop.close()
-                
-                self.after(0, lambda: self.handle_auto_check_result(has_update, version, info))
-                
-                # Wait 15 minutes
-                for _ in range(900):  # 15 * 60 seconds
-                    if not self.auto_check_running:
-                        break
-                    threading.Event().wait(1)
+        """Start automatic checking thread, paced by the adaptive poll scheduler"""
+        self.auto_check_stop.clear()
+        
+        def auto_check():
+            has_update, version, info = self.run_monitor_task(self.monitor.check_update())
+            if has_update:
+                self.scheduler.learn_release_times(self.monitor.release_times())
+            
+            self.after(0, lambda: self.handle_auto_check_result(has_update, version, info))
+            return version is not None
         
-        self.check_thread = threading.Thread(target=auto_check_loop, daemon=True)
+        def report_delay(delay):
+            self.after(0, lambda: self.add_status_log(f"Next auto-check in {delay / 60:.1f} minutes"))
+        
+        self.check_thread = threading.Thread(
+            target=self.scheduler.run_blocking,
+            args=(auto_check, self.auto_check_stop, report_delay),
+            daemon=True
+        )
         self.check_thread.start()
         
     def handle_auto_check_result(self, has_update, version, info):
@@ -1030,17 +1134,13 @@ class FR4LeakingToolGUI(ctk.CTk):
         if messagebox.askyesno("Confirm Reset", "Reset version data? This will trigger an update notification on next check."):
             try:
                 # Log before reset
-                self.add_status_log(f"Current version before reset: {self.monitor.current_version}")
+                self.add_status_log(f"Current version before reset: {self.monitor.current_versions.get('play_store')}")
                 
                 # Reset the monitor's version data
                 self.monitor.reset_version()
                 
-                # Explicitly set to None
-                self.monitor.current_version = None
-                self.monitor.last_check = None
-                
                 # Log after reset
-                self.add_status_log(f"Version after reset: {self.monitor.current_version}")
+                self.add_status_log(f"Version after reset: {self.monitor.current_versions.get('play_store')}")
                 
                 # Update the UI immediately
                 self.update_version_display()
@@ -1052,7 +1152,7 @@ class FR4LeakingToolGUI(ctk.CTk):
                 self.add_status_log("Version data reset successfully")
                 
                 # Show success message
-                messagebox.showinfo("Success", f"Version data has been reset!\n\nCurrent version: {self.monitor.current_version or 'Not detected'}\nLast check: {self.monitor.last_check or 'Never'}")
+                messagebox.showinfo("Success", f"Version data has been reset!\n\nCurrent version: {self.monitor.current_versions.get('play_store') or 'Not detected'}\nLast check: {self.monitor.last_check or 'Never'}")
             except Exception as e:
                 import traceback
                 error_details = traceback.format_exc()
@@ -1091,25 +1191,82 @@ class FR4LeakingToolGUI(ctk.CTk):
             self.modify_config_label.configure(text=os.path.basename(path))
             
     def compare_configs(self):
-        """Compare two config files"""
+        """Compare two config files, showing progress and the first changes while it runs"""
         if not self.old_config_path or not self.new_config_path:
             messagebox.showerror("Error", "Please select both old and new config files!")
             return
-            
-        try:
-            with open(self.old_config_path, 'r', encoding='utf-8') as f:
-                old_config = json.load(f)
+        
+        old_path, new_path = self.old_config_path, self.new_config_path
+        self.compare_execute_btn.configure(state="disabled")
+        self.set_compare_results("Comparing configs...\n")
+        
+        def compare_thread():
+            try:
+                # Stream both files item by item instead of loading them whole
+                # (a pair compared before comes straight from the diff cache)
+                old_digest, new_digest = content_hash(old_path), content_hash(new_path)
+                first_changes = []
+                last_update = 0.0
+                for event in self.comparator.iter_changes(old_path, new_path, old_digest, new_digest):
+                    if event["event"] == "done":
+                        break
+                    if event["event"] == "change" and len(first_changes) < 20:
+                        entry = event['section'] if event['id'] is None else f"{event['section']}/{event['id']}"
+                        first_changes.append(f"  [{event['type'].upper()}] {entry}")
+                    if time.monotonic() - last_update >= 0.25:
+                        last_update = time.monotonic()
+                        text = self.format_compare_progress(event, first_changes)
+                        self.after(0, lambda text=text: self.set_compare_results(text))
+                changes = event["changes"]
                 
-            with open(self.new_config_path, 'r', encoding='utf-8') as f:
-                new_config = json.load(f)
+                # Keep both versions in the local snapshot store for later comparisons
+                try:
+                    for path in (old_path, new_path):
+                        self.snapshots.ingest(path, snapshot_name(path))
+                except Exception as e:
+                    logger.error(f"Failed to store config snapshots: {e}")
                 
-            changes = self.comparator.compare_configs(old_config, new_config)
-            
+                self.after(0, lambda: self.show_compare_results(changes, new_path, old_digest, new_digest))
+            except Exception as e:
+                error_msg = str(e)
+                self.after(0, lambda: self.compare_failed(error_msg))
+        
+        threading.Thread(target=compare_thread, daemon=True).start()
+    
+    @staticmethod
+    def format_compare_progress(event, first_changes) -> str:
+        """Live status while a comparison runs: running counts and the first changes found"""
+        counts = event["counts"]
+        result = "Comparing configs...\n\n"
+        if event["event"] == "progress":
+            phase = {1: "Hashing old file", 2: "Reading new file", 3: "Re-reading old file"}[event["pass"]]
+            result += f"{phase}: {event['entries']:,} entries\n"
+        result += f"Found so far: {counts['added']} added, {counts['removed']} removed, {counts['modified']} modified\n"
+        if first_changes:
+            result += "\nFIRST CHANGES:\n" + "\n".join(first_changes) + "\n"
+        return result
+    
+    def set_compare_results(self, text: str):
+        """Replace the comparison results text (the textbox stays read-only)"""
+        self.compare_results_textbox.configure(state="normal")
+        self.compare_results_textbox.delete("1.0", "end")
+        self.compare_results_textbox.insert("1.0", text)
+        self.compare_results_textbox.configure(state="disabled")
+    
+    def compare_failed(self, error_msg: str):
+        self.compare_execute_btn.configure(state="normal")
+        self.set_compare_results("")
+        messagebox.showerror("Error", f"Failed to compare configs:\n{error_msg}")
+    
+    def show_compare_results(self, changes, new_path, old_digest, new_digest):
+        """Full results of a finished comparison, then offer to save the modified config"""
+        self.compare_execute_btn.configure(state="normal")
+        try:
             # Display results (enable textbox, update, then disable)
             self.compare_results_textbox.configure(state="normal")
             self.compare_results_textbox.delete("1.0", "end")
             
-            if not any([changes["added"], changes["removed"], changes["modified"]]):
+            if not any([changes["added"], changes["removed"], changes["modified"], changes["other"]]):
                 self.compare_results_textbox.insert("1.0", "No changes detected - files are identical\n")
             else:
                 result = "=" * 60 + "\n"
@@ -1148,6 +1305,36 @@ class FR4LeakingToolGUI(ctk.CTk):
                             result += f"  ... and {len(items) - 10} more\n"
                     result += "\n"
                 
+                # Modified items, field by field
+                if changes["modified"]:
+                    result += "MODIFIED ITEMS:\n"
+                    result += "-" * 60 + "\n"
+                    for section, items in changes["modified"].items():
+                        result += f"\n{section.upper()}:\n"
+                        for item_id, item_changes in list(items.items())[:10]:
+                            new_item = item_changes["new"]
+                            title = new_item.get('title', 'Unknown') if isinstance(new_item, dict) else 'Unknown'
+                            result += f"  [{item_id}] {title}\n"
+                            for op in item_changes["patch"][:5]:
+                                result += f"      {describe_operation(op, item_changes['old'])}\n"
+                            if len(item_changes["patch"]) > 5:
+                                result += f"      ... and {len(item_changes['patch']) - 5} more fields\n"
+                        if len(items) > 10:
+                            result += f"  ... and {len(items) - 10} more\n"
+                    result += "\n"
+                
+                # Sections that aren't item lists
+                if changes["other"]:
+                    result += "OTHER CHANGES:\n"
+                    result += "-" * 60 + "\n"
+                    for section, ops in changes["other"].items():
+                        result += f"\n{(section or 'document').upper()}:\n"
+                        for op in ops[:10]:
+                            result += f"  {describe_operation(op)}\n"
+                        if len(ops) > 10:
+                            result += f"  ... and {len(ops) - 10} more\n"
+                    result += "\n"
+                
                 self.compare_results_textbox.insert("1.0", result)
             
             # Disable textbox after updating
@@ -1156,8 +1343,6 @@ class FR4LeakingToolGUI(ctk.CTk):
             # Save modified config
             if messagebox.askyesno("Save Modified Config?", 
                     "Do you want to save a modified config with preOwned: true added to new items?"):
-                    modified_config = self.comparator.create_modified_config(new_config, changes)
-                    
                     save_path = filedialog.asksaveasfilename(
                         defaultextension=".json",
                         filetypes=[("JSON files", "*.json")],
@@ -1165,13 +1350,126 @@ class FR4LeakingToolGUI(ctk.CTk):
                     )
                     
                     if save_path:
-                        with open(save_path, 'w', encoding='utf-8') as f:
-                            json.dump(modified_config, f, indent=2, ensure_ascii=False)
+                        data = self.comparator.cached_artifact(
+                            old_digest, new_digest, f"modified_config-{self.comparator.owned_flag}.json",
+                            lambda: "".join(self.comparator.iter_modified_config(new_path, changes)).encode('utf-8')
+                        )
+                        with open(save_path, 'wb') as f:
+                            f.write(data)
                         messagebox.showinfo("Success", f"Modified config saved to:\n{save_path}")
                         
         except Exception as e:
             messagebox.showerror("Error", f"Failed to compare configs:\n{str(e)}")
             
+    def compare_folder_timeline(self):
+        """Compare every config version in a folder, oldest to newest by filename"""
+        folder = filedialog.askdirectory(title="Select Folder With Config Versions")
+        if not folder:
+            return
+        if len(folder_versions(folder)) < 2:
+            messagebox.showerror("Error", "The folder needs at least two .json config files!")
+            return
+            
+        self.compare_timeline_btn.configure(state="disabled")
+        self.set_compare_results("Comparing config versions...\n")
+        
+        def timeline_thread():
+            try:
+                timeline = self.timeline.diff_folder(folder)
+                
+                result = "=" * 60 + "\n"
+                result += f"TIMELINE: {len(timeline['labels'])} VERSIONS\n"
+                result += "=" * 60 + "\n\n"
+                
+                for step in timeline["steps"]:
+                    result += f"{step['from']} → {step['to']}:\n"
+                    for item in step["changes"]["summary"] or ["No changes"]:
+                        result += f"  • {item}\n"
+                    result += "\n"
+                
+                result += "-" * 60 + "\n"
+                result += f"OVERALL ({timeline['labels'][0]} → {timeline['labels'][-1]}):\n"
+                for item in timeline["cumulative"]["summary"] or ["No changes"]:
+                    result += f"  • {item}\n"
+                
+                self.after(0, lambda: self.set_compare_results(result))
+            except Exception as e:
+                error_msg = str(e)
+                self.after(0, lambda: self.set_compare_results(""))
+                self.after(0, lambda: messagebox.showerror("Error", f"Failed to compare config versions:\n{error_msg}"))
+            finally:
+                self.after(0, lambda: self.compare_timeline_btn.configure(state="normal"))
+        
+        threading.Thread(target=timeline_thread, daemon=True).start()
+            
+    def compare_data_folders(self):
+        """Compare two game_data folders file by file (storeConfig.json, BattlePass/*.json, ...)"""
+        old_root = filedialog.askdirectory(title="Select OLD Data Folder")
+        if not old_root:
+            return
+        new_root = filedialog.askdirectory(title="Select NEW Data Folder")
+        if not new_root:
+            return
+        
+        self.compare_tree_btn.configure(state="disabled")
+        self.set_compare_results("Comparing data folders...\n")
+        
+        def compare_thread():
+            try:
+                report = self.tree_diff.diff(old_root, new_root)
+                result = format_report(report)
+                self.after(0, lambda: self.set_compare_results(result))
+            except Exception as e:
+                error_msg = str(e)
+                self.after(0, lambda: messagebox.showerror("Error", f"Failed to compare data folders:\n{error_msg}"))
+            finally:
+                self.after(0, lambda: self.compare_tree_btn.configure(state="normal"))
+        
+        threading.Thread(target=compare_thread, daemon=True).start()
+    
+    def search_items(self):
+        """Search the selected config (or the newest stored storeConfig) by title words and fields"""
+        query = self.search_entry.get().strip()
+        if not query:
+            return
+        path = self.modify_config_path
+        
+        def search_thread():
+            try:
+                if path:
+                    # Re-index the selected file only when it changed
+                    source = (path, os.path.getmtime(path))
+                    if self.file_index_source != source:
+                        with open(path, 'rb') as f:
+                            config = json_codec.loads(f.read())
+                        self.file_index.rebuild(config, self.comparator.discover_sections(config))
+                        self.file_index_source = source
+                    index, origin = self.file_index, os.path.basename(path)
+                else:
+                    self.item_index.sync(self.snapshots, self.comparator)
+                    index, origin = self.item_index, "newest stored storeConfig"
+                total, results = index.search(query, 50)
+                
+                result = f"SEARCH: {query}\n"
+                result += f"{total} matches in {origin}" + (f" (showing first {len(results)})" if total > len(results) else "") + "\n\n"
+                for section, item_id, item in results:
+                    result += f"  [{item_id}] {item.get('title', 'Unknown')} ({section}, Rarity: {item.get('rarity', 'Unknown')})\n"
+                if not len(index):
+                    result += "No items indexed yet: select a config file above, or compare some configs first.\n"
+                self.after(0, lambda: self.set_modify_results(result))
+            except Exception as e:
+                error_msg = str(e)
+                self.after(0, lambda: messagebox.showerror("Error", f"Search failed:\n{error_msg}"))
+        
+        threading.Thread(target=search_thread, daemon=True).start()
+    
+    def set_modify_results(self, text: str):
+        """Replace the modify tab results text (the textbox stays read-only)"""
+        self.modify_results_textbox.configure(state="normal")
+        self.modify_results_textbox.delete("1.0", "end")
+        self.modify_results_textbox.insert("1.0", text)
+        self.modify_results_textbox.configure(state="disabled")
+    
     def modify_config(self):
         """Modify config by item IDs"""
         if not self.modify_config_path:
@@ -1183,69 +1481,81 @@ class FR4LeakingToolGUI(ctk.CTk):
             messagebox.showerror("Error", "Please enter item IDs!")
             return
             
-        try:
-            # Parse item IDs
-            if ',' in item_ids_str:
-                item_ids = [id.strip() for id in item_ids_str.split(',')]
-            else:
-                item_ids = item_ids_str.split()
-            
-            item_ids = [id for id in item_ids if id]
-            
-            if not item_ids:
-                messagebox.showerror("Error", "No valid item IDs provided!")
-                return
-            
-            # Load config
-            with open(self.modify_config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            
-            # Modify config
-            modified_config, modified_items, not_found = self.comparator.modify_config_by_ids(config, item_ids)
-            
-            # Display results (enable textbox, update, then disable)
-            self.modify_results_textbox.configure(state="normal")
-            self.modify_results_textbox.delete("1.0", "end")
-            
-            result = "=" * 60 + "\n"
-            result += "MODIFICATION RESULTS\n"
-            result += "=" * 60 + "\n\n"
-            
-            if modified_items:
-                result += f"Successfully modified {len(modified_items)} items:\n\n"
-                for item in modified_items[:20]:
-                    result += f"  • {item}\n"
-                if len(modified_items) > 20:
-                    result += f"  ... and {len(modified_items) - 20} more\n"
-                result += "\n"
-            
-            if not_found:
-                result += f"Warning: {len(not_found)} items not found:\n"
-                result += f"  {', '.join(not_found)}\n"
-            
-            self.modify_results_textbox.insert("1.0", result)
-            # Disable textbox after updating
-            self.modify_results_textbox.configure(state="disabled")
-            
-            # Save modified config
-            if modified_items:
-                if messagebox.askyesno("Save Modified Config?", 
-                    f"Successfully modified {len(modified_items)} items. Save the file?"):
-                    save_path = filedialog.asksaveasfilename(
-                        defaultextension=".json",
-                        filetypes=[("JSON files", "*.json")],
-                        initialfile="modified_storeConfig.json"
-                    )
-                    
-                    if save_path:
-                        with open(save_path, 'w', encoding='utf-8') as f:
-                            json.dump(modified_config, f, indent=2, ensure_ascii=False)
-                        messagebox.showinfo("Success", f"Modified config saved to:\n{save_path}")
-            else:
-                messagebox.showwarning("No Modifications", "No items were modified!")
+        # Parse item IDs
+        if ',' in item_ids_str:
+            item_ids = [id.strip() for id in item_ids_str.split(',')]
+        else:
+            item_ids = item_ids_str.split()
+        
+        item_ids = [id for id in item_ids if id]
+        
+        if not item_ids:
+            messagebox.showerror("Error", "No valid item IDs provided!")
+            return
+        
+        path = self.modify_config_path
+        self.modify_execute_btn.configure(state="disabled")
+        self.set_modify_results("Modifying config...\n")
+        
+        def modify_thread():
+            try:
+                # Parsing a large config takes a while: keep it off the Tk main loop
+                with open(path, 'rb') as f:
+                    config = json_codec.loads(f.read())
+                modified_config, modified_items, not_found = self.comparator.modify_config_by_ids(config, item_ids)
+                self.after(0, lambda: self.show_modify_results(modified_config, modified_items, not_found))
+            except Exception as e:
+                error_msg = str(e)
+                self.after(0, lambda: self.set_modify_results(""))
+                self.after(0, lambda: messagebox.showerror("Error", f"Failed to modify config:\n{error_msg}"))
+            finally:
+                self.after(0, lambda: self.modify_execute_btn.configure(state="normal"))
+        
+        threading.Thread(target=modify_thread, daemon=True).start()
+    
+    def show_modify_results(self, modified_config, modified_items, not_found):
+        """Show what modify_config changed and offer to save the result"""
+        result = "=" * 60 + "\n"
+        result += "MODIFICATION RESULTS\n"
+        result += "=" * 60 + "\n\n"
+        
+        if modified_items:
+            result += f"Successfully modified {len(modified_items)} items:\n\n"
+            for item in modified_items[:20]:
+                result += f"  • {item}\n"
+            if len(modified_items) > 20:
+                result += f"  ... and {len(modified_items) - 20} more\n"
+            result += "\n"
+        
+        if not_found:
+            result += f"Warning: {len(not_found)} items not found:\n"
+            result += f"  {', '.join(not_found)}\n"
+        
+        self.set_modify_results(result)
+        
+        # Save modified config
+        if modified_items:
+            if messagebox.askyesno("Save Modified Config?", 
+                f"Successfully modified {len(modified_items)} items. Save the file?"):
+                save_path = filedialog.asksaveasfilename(
+                    defaultextension=".json",
+                    filetypes=[("JSON files", "*.json")],
+                    initialfile="modified_storeConfig.json"
+                )
                 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to modify config:\n{str(e)}")
+                if save_path:
+                    def save_thread():
+                        try:
+                            with open(save_path, 'wb') as f:
+                                f.write(json_codec.dumps(modified_config, indent=2, exact=True))
+                            self.after(0, lambda: messagebox.showinfo("Success", f"Modified config saved to:\n{save_path}"))
+                        except Exception as e:
+                            error_msg = str(e)
+                            self.after(0, lambda: messagebox.showerror("Error", f"Failed to save modified config:\n{error_msg}"))
+                    
+                    threading.Thread(target=save_thread, daemon=True).start()
+        else:
+            messagebox.showwarning("No Modifications", "No items were modified!")
             
     def refresh_logs(self):
         """Refresh log display"""
@@ -1294,6 +1604,7 @@ class FR4LeakingToolGUI(ctk.CTk):
     def on_closing(self):
         """Handle window closing"""
         self.auto_check_running = False
+        self.auto_check_stop.set()
         
         # Shutdown Discord bot if running
         if self.discord_bot and self.discord_enabled:
@@ -1305,6 +1616,16 @@ class FR4LeakingToolGUI(ctk.CTk):
             except:
                 pass
         
+        # Close the pooled store session and stop the monitor loop
+        if self.monitor_loop and self.monitor_loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self.monitor.close(), self.monitor_loop).result(timeout=5)
+            except Exception:
+                pass
+            self.monitor_loop.call_soon_threadsafe(self.monitor_loop.stop)
+        
+        self.comparator.close()
+        self.snapshots.close()
         self.destroy()
 
 def main():
@@ -1313,4 +1634,6 @@ def main():
     app.mainloop()
 
 if __name__ == "__main__":
+    # Needed for the comparator's worker processes in the frozen .exe
+    multiprocessing.freeze_support()
     main()
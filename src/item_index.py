@@ -0,0 +1,334 @@
+"""
+Item Index Module
+In-memory lookup of config items by id, title words and field values
+"""
+import re
+import bisect
+import logging
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger('funrun_monitor')
+
+# Item fields with a facet index (filter with field:value)
+FACET_FIELDS = ("rarity", "hidden", "currency", "type", "category")
+
+_WORD = re.compile(r'\w+')
+_NONZERO = re.compile(rb'[^\x00]')
+
+# int.bit_count() is Python 3.10+
+_popcount = getattr(int, 'bit_count', None) or (lambda bits: bin(bits).count('1'))
+
+ItemKey = Tuple[str, str]
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lowercase words of a title"""
+    return _WORD.findall(str(text).casefold())
+
+
+def facet_value(value: Any) -> str:
+    """Normalized facet key, so rarity:Epic, hidden:TRUE and price:100 match"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).casefold()
+
+
+def _reshaped(changes: Dict[str, Any], store, digest: str, comparator, indexed_sections: Iterable[str]) -> bool:
+    """
+    True if a section that was diffed field by field (changes["other"]) is indexed now
+    or would be in version `digest`: it turned into or out of an item map, which
+    ItemIndex.apply_changes() can't follow.
+    """
+    if not changes["other"]:
+        return False
+    manifest = store.manifest(digest)
+    if manifest['root'] is not None:
+        item_sections = set()
+    elif comparator.discover:
+        item_sections = set(manifest['items']) - set(manifest['mixed'])
+    else:
+        item_sections = set(comparator.sections_to_compare) & set(manifest['names'])
+    indexed_sections = set(indexed_sections)
+    return any(section == "" or section in indexed_sections or section in item_sections for section in changes["other"])
+
+
+def plan_sync(store, comparator, digest: Optional[str], indexed_sections: Iterable[str],
+              name: str = "storeConfig") -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    How an index at version `digest` (None: empty) holding `indexed_sections` catches up
+    with the newest stored version of a config.
+
+    Returns: None if it is current, else (newest digest, change set to apply, or None if
+        the index must be rebuilt from the whole version)
+    """
+    latest = store.versions(name, 1)
+    if not latest or latest[0]["digest"] == digest:
+        return None
+    newest = latest[0]["digest"]
+    if digest is None:
+        return newest, None
+    try:
+        changes = store.diff(digest, newest, comparator)
+    except KeyError:
+        logger.info(f"Indexed version {digest[:10]} is gone, rebuilding the item index")
+        return newest, None
+    if _reshaped(changes, store, newest, comparator, indexed_sections):
+        logger.info("A section changed between item map and plain value, rebuilding the item index")
+        return newest, None
+    return newest, changes
+
+
+class ItemIndex:
+    def __init__(self, facet_fields: Iterable[str] = FACET_FIELDS):
+        """
+        Indexes over the items of one config version.
+
+        Every item gets a slot number (in config order); posting lists are sets of slots,
+        turned into integer bitmaps on first query so that combining terms is a single
+        AND per term however many items match.
+
+        Args:
+            facet_fields: Item fields that can be filtered on with field:value
+        """
+        self.facet_fields = tuple(facet_fields)
+        self.keys: List[Optional[ItemKey]] = []
+        self.slots: Dict[ItemKey, int] = {}
+        self.items: Dict[ItemKey, Dict[str, Any]] = {}
+        self.by_id: Dict[str, List[str]] = {}
+        self.words: Dict[str, Set[int]] = {}
+        self.facets: Dict[str, Dict[str, Set[int]]] = {field: {} for field in self.facet_fields}
+        self.sections: Dict[str, Set[int]] = {}
+        # Snapshot digest this index reflects (see sync())
+        self.digest: Optional[str] = None
+        self.lock = threading.RLock()
+        self._bitmaps: Dict[Hashable, int] = {}
+        self._vocabulary: Optional[List[str]] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], sections: Iterable[str],
+                    facet_fields: Iterable[str] = FACET_FIELDS) -> 'ItemIndex':
+        """Index the given item sections of a loaded config"""
+        index = cls(facet_fields)
+        index.rebuild(config, sections)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def rebuild(self, config: Dict[str, Any], sections: Iterable[str]):
+        """Replace the whole index with the items of a loaded config"""
+        with self.lock:
+            self.keys.clear()
+            self.slots.clear()
+            self.items.clear()
+            self.by_id.clear()
+            self.words.clear()
+            self.facets = {field: {} for field in self.facet_fields}
+            self.sections.clear()
+            self._bitmaps.clear()
+            self._vocabulary = None
+            for section in sections:
+                for item_id, item in config.get(section, {}).items():
+                    if isinstance(item, dict):
+                        self.add(section, item_id, item)
+            self.digest = None
+
+    def _postings(self, section: str, item: Dict[str, Any]) -> Iterable[Tuple[Hashable, Set[int]]]:
+        """(bitmap cache key, posting set) of every index entry the item belongs to"""
+        yield ('section', section), self.sections.setdefault(section, set())
+        for word in set(tokenize(item.get("title", ""))):
+            yield ('word', word), self.words.setdefault(word, set())
+        for field in self.facet_fields:
+            if field in item:
+                value = facet_value(item[field])
+                yield ('facet', field, value), self.facets[field].setdefault(value, set())
+
+    def add(self, section: str, item_id: str, item: Dict[str, Any]):
+        """Index one item (replacing any previous version of it)"""
+        with self.lock:
+            key = (section, item_id)
+            slot = self.slots.get(key)
+            if slot is not None:
+                # A changed item keeps its place in the result order
+                self.remove(section, item_id)
+            else:
+                slot = len(self.keys)
+                self.keys.append(None)
+            self.keys[slot] = key
+            self.slots[key] = slot
+            self.items[key] = item
+            self.by_id.setdefault(item_id, []).append(section)
+            for cache_key, slots in self._postings(section, item):
+                if not slots and cache_key[0] == 'word':
+                    self._vocabulary = None
+                slots.add(slot)
+                self._bitmaps.pop(cache_key, None)
+
+    def remove(self, section: str, item_id: str):
+        """Drop one item from the index, if present"""
+        with self.lock:
+            key = (section, item_id)
+            item = self.items.pop(key, None)
+            if item is None:
+                return
+            slot = self.slots.pop(key)
+            self.keys[slot] = None
+            sections = self.by_id.get(item_id, [])
+            if section in sections:
+                sections.remove(section)
+            if not sections:
+                self.by_id.pop(item_id, None)
+            for cache_key, slots in self._postings(section, item):
+                slots.discard(slot)
+                self._bitmaps.pop(cache_key, None)
+                if not slots:
+                    if cache_key[0] == 'word':
+                        del self.words[cache_key[1]]
+                        self._vocabulary = None
+                    elif cache_key[0] == 'facet':
+                        del self.facets[cache_key[1]][cache_key[2]]
+                    else:
+                        del self.sections[section]
+
+    def apply_changes(self, changes: Dict[str, Any]):
+        """Move the index to a newer version using a ConfigComparator change set"""
+        with self.lock:
+            for section, items in changes["removed"].items():
+                for item_id in items:
+                    self.remove(section, item_id)
+            for section, items in changes["modified"].items():
+                for item_id, item_changes in items.items():
+                    if isinstance(item_changes["new"], dict):
+                        self.add(section, item_id, item_changes["new"])
+            for section, items in changes["added"].items():
+                for item_id, item in items.items():
+                    if isinstance(item, dict):
+                        self.add(section, item_id, item)
+
+    def sync(self, store, comparator, name: str = "storeConfig") -> bool:
+        """
+        Follow the newest stored version of a config. The first call indexes it in full;
+        later calls only apply the diff from the indexed version, which the snapshot
+        store computes from item hashes.
+
+        Returns: True if the index changed
+        """
+        with self.lock:
+            update = plan_sync(store, comparator, self.digest, self.sections, name)
+            if update is None:
+                return False
+            digest, changes = update
+            if changes is not None:
+                self.apply_changes(changes)
+            else:
+                config = store.load(digest)
+                self.rebuild(config, comparator.discover_sections(config) if isinstance(config, dict) else [])
+            self.digest = digest
+        logger.info(f"Item index now at {name} {digest[:10]} ({len(self.items)} items)")
+        return True
+
+    def replace(self, other: 'ItemIndex'):
+        """Take over the contents of another index, e.g. one built in a worker process"""
+        with self.lock:
+            self.__dict__.update(other.__getstate__())
+            self._bitmaps = {}
+            self._vocabulary = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The lock can't be pickled, and the bitmaps are rebuilt on demand
+        state = self.__dict__.copy()
+        for transient in ('lock', '_bitmaps', '_vocabulary'):
+            state.pop(transient, None)
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self._bitmaps = {}
+        self._vocabulary = None
+
+    def lookup(self, item_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """(section, item) for every section holding this id"""
+        with self.lock:
+            return [(section, self.items[(section, item_id)]) for section in self.by_id.get(item_id, [])]
+
+    def _bitmap(self, cache_key: Hashable, slots: Set[int]) -> int:
+        bits = self._bitmaps.get(cache_key)
+        if bits is None:
+            data = bytearray((len(self.keys) + 7) // 8)
+            for slot in slots:
+                data[slot >> 3] |= 1 << (slot & 7)
+            bits = int.from_bytes(data, 'little')
+            self._bitmaps[cache_key] = bits
+        return bits
+
+    def _prefix_bitmap(self, prefix: str) -> int:
+        """Items with a title word starting with prefix"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.words)
+        bits = 0
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(prefix):
+                break
+            bits |= self._bitmap(('word', word), self.words[word])
+        return bits
+
+    def search(self, query: str, limit: int = 25) -> Tuple[int, List[Tuple[str, str, Dict[str, Any]]]]:
+        """
+        Find items matching every term of a query:
+            words            title words (the last one may be a prefix: "golden dra")
+            field:value      facet filters, e.g. rarity:epic hidden:true
+            section:name     only items of one section
+            id:2050          one item id
+
+        Returns: (total matches, up to `limit` of them as (section, id, item) in config order,
+            with items added since the last full build at the end)
+        """
+        terms = query.split()
+        with self.lock:
+            bitmaps = []
+            for position, term in enumerate(terms):
+                field, _, value = term.partition(':')
+                field = field.casefold()
+                if value and field == 'id':
+                    slots = {self.slots[(section, value)] for section in self.by_id.get(value, [])}
+                    bitmaps.append(sum(1 << slot for slot in slots))
+                elif value and field == 'section':
+                    bitmaps.append(self._bitmap(('section', value), self.sections.get(value, set())))
+                elif value and field in self.facets:
+                    value = facet_value(value)
+                    bitmaps.append(self._bitmap(('facet', field, value), self.facets[field].get(value, set())))
+                else:
+                    words = tokenize(term)
+                    for word_position, word in enumerate(words):
+                        if position == len(terms) - 1 and word_position == len(words) - 1:
+                            bitmaps.append(self._prefix_bitmap(word))
+                        else:
+                            bitmaps.append(self._bitmap(('word', word), self.words.get(word, set())))
+            if not bitmaps:
+                return 0, []
+
+            matches = bitmaps[0]
+            for bits in bitmaps[1:]:
+                matches &= bits
+            if not matches:
+                return 0, []
+
+            # Lowest slots first: find the non-zero bytes, then their set bits
+            found = []
+            data = matches.to_bytes((matches.bit_length() + 7) // 8, 'little')
+            for match in _NONZERO.finditer(data):
+                byte, base = data[match.start()], match.start() * 8
+                while byte and len(found) < limit:
+                    low = byte & -byte
+                    found.append(base + low.bit_length() - 1)
+                    byte ^= low
+                if len(found) >= limit:
+                    break
+            results = []
+            for slot in found:
+                section, item_id = self.keys[slot]
+                results.append((section, item_id, self.items[(section, item_id)]))
+            return _popcount(matches), results
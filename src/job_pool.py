@@ -0,0 +1,352 @@
+"""
+Job Pool Module
+CPU-heavy config work (compare, modify, serialize, snapshot storage) in worker processes, with timeouts and cancellation
+"""
+import os
+import sys
+import json
+import queue
+import pickle
+import asyncio
+import logging
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from config_comparator import ConfigComparator
+from config_fingerprint import FingerprintCache
+from config_timeline import ConfigTimeline
+from diff_cache import DiffCache
+from item_index import ItemIndex, plan_sync
+from output_delivery import DEFAULT_UPLOAD_LIMIT, Upload, package_file, zip_chunks
+from snapshot_store import SnapshotStore
+import json_codec
+
+logger = logging.getLogger('funrun_monitor')
+
+ProgressCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Worker process state: progress queue, the running job's token, comparators by options and snapshot stores by root
+_progress_queue = None
+_job_token = None
+_comparators: Dict[str, ConfigComparator] = {}
+_stores: Dict[str, SnapshotStore] = {}
+
+
+class JobTimeout(Exception):
+    """Raised when a job runs longer than its timeout (its worker process is stopped)"""
+
+
+class JobDecodeError(ValueError):
+    """
+    A job's input wasn't valid JSON. Raised instead of json.JSONDecodeError and
+    UnicodeDecodeError, which hold the whole input and would be copied back from the worker.
+    """
+
+    def __init__(self, msg: str, lineno: Optional[int] = None, colno: Optional[int] = None):
+        super().__init__(msg, lineno, colno)
+        self.msg = msg
+        self.lineno = lineno
+        self.colno = colno
+
+    def __str__(self) -> str:
+        if self.lineno is None:
+            return self.msg
+        return f"{self.msg}: line {self.lineno} column {self.colno}"
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _run_job(token: int, func: Callable, args: Tuple) -> Any:
+    global _job_token
+    _job_token = token
+    try:
+        return func(*args)
+    except json.JSONDecodeError as e:
+        raise JobDecodeError(e.msg, e.lineno, e.colno) from None
+    except UnicodeDecodeError as e:
+        raise JobDecodeError(f"Invalid {e.encoding} at byte {e.start} ({e.reason})") from None
+    finally:
+        _job_token = None
+
+
+def report(event: Dict[str, Any]):
+    """Send a progress event from a running job to its JobPool.run() caller"""
+    if _progress_queue is not None and _job_token is not None:
+        _progress_queue.put((_job_token, event))
+
+
+def comparator_options(comparator: ConfigComparator) -> Dict[str, Any]:
+    """Everything a worker needs to rebuild an equivalent comparator (sharing its on-disk caches)"""
+    return {
+        "owned_flag": comparator.owned_flag,
+        "discover": comparator.discover,
+        "sections": list(comparator.sections_to_compare),
+        "fingerprint_dir": comparator.fingerprint_cache.cache_dir if comparator.fingerprint_cache else None,
+        "diff_cache_dir": comparator.diff_cache.cache_dir if comparator.diff_cache else None,
+        "diff_cache_bytes": comparator.diff_cache.max_bytes if comparator.diff_cache else None
+    }
+
+
+def worker_comparator(options: Dict[str, Any]) -> ConfigComparator:
+    """The worker's comparator for these options, built on first use"""
+    key = json.dumps(options, sort_keys=True)
+    comparator = _comparators.get(key)
+    if comparator is None:
+        comparator = ConfigComparator(
+            owned_flag=options["owned_flag"],
+            fingerprint_cache=FingerprintCache(options["fingerprint_dir"]) if options["fingerprint_dir"] else None,
+            diff_cache=DiffCache(options["diff_cache_dir"], options["diff_cache_bytes"]) if options["diff_cache_dir"] else None,
+            discover_sections=options["discover"],
+            # Already in a worker: never start a nested pool
+            parallel_threshold=sys.maxsize
+        )
+        comparator.sections_to_compare = list(options["sections"])
+        _comparators[key] = comparator
+    return comparator
+
+
+def worker_store(root: str) -> SnapshotStore:
+    """The worker's connection to the snapshot store at `root`, opened on first use"""
+    store = _stores.get(root)
+    if store is None:
+        store = _stores[root] = SnapshotStore(root)
+    return store
+
+
+def compare_job(old_content: bytes, new_content: bytes, options: Dict[str, Any],
+                old_digest: Optional[str] = None, new_digest: Optional[str] = None,
+                preview: int = 5) -> bytes:
+    """
+    compare_config_streams in a worker. Progress events and the first `preview` changes
+    are reported as they're found (see ConfigComparator.iter_changes).
+    Returns: the change set as compact JSON
+    """
+    comparator = worker_comparator(options)
+    shown = 0
+    for event in comparator.iter_changes(old_content, new_content, old_digest, new_digest):
+        if event["event"] == "done":
+            return json_codec.dumps(event["changes"])
+        if event["event"] == "progress":
+            report(event)
+        elif shown < preview:
+            shown += 1
+            report({key: event[key] for key in ("event", "type", "section", "id", "counts")})
+
+
+def output_files_job(new_content: bytes, changes_json: bytes, options: Dict[str, Any],
+                     old_digest: str, new_digest: str, upload_limit: int = DEFAULT_UPLOAD_LIMIT) -> List[Upload]:
+    """
+    Modified config (new items flagged) and JSON Patch for a comparison, packed for upload
+    (see output_delivery.package_file). Both are zipped while being serialized, and the
+    archives are reused from the diff cache when the pair was seen before.
+    Returns: [(filename, data)] to upload
+    """
+    comparator = worker_comparator(options)
+    changes = json_codec.loads(changes_json)
+
+    def modified_config() -> bytes:
+        # Re-serialize the new config item by item, straight into the archive
+        return zip_chunks("modified_config.json", comparator.iter_modified_config(new_content, changes))
+
+    def patch() -> bytes:
+        return zip_chunks("config_changes.patch.json", [json_codec.dumps(comparator.export_patch(changes), indent=2)])
+
+    modified_archive = comparator.cached_artifact(old_digest, new_digest, f"modified_config-{comparator.owned_flag}.json.zip", modified_config)
+    patch_archive = comparator.cached_artifact(old_digest, new_digest, "config_changes.patch.json.zip", patch)
+    return package_file(
+        "modified_config.json", modified_archive, upload_limit,
+        compact=lambda: json_codec.dumps(comparator.create_modified_config(json_codec.loads(new_content), changes), exact=True)
+    ) + package_file(
+        "config_changes.patch.json", patch_archive, upload_limit,
+        compact=lambda: json_codec.dumps(comparator.export_patch(changes))
+    )
+
+
+def timeline_job(contents: Sequence[bytes], labels: Sequence[str], options: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """
+    ConfigTimeline.diff_sources in a worker.
+    Returns: (the whole timeline, its cumulative change set), each as compact JSON
+    """
+    timeline = ConfigTimeline(worker_comparator(options), parallel_min_bytes=sys.maxsize).diff_sources(contents, labels)
+    return json_codec.dumps(timeline), json_codec.dumps(timeline["cumulative"])
+
+
+def modify_ids_job(content: bytes, item_ids: Sequence[str], options: Dict[str, Any],
+                   upload_limit: int = DEFAULT_UPLOAD_LIMIT) -> Tuple[List[Upload], List[Tuple[str, str, str]], List[str]]:
+    """
+    Set the owned flag on the given item ids, in every item section of a config.
+    Returns: (modified config packed for upload, or [] if nothing matched,
+        [(id, title, section)] modified, ids not found)
+    """
+    comparator = worker_comparator(options)
+    config_data = json_codec.loads(content)
+    modified_items, not_found_items = comparator.flag_items(config_data, item_ids)
+    files = []
+    if modified_items:
+        # exact: the same bytes as !compare and the GUI write, whichever JSON backend is installed
+        archive = zip_chunks("modified_config.json", [json_codec.dumps(config_data, indent=2, exact=True)])
+        files = package_file("modified_config.json", archive, upload_limit, compact=lambda: json_codec.dumps(config_data, exact=True))
+    return files, modified_items, not_found_items
+
+
+def ingest_job(store_root: str, contents: Sequence[bytes], names: Sequence[str]) -> List[str]:
+    """
+    SnapshotStore.ingest in a worker, for each content with its series name.
+    Returns: the digests
+    """
+    store = worker_store(store_root)
+    return [store.ingest(content, name) for content, name in zip(contents, names)]
+
+
+def snapshot_diff_job(store_root: str, refs: Sequence[str], options: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """
+    Diff stored versions in a worker: SnapshotStore.diff for two refs, a timeline
+    (ConfigTimeline.diff_snapshots) for more.
+    Returns: (the change set or timeline as compact JSON, the overall JSON Patch, indented)
+    """
+    store = worker_store(store_root)
+    comparator = worker_comparator(options)
+    if len(refs) > 2:
+        result = ConfigTimeline(comparator, parallel_min_bytes=sys.maxsize).diff_snapshots(store, refs)
+        changes = result["cumulative"]
+    else:
+        result = changes = store.diff(refs[0], refs[1], comparator)
+    return json_codec.dumps(result), json_codec.dumps(comparator.export_patch(changes), indent=2)
+
+
+def index_sync_job(store_root: str, options: Dict[str, Any], digest: Optional[str], indexed_sections: Sequence[str],
+                   facet_fields: Sequence[str], name: str = "storeConfig") -> Optional[Tuple[str, str, bytes]]:
+    """
+    The work of ItemIndex.sync() for an index at version `digest`, in a worker.
+    Returns: None if the index is current, else (newest digest, 'changes', change set as compact JSON)
+        to apply, or (newest digest, 'index', the rebuilt ItemIndex pickled)
+    """
+    store = worker_store(store_root)
+    comparator = worker_comparator(options)
+    update = plan_sync(store, comparator, digest, indexed_sections, name)
+    if update is None:
+        return None
+    newest, changes = update
+    if changes is not None:
+        return newest, 'changes', json_codec.dumps(changes)
+    config = store.load(newest)
+    index = ItemIndex.from_config(config, comparator.discover_sections(config) if isinstance(config, dict) else [], facet_fields)
+    return newest, 'index', pickle.dumps(index, pickle.HIGHEST_PROTOCOL)
+
+
+Worker = Tuple[ProcessPoolExecutor, Any]
+
+
+class JobPool:
+    def __init__(self, max_workers: Optional[int] = None, timeout: float = 300.0, poll_interval: float = 0.25):
+        """
+        Worker processes for CPU-heavy jobs, so the event loop (and the Discord gateway
+        heartbeat) keeps running while large files are compared.
+
+        Every worker is a single-process executor of its own: a job that times out or is
+        cancelled is stopped by ending just its process, without failing other jobs.
+        Jobs beyond max_workers wait for a free worker.
+
+        Args:
+            max_workers: Jobs running at once (defaults to the CPU count, at most 4)
+            timeout: Default seconds a job may run
+            poll_interval: Seconds between checks for progress events
+        """
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.idle: List[Worker] = []
+        self.workers: Set[Worker] = set()
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.tokens = itertools.count(1)
+
+    def _start_worker(self) -> Worker:
+        progress_queue = multiprocessing.Queue()
+        executor = ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(progress_queue,))
+        worker = (executor, progress_queue)
+        self.workers.add(worker)
+        return worker
+
+    def _stop_worker(self, worker: Worker):
+        executor, progress_queue = worker
+        self.workers.discard(worker)
+        # A call that is already running can't be cancelled: end the worker process itself
+        terminate = getattr(executor, 'terminate_workers', None)
+        if terminate:
+            terminate()
+        else:
+            for process in list((getattr(executor, '_processes', None) or {}).values()):
+                process.terminate()
+            executor.shutdown(wait=False, cancel_futures=True)
+        progress_queue.close()
+
+    @staticmethod
+    def _events(progress_queue, token: int) -> List[Dict[str, Any]]:
+        """Progress events of job `token` waiting in a worker's queue"""
+        events = []
+        while True:
+            try:
+                event_token, event = progress_queue.get_nowait()
+            except queue.Empty:
+                return events
+            if event_token == token:
+                events.append(event)
+
+    async def run(self, func: Callable, *args: Any, timeout: Optional[float] = None,
+                  on_progress: Optional[ProgressCallback] = None) -> Any:
+        """
+        Run func(*args) in a worker process. func, args and the result must be picklable,
+        so pass and return bytes rather than large object trees.
+
+        Args:
+            timeout: Seconds before the job is stopped and JobTimeout raised (default: self.timeout)
+            on_progress: Awaited with every event the job report()s, while it runs
+
+        Cancelling the awaiting task stops the job's worker process as well.
+        """
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(self.max_workers)
+        timeout = timeout or self.timeout
+        async with self.slots:
+            worker = self.idle.pop() if self.idle else self._start_worker()
+            executor, progress_queue = worker
+            token = next(self.tokens)
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            try:
+                future = asyncio.wrap_future(executor.submit(_run_job, token, func, args))
+            except BrokenProcessPool:
+                self._stop_worker(worker)
+                raise
+            try:
+                while not future.done():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        raise JobTimeout(f"{func.__name__} took longer than {timeout:g}s")
+                    await asyncio.wait({future}, timeout=min(self.poll_interval, remaining) if on_progress else remaining)
+                    if on_progress:
+                        for event in self._events(progress_queue, token):
+                            await on_progress(event)
+                result = future.result()
+            except BaseException as e:
+                if not future.done() or isinstance(e, BrokenProcessPool):
+                    logger.warning(f"Stopping worker for {func.__name__}: {type(e).__name__}")
+                    future.cancel()
+                    self._stop_worker(worker)
+                else:
+                    self.idle.append(worker)
+                raise
+            self.idle.append(worker)
+            return result
+
+    def close(self):
+        """Stop every worker process, including running jobs"""
+        for worker in list(self.workers):
+            self._stop_worker(worker)
+        self.idle.clear()
@@ -0,0 +1,154 @@
+"""
+Job Queue Module
+Admission control for heavy bot commands: bounded concurrency, per-user and per-channel limits, small jobs first
+"""
+import time
+import asyncio
+import logging
+import itertools
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable, List, Optional
+
+logger = logging.getLogger('funrun_monitor')
+
+# Called with (position in the queue, jobs running) whenever a waiting job's position changes
+PositionCallback = Callable[[int, int], Awaitable[None]]
+
+
+class QueueFull(Exception):
+    """Raised when a user already has the maximum number of jobs waiting"""
+
+
+class JobTicket:
+    __slots__ = ('user', 'channel', 'size', 'seq', 'queued_at', 'granted', 'released', 'wake')
+
+    def __init__(self, user: Hashable, channel: Hashable, size: int, seq: int):
+        self.user = user
+        self.channel = channel
+        self.size = size
+        self.seq = seq
+        self.queued_at = time.monotonic()
+        self.granted = False
+        self.released = False
+        self.wake = asyncio.Event()
+
+
+class JobQueue:
+    def __init__(self, max_running: int = 2, per_user: int = 1, per_channel: int = 2, max_waiting_per_user: int = 3,
+                 small_job_bytes: int = 8 * 1024 * 1024, max_priority_wait: float = 60.0):
+        """
+        Decides when each heavy command may start, so a burst of uploads queues up
+        instead of every job slowing down together.
+
+        Waiting jobs start in order of arrival, except that small jobs (inputs up to
+        small_job_bytes) go ahead of large ones. A large job that has waited
+        max_priority_wait seconds is no longer passed by small ones.
+
+        Args:
+            max_running: Jobs running at once
+            per_user: Jobs of one user running at once
+            per_channel: Jobs of one channel running at once
+            max_waiting_per_user: Further jobs of a user are refused with QueueFull
+            small_job_bytes: Jobs with at most this many input bytes get priority
+            max_priority_wait: Seconds after which a large job keeps its place
+        """
+        self.max_running = max_running
+        self.per_user = per_user
+        self.per_channel = per_channel
+        self.max_waiting_per_user = max_waiting_per_user
+        self.small_job_bytes = small_job_bytes
+        self.max_priority_wait = max_priority_wait
+        self.waiting: List[JobTicket] = []
+        self.running = 0
+        self.running_by_user: Counter = Counter()
+        self.running_by_channel: Counter = Counter()
+        self.seq = itertools.count()
+
+    def _order(self) -> List[JobTicket]:
+        """Waiting jobs in the order they would start, limits permitting"""
+        now = time.monotonic()
+        return sorted(self.waiting, key=lambda ticket: (
+            0 if ticket.size <= self.small_job_bytes or now - ticket.queued_at >= self.max_priority_wait else 1,
+            ticket.seq
+        ))
+
+    def position(self, ticket: JobTicket) -> int:
+        """1-based place of a waiting job in the queue (0 once it may start)"""
+        if ticket.granted:
+            return 0
+        return self._order().index(ticket) + 1
+
+    def _dispatch(self):
+        """Start every waiting job the limits allow, then let all waiters re-check their position"""
+        for ticket in self._order():
+            if self.running >= self.max_running:
+                break
+            if self.running_by_user[ticket.user] >= self.per_user or self.running_by_channel[ticket.channel] >= self.per_channel:
+                continue
+            self.waiting.remove(ticket)
+            ticket.granted = True
+            self.running += 1
+            self.running_by_user[ticket.user] += 1
+            self.running_by_channel[ticket.channel] += 1
+            logger.debug(f"Job of {ticket.user} started after {time.monotonic() - ticket.queued_at:.1f}s in the queue")
+            ticket.wake.set()
+        for ticket in self.waiting:
+            ticket.wake.set()
+
+    async def acquire(self, user: Hashable, channel: Hashable, size: int = 0,
+                      on_position: Optional[PositionCallback] = None) -> JobTicket:
+        """
+        Wait until a job may start. Pass the returned ticket to release() when it's done.
+
+        Args:
+            size: Input bytes of the job (for small-job priority)
+            on_position: Awaited with (position, running jobs) while the job waits, whenever its position changes
+        """
+        if sum(1 for ticket in self.waiting if ticket.user == user) >= self.max_waiting_per_user:
+            raise QueueFull(f"You already have {self.max_waiting_per_user} jobs waiting, please wait for them to finish")
+
+        ticket = JobTicket(user, channel, size, next(self.seq))
+        self.waiting.append(ticket)
+        self._dispatch()
+        shown = None
+        try:
+            while True:
+                ticket.wake.clear()
+                if ticket.granted:
+                    return ticket
+                position = self.position(ticket)
+                if on_position and position != shown:
+                    shown = position
+                    await on_position(position, self.running)
+                await ticket.wake.wait()
+        except BaseException:
+            if ticket.granted:
+                self.release(ticket)
+            else:
+                self.waiting.remove(ticket)
+                self._dispatch()
+            raise
+
+    def release(self, ticket: JobTicket):
+        """A job has finished: let the next ones start"""
+        if not ticket.granted or ticket.released:
+            return
+        ticket.released = True
+        self.running -= 1
+        self.running_by_user[ticket.user] -= 1
+        self.running_by_channel[ticket.channel] -= 1
+        # Drop zero counts, so users and channels seen once don't accumulate
+        self.running_by_user += Counter()
+        self.running_by_channel += Counter()
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user: Hashable, channel: Hashable, size: int = 0,
+                   on_position: Optional[PositionCallback] = None) -> AsyncIterator[JobTicket]:
+        """acquire() and release() around a block"""
+        ticket = await self.acquire(user, channel, size, on_position)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
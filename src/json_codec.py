@@ -0,0 +1,60 @@
+"""
+JSON Codec Module
+Whole-document JSON parsing from bytes and serialization to bytes, using orjson when it is installed
+"""
+import json
+import codecs
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Backend used by the fast paths: 'orjson' when installed, else the standard library
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+JSONData = Union[bytes, bytearray, memoryview, str]
+
+
+def loads(data: JSONData) -> Any:
+    """Decode a JSON document from UTF-8 bytes or text (a leading BOM is ignored)"""
+    if isinstance(data, str):
+        if data.startswith('\ufeff'):
+            data = data[1:]
+    else:
+        data = memoryview(data)
+        if data[:3] == codecs.BOM_UTF8:
+            data = data[3:]
+
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity, integers beyond 64 bits and lone surrogates are only
+            # accepted by the standard library (which also reports real syntax errors)
+            pass
+    if not isinstance(data, str):
+        data = str(data, 'utf-8')
+    return json.loads(data)
+
+
+def dumps(value: Any, indent: Optional[int] = None, exact: bool = False) -> bytes:
+    """
+    Encode a value as UTF-8 JSON with non-ASCII characters left unescaped.
+
+    Args:
+        value: JSON-compatible value
+        indent: None for the compact layout (',' and ':' separators), or spaces per level
+        exact: Always match json.dumps(value, indent=indent, ensure_ascii=False) byte for byte.
+            Otherwise orjson is used when available; its output only differs in how some
+            floats are spelled (1e-05 vs 1e-5), and non-finite floats become null.
+    """
+    if orjson is not None and not exact and indent in (None, 2):
+        try:
+            return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent == 2 else 0)
+        except TypeError:
+            # Non-string keys, integers beyond 64 bits, ...: left to the standard library
+            pass
+    separators = (',', ':') if indent is None else None
+    return json.dumps(value, indent=indent, separators=separators, ensure_ascii=False).encode('utf-8')
@@ -1,17 +1,36 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import requests
 import io
-import difflib
+import time
 from datetime import datetime, timezone
 import logging
 from logging.handlers import RotatingFileHandler
 from typing import Dict, List, Tuple, Optional, Any
 import os
 import json
+import pickle
 import aiohttp
-from google_play_scraper import app
+from update_monitor import StoreMonitor, MonitorTarget
+from poll_scheduler import PollScheduler
+from config_comparator import ConfigComparator
+from config_fingerprint import FingerprintCache, content_hash
+from config_patch import describe_operation
+from snapshot_store import SnapshotStore, snapshot_name
+from config_timeline import ConfigTimeline
+from diff_view import DiffPageView
+from diff_cache import DiffCache
+from item_index import ItemIndex
+from attachment_ingest import AttachmentIngest, UploadRejected
+from output_delivery import DEFAULT_UPLOAD_LIMIT, Upload, group_uploads, split_note
+from job_queue import JobQueue, JobTicket, QueueFull
+from notification_dispatcher import NotificationDispatcher
+from job_pool import (
+    JobPool, JobDecodeError, JobTimeout, comparator_options, compare_job, output_files_job, timeline_job, modify_ids_job,
+    ingest_job, snapshot_diff_job, index_sync_job
+)
+import json_codec
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -61,348 +80,104 @@ intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix='!', intents=intents)
 
-class StoreMonitor:
-    def __init__(self, package_name: str, app_store_id: Optional[str] = None):
-        """
-        Initialize the store monitor.
-        
-        Args:
-            package_name: Google Play package name (e.g., 'com.dirtybit.fire')
-            app_store_id: iOS App Store ID (optional, e.g., '1503294866')
-        """
-        self.version_file = "version_data.json"
-        self.package_name = package_name
-        self.app_store_id = app_store_id
-        self.current_versions = {
-            'play_store': None,
-            'app_store': None
-        }
-        self.last_check = None
-        self.load_version_data()
-    
-    def load_version_data(self):
-        """Load the last known versions from disk"""
-        try:
-            if os.path.exists(self.version_file):
-                with open(self.version_file, 'r') as f:
-                    data = json.load(f)
-                    self.current_versions = data.get('versions', {
-                        'play_store': None,
-                        'app_store': None
-                    })
-                    self.last_check = data.get('last_check')
-                    logger.info(f"Loaded version data: Play Store={self.current_versions.get('play_store')}, App Store={self.current_versions.get('app_store')} (last check: {self.last_check})")
-            else:
-                logger.info("No version data file found, starting fresh")
-        except Exception as e:
-            logger.error(f"Error loading version data: {str(e)}")
-    
-    def save_version_data(self):
-        """Save the current version data to disk"""
-        try:
-            data = {
-                'versions': self.current_versions,
-                'last_check': datetime.now(timezone.utc).isoformat()
-            }
-            with open(self.version_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Saved version data: {self.current_versions}")
-        except Exception as e:
-            logger.error(f"Error saving version data: {str(e)}")
-    
-    async def get_play_store_version(self) -> Optional[str]:
-        """Get the current version from Google Play Store"""
-        try:
-            result = app(self.package_name, lang='en', country='us')
-            version = result.get('version')
-            logger.info(f"Play Store version: {version}")
-            return version
-        except Exception as e:
-            logger.error(f"Error getting Play Store version: {str(e)}")
-            return None
-    
-    async def get_app_store_version(self) -> Optional[str]:
-        """Get the current version from iOS App Store"""
-        if not self.app_store_id:
-            return None
-        
-        try:
-            url = f"https://itunes.apple.com/lookup?id={self.app_store_id}"
-            headers = {
-                'Accept': 'application/json',
-                'User-Agent': 'Mozilla/5.0'
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status != 200:
-                        logger.warning(f"Failed to fetch from App Store. Status: {response.status}")
-                        return None
-                    
-                    # Force reading as JSON regardless of content-type
-                    data = await response.json(content_type=None)
-                    
-                    if data.get('resultCount', 0) > 0:
-                        version = data['results'][0].get('version')
-                        logger.info(f"App Store version: {version}")
-                        return version
-                    else:
-                        logger.warning("No results found for App Store ID")
-                        return None
-        except Exception as e:
-            logger.error(f"Error getting App Store version: {str(e)}")
-            return None
-    
-    async def check_store_updates(self) -> dict:
-        """
-        Check both stores for updates.
-        Returns: dict with update information for each store
-        """
-        results = {
-            'play_store': {'has_update': False, 'new_version': None, 'info': None},
-            'app_store': {'has_update': False, 'new_version': None, 'info': None}
-        }
-        
-        # Check Play Store
-        play_version = await self.get_play_store_version()
-        if play_version:
-            if self.current_versions['play_store'] is None:
-                # First time detection
-                self.current_versions['play_store'] = play_version
-                results['play_store'] = {
-                    'has_update': False,
-                    'new_version': play_version,
-                    'info': f"Initial Play Store version detected: {play_version}"
-                }
-                logger.info(f"Initial Play Store version detected: {play_version}")
-            elif play_version != self.current_versions['play_store']:
-                # New version detected
-                old_version = self.current_versions['play_store']
-                self.current_versions['play_store'] = play_version
-                results['play_store'] = {
-                    'has_update': True,
-                    'new_version': play_version,
-                    'info': f"Play Store version updated from {old_version} to {play_version}"
-                }
-                logger.info(f"New Play Store version detected: {old_version} -> {play_version}")
-            else:
-                results['play_store'] = {
-                    'has_update': False,
-                    'new_version': play_version,
-                    'info': "No Play Store update available"
-                }
-        else:
-            results['play_store']['info'] = "Could not retrieve Play Store version"
-        
-        # Check App Store
-        if self.app_store_id:
-            app_version = await self.get_app_store_version()
-            if app_version:
-                if self.current_versions['app_store'] is None:
-                    # First time detection
-                    self.current_versions['app_store'] = app_version
-                    results['app_store'] = {
-                        'has_update': False,
-                        'new_version': app_version,
-                        'info': f"Initial App Store version detected: {app_version}"
-                    }
-                    logger.info(f"Initial App Store version detected: {app_version}")
-                elif app_version != self.current_versions['app_store']:
-                    # New version detected
-                    old_version = self.current_versions['app_store']
-                    self.current_versions['app_store'] = app_version
-                    results['app_store'] = {
-                        'has_update': True,
-                        'new_version': app_version,
-                        'info': f"App Store version updated from {old_version} to {app_version}"
-                    }
-                    logger.info(f"New App Store version detected: {old_version} -> {app_version}")
-                else:
-                    results['app_store'] = {
-                        'has_update': False,
-                        'new_version': app_version,
-                        'info': "No App Store update available"
-                    }
-            else:
-                results['app_store']['info'] = "Could not retrieve App Store version"
-        
-        # Save version data after checking
-        self.save_version_data()
-        
-        return results
-    
-    async def check_update(self) -> Tuple[bool, Optional[str], Optional[str]]:
-        """
-        Legacy method to maintain compatibility with old code.
-        Checks Play Store only and returns in the old format.
-        Returns: (has_update, new_version, update_info)
-        """
-        play_version = await self.get_play_store_version()
-        
-        if play_version:
-            if self.current_versions['play_store'] is None:
-                self.current_versions['play_store'] = play_version
-                self.save_version_data()
-                logger.info(f"Initial version detected: {play_version}")
-                return False, play_version, "Initial version detection"
-            
-            if play_version != self.current_versions['play_store']:
-                old_version = self.current_versions['play_store']
-                self.current_versions['play_store'] = play_version
-                self.save_version_data()
-                logger.info(f"New version detected: {old_version} -> {play_version}")
-                return True, play_version, f"Version updated from {old_version} to {play_version}"
-            
-            return False, play_version, "No update available"
-        else:
-            logger.warning("Could not retrieve version information from Play Store")
-            return False, None, "Could not retrieve version information"
-
-
-# Example usage:
-# For Fun Run 4
-# monitor = StoreMonitor(
-#     package_name='com.dirtybit.fire',  # Fun Run 4 package name
-#     app_store_id='1503294866'         # Fun Run 4 App Store ID (optional)
-# )
-# results = await monitor.check_store_updates()
-
-class ConfigComparator:
-    def __init__(self):
-        pass
-    
-    def compare_configs(self, old_config: Dict, new_config: Dict) -> Dict[str, Any]:
-        """
-        Compare two config files [Add old file as attachment first then new file] and return detailed changes.
-        """
-        changes = {
-            "added": {},
-            "removed": {},
-            "modified": {},
-            "summary": []
-        }
-        
-        # Compare each section
-        sections_to_compare = ["animals", "skins", "hats", "glasses", "chests", "feet", "powerups"]
-        
-        for section in sections_to_compare:
-            old_section = old_config.get(section, {})
-            new_section = new_config.get(section, {})
-            
-            # Find added items
-            added_items = {}
-            for item_id, item_data in new_section.items():
-                if item_id not in old_section:
-                    added_items[item_id] = item_data
-            
-            # Find removed items
-            removed_items = {}
-            for item_id, item_data in old_section.items():
-                if item_id not in new_section:
-                    removed_items[item_id] = item_data
-            
-            # Find modified items
-            modified_items = {}
-            for item_id in old_section:
-                if item_id in new_section:
-                    if old_section[item_id] != new_section[item_id]:
-                        modified_items[item_id] = {
-                            "old": old_section[item_id],
-                            "new": new_section[item_id]
-                        }
-            
-            if added_items:
-                changes["added"][section] = added_items
-                changes["summary"].append(f"Added {len(added_items)} {section}")
-            
-            if removed_items:
-                changes["removed"][section] = removed_items
-                changes["summary"].append(f"Removed {len(removed_items)} {section}")
-            
-            if modified_items:
-                changes["modified"][section] = modified_items
-                changes["summary"].append(f"Modified {len(modified_items)} {section}")
-        
-        return changes
-    
-    def create_modified_config(self, new_config: Dict, changes: Dict) -> Dict:
-        """
-        Create a modified version of the new config with the secret object added to new items.
-        Also changes any "hidden": true to "hidden": false.
-        """
-        modified_config = json.loads(json.dumps(new_config))  # Deep copy
-        
-        # Add the secret object to all added items
-        for section, items in changes["added"].items():
-            if section in modified_config:
-                for item_id in items:
-                    if item_id in modified_config[section]:
-                        modified_config[section][item_id]["the secret object"] = True
-        
-        # Change all "hidden": true to "hidden": false
-        sections_to_check = ["animals", "skins", "hats", "glasses", "chests", "feet", "powerups"]
-        for section in sections_to_check:
-            if section in modified_config:
-                for item_id, item_data in modified_config[section].items():
-                    if isinstance(item_data, dict) and item_data.get("hidden") is True:
-                        modified_config[section][item_id]["hidden"] = False
-        
-        return modified_config
-
 # Initialize components
 store_monitor = StoreMonitor(
     package_name=config['app_package'],  # This gets 'com.dirtybit.fire' from your config
-    app_store_id='1503294866'  # Fun Run 4 iOS App Store ID (optional)
+    app_store_id='1503294866',  # Fun Run 4 iOS App Store ID (optional)
+    targets=[MonitorTarget.from_dict(target) for target in config.get('targets', [])],
+    max_concurrency=int(config.get('max_concurrency', 4))
 )
-config_comparator = ConfigComparator()
+config_comparator = ConfigComparator(owned_flag="the secret object", fingerprint_cache=FingerprintCache(), diff_cache=DiffCache())
+snapshot_store = SnapshotStore()
+config_timeline = ConfigTimeline(config_comparator)
+# Items of the newest stored storeConfig, for !search
+item_index = ItemIndex()
+# Size budgets and validated, streamed downloads for uploaded configs
+attachment_ingest = AttachmentIngest.from_config(config)
+# Worker processes for compares and file generation, so large uploads don't block other commands
+job_pool = JobPool(
+    max_workers=config.get('job_workers'),
+    timeout=float(config.get('job_timeout_seconds', 300))
+)
+# When each !compare/!modify may start: bounded, fair between users and channels, small uploads first
+job_queue = JobQueue(
+    max_running=int(config.get('max_running_jobs', job_pool.max_workers)),
+    per_user=int(config.get('max_jobs_per_user', 1)),
+    per_channel=int(config.get('max_jobs_per_channel', 2)),
+    small_job_bytes=int(float(config.get('small_job_mb', 8)) * 1024 * 1024)
+)
+# Channel notifications: one edited status message per channel, batched notes, paced sends
+notifications = NotificationDispatcher.from_config(bot, config)
+
+# Adaptive schedule for the periodic update check
+update_scheduler = PollScheduler.from_config(config)
+update_scheduler.learn_release_times(store_monitor.release_times())
+update_task: Optional[asyncio.Task] = None
+
+def summarize_update_results(results: Dict) -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    Collapse per-target results into (has_update, version, info).
+    Any updated target counts; otherwise the primary Play Store result is reported.
+    """
+    updated = [result for result in results.get('targets', {}).values() if result['has_update']]
+    if updated:
+        return True, updated[0]['new_version'], "\n".join(result['info'] for result in updated)
+    
+    play_result = results['play_store']
+    return False, play_result['new_version'], play_result['info']
 
 @bot.event
 async def on_ready():
     logger.info(f'{bot.user} is online and monitoring Fun Run 4!')
-    channel = bot.get_channel(int(config['channel_id']))
-    if channel:
+    # on_ready also fires after reconnects: announce and start the checker only once
+    if not notifications.running:
+        notifications.start()
         embed = discord.Embed(
             title="🎮 Fun Run 4 Monitor Bot Started!",
             description="Bot is now monitoring for updates and ready to compare config files.",
             color=0x00ff00,
             timestamp=datetime.now(timezone.utc)
         )
-        embed.add_field(name="Available Commands", value="`!compare` - Compare two config files [Add old file as attachment first then new file]\n`!modify <ids>` - Add the secret object to specific item IDs\n`!check_update` - Force check for Playstore/App Store updates\n`!test_notification` - Test Discord messaging\n`!reset_version` - Reset version data (for testing)", inline=False)
-        await channel.send(embed=embed) # type: ignore
-        
-        # Start the update checker
-        update_checker.start()
+        embed.add_field(name="Available Commands", value="`!compare` - Compare two config files [Add old file as attachment first then new file], or more for a timeline\n`!snapshots [name]` - List stored config versions\n`!diff <old> <new> [newer ...]` - Compare stored config versions\n`!search <query>` - Search items of the newest stored storeConfig\n`!modify <ids>` - Add the secret object to specific item IDs\n`!check_update` - Force check for Playstore/App Store updates\n`!test_notification` - Test Discord messaging\n`!reset_version` - Reset version data (for testing)", inline=False)
+        notifications.notify(embed=embed)
+    
+    global update_task
+    if update_task is None or update_task.done():
+        update_task = asyncio.create_task(update_scheduler.run(update_checker))
+
+def build_status_embed(has_update: bool, version: Optional[str], info: Optional[str]) -> discord.Embed:
+    """The status message every scheduled check edits (instead of posting new messages)"""
+    if has_update:
+        embed = discord.Embed(
+            title="🚨 Fun Run 4 Update Detected!",
+            description="A new version of Fun Run 4 has been found on Playstore/App Store!",
+            color=0xff6b00,
+            timestamp=datetime.now(timezone.utc)
+        )
     else:
-        logger.error(f"Channel ID {config['channel_id']} not found")
+        embed = discord.Embed(
+            title="✅ Check Complete",
+            description="No new updates found.",
+            color=0x2ecc71,
+            timestamp=datetime.now(timezone.utc)
+        )
+    embed.add_field(name="Current Version", value=version or "Unknown", inline=True)
+    if info:
+        embed.add_field(name="Status", value=info[:1024], inline=False)
+    embed.set_footer(text=f"Checked every ~{update_scheduler.base_interval / 60:g} minutes • edited when the status changes")
+    return embed
 
-@tasks.loop(minutes=int(config.get('check_interval_minutes', 15)))
-async def update_checker():
-    """Periodic task to check for Play Store updates"""
+async def update_checker() -> bool:
+    """
+    Scheduled check for Play Store/App Store updates, run by update_scheduler.
+    Returns False when no store could be reached so the scheduler backs off.
+    """
     logger.info("Running scheduled update check...")
     
-    channel = bot.get_channel(int(config['channel_id']))
-    if not channel:
-        logger.error(f"Channel ID {config['channel_id']} not found or bot doesn't have access")
-        return
-    
-    # Send a message indicating check is starting
-    check_embed = discord.Embed(
-        title="🔍 Checking for Updates",
-        description="Performing scheduled check for Fun Run 4 updates...",
-        color=0x3498db,
-        timestamp=datetime.now(timezone.utc)
-    )
-    try:
-        await channel.send(embed=check_embed) # type: ignore
-        logger.info("Sent update check notification")
-    except Exception as e:
-        logger.error(f"Failed to send check notification: {str(e)}")
-    
     results = await store_monitor.check_store_updates()
-    play_result = results['play_store']
-    has_update = play_result['has_update']
-    version = play_result['new_version']
-    info = play_result['info']
+    has_update, version, info = summarize_update_results(results)
+    if has_update:
+        update_scheduler.learn_release_times(store_monitor.release_times())
     
     logger.info(f"Update check result: has_update={has_update}, version={version}, info={info}")
     
@@ -416,46 +191,280 @@ async def update_checker():
         embed.add_field(name="Version", value=version or "Unknown", inline=True)
         embed.add_field(name="Details", value=info or "No details available", inline=False)
         embed.set_footer(text="Use !compare command with old and new config files to see changes")
-        
-        try:
-            await channel.send("@everyone", embed=embed) # type: ignore
-            logger.info(f"Update notification sent successfully for version {version}")
-        except Exception as e:
-            logger.error(f"Failed to send Discord notification: {str(e)}")
+        notifications.notify("@everyone", embed=embed, urgent=True)
+        logger.info(f"Update notification queued for version {version}")
+    
+    notifications.set_status(build_status_embed(has_update, version, info), key=(has_update, version, info))
+    
+    return any(result['new_version'] for result in results['targets'].values())
+
+def build_changes_embed(changes: Dict) -> discord.Embed:
+    """Result embed for a change set from ConfigComparator"""
+    if not any([changes["added"], changes["removed"], changes["modified"], changes["other"]]):
+        embed = discord.Embed(
+            title="✅ No Changes Detected",
+            description="The two configuration files are identical.",
+            color=0x00ff00,
+            timestamp=datetime.now(timezone.utc)
+        )
     else:
-        # Send message indicating no update found
-        no_update_embed = discord.Embed(
-            title="✅ Check Complete",
-            description="No new updates found.",
-            color=0x2ecc71,
+        embed = discord.Embed(
+            title="🔍 Configuration Changes Detected",
+            description=f"Found {len(changes['summary'])} types of changes between the files.",
+            color=0xffa500,
             timestamp=datetime.now(timezone.utc)
         )
-        no_update_embed.add_field(name="Current Version", value=version or "Unknown", inline=True)
-        if info:
-            no_update_embed.add_field(name="Status", value=info, inline=False)
         
+        # Add summary
+        if changes["summary"]:
+            summary_text = "\n".join([f"• {item}" for item in changes["summary"]])
+            embed.add_field(name="📊 Summary", value=summary_text, inline=False)
+        
+        # Add detailed changes (limit to prevent embed overflow)
+        for section, items in changes["added"].items():
+            if len(items) <= 5:  # Show details for small changes
+                item_details = []
+                for item_id, item_data in list(items.items())[:5]:
+                    title = item_data.get('title', 'Unknown')
+                    rarity = item_data.get('rarity', 'Unknown')
+                    item_details.append(f"`{item_id}`: {title} (Rarity: {rarity})")
+                embed.add_field(
+                    name=f"➕ Added {section.title()}",
+                    value="\n".join(item_details),
+                    inline=False
+                )
+            else:
+                embed.add_field(
+                    name=f"➕ Added {section.title()}",
+                    value=f"{len(items)} items added (see the ▶ pages)",
+                    inline=False
+                )
+        
+        # Show which fields changed on modified items
+        for section, items in changes["modified"].items():
+            if len(items) <= 5:
+                item_details = []
+                for item_id, item_changes in items.items():
+                    title = item_changes["new"].get('title', 'Unknown') if isinstance(item_changes["new"], dict) else 'Unknown'
+                    lines = [describe_operation(op, item_changes["old"]) for op in item_changes["patch"][:3]]
+                    if len(item_changes["patch"]) > 3:
+                        lines.append(f"... and {len(item_changes['patch']) - 3} more")
+                    item_details.append(f"`{item_id}`: {title}\n" + "\n".join(f"  {line}" for line in lines))
+                embed.add_field(
+                    name=f"✏️ Modified {section.title()}",
+                    value="\n".join(item_details)[:1024],
+                    inline=False
+                )
+            else:
+                embed.add_field(
+                    name=f"✏️ Modified {section.title()}",
+                    value=f"{len(items)} items modified (see the ▶ pages or the attached patch)",
+                    inline=False
+                )
+        
+        # Sections that aren't item lists (settings, BattlePass data, ...)
+        if changes["other"]:
+            other_lines = []
+            for section, ops in list(changes["other"].items())[:5]:
+                lines = [describe_operation(op) for op in ops[:3]]
+                if len(ops) > 3:
+                    lines.append(f"... and {len(ops) - 3} more")
+                other_lines.append(f"**{section or 'document'}**\n" + "\n".join(f"  {line}" for line in lines))
+            if len(changes["other"]) > 5:
+                other_lines.append(f"... and {len(changes['other']) - 5} more sections")
+            embed.add_field(name="🧩 Other Changes", value="\n".join(other_lines)[:1024], inline=False)
+    
+    return embed
+
+# Seconds the page buttons under a result keep working (the change set is kept in memory until then)
+DIFF_PAGE_TIMEOUT = 600
+
+def changes_view(ctx, embed: discord.Embed, changes: Dict) -> Optional[DiffPageView]:
+    """Page buttons listing every change under a result embed, None if there are no changes"""
+    if not any([changes["added"], changes["removed"], changes["modified"], changes["other"]]):
+        return None
+    return DiffPageView(embed, changes, ctx.author.id, timeout=DIFF_PAGE_TIMEOUT)
+
+# Minimum seconds between edits of a processing message (Discord rate-limits message edits)
+PROGRESS_EDIT_INTERVAL = 2.0
+PROGRESS_PHASES = {1: "hashing old file", 2: "reading new file", 3: "re-reading old file"}
+CHANGE_ICONS = {"added": "➕", "removed": "➖", "modified": "✏️"}
+
+def format_compare_progress(phase: str, counts: Dict[str, int], first_changes: List[str]) -> str:
+    """Processing message while a comparison runs: running counts and the first changes found"""
+    text = f"🔄 Comparing configuration files... {phase}\n" \
+        f"➕ {counts['added']} added • ➖ {counts['removed']} removed • ✏️ {counts['modified']} modified so far"
+    if first_changes:
+        text += "\n**First changes:**\n" + "\n".join(first_changes)
+    return text[:2000]
+
+def upload_limit(ctx) -> int:
+    """Largest file the bot may upload where the command was used"""
+    return ctx.guild.filesize_limit if ctx.guild else DEFAULT_UPLOAD_LIMIT
+
+async def build_output_files(ctx, new_content: bytes, changes_json: bytes, old_digest: str, new_digest: str) -> List[Upload]:
+    """Modified config and JSON Patch for a comparison (zipped or split when large), reused from the diff cache when it was seen before"""
+    return await job_pool.run(
+        output_files_job, new_content, changes_json, comparator_options(config_comparator), old_digest, new_digest, upload_limit(ctx)
+    )
+
+async def send_output(ctx, files: List[Upload], **kwargs):
+    """
+    Send generated files, as many per message as the upload limit allows.
+    The first message also carries kwargs (embed, content); the last explains how to join split files.
+    """
+    groups = group_uploads(files, upload_limit(ctx))
+    note = split_note(files)
+    for index, group in enumerate(groups):
+        message = dict(kwargs) if index == 0 else {}
+        if note and index == len(groups) - 1:
+            message["content"] = f"{message['content']}\n{note}" if message.get("content") else note
+        await ctx.send(files=[discord.File(io.BytesIO(data), filename=name) for name, data in group], **message)
+
+def build_timeline_embed(timeline: Dict) -> discord.Embed:
+    """Result embed for a ConfigTimeline diff: one line per step plus the overall change set"""
+    embed = build_changes_embed(timeline["cumulative"])
+    embed.title = f"🕒 {len(timeline['labels'])} Versions: {embed.title[2:]}"
+    embed.description = f"Overall changes from `{timeline['labels'][0]}` to `{timeline['labels'][-1]}`."
+    
+    step_lines = []
+    for step in timeline["steps"][:20]:
+        summary = ", ".join(step["changes"]["summary"]) or "no changes"
+        step_lines.append(f"`{step['from']}` → `{step['to']}`: {summary}")
+    if len(timeline["steps"]) > 20:
+        step_lines.append(f"... and {len(timeline['steps']) - 20} more steps")
+    embed.insert_field_at(0, name="🪜 Step by Step", value="\n".join(step_lines)[:1024], inline=False)
+    return embed
+
+async def check_upload_sizes(processing_msg: discord.Message, attachments: List[discord.Attachment]) -> bool:
+    """Refuse oversized uploads before they take a place in the queue (False if refused)"""
+    try:
+        attachment_ingest.check_sizes(attachments)
+    except UploadRejected as e:
+        await processing_msg.edit(content=f"❌ {str(e)}")
+        return False
+    return True
+
+async def wait_for_turn(ctx, processing_msg: discord.Message, attachments: List[discord.Attachment]) -> JobTicket:
+    """Queue a heavy command; its processing message shows the queue position until it may start"""
+    text = processing_msg.content
+    waited = False
+    
+    async def show_position(position: int, running: int):
+        nonlocal waited
+        waited = True
         try:
-            await channel.send(embed=no_update_embed) # type: ignore
-            logger.info("No update found - notification sent")
-        except Exception as e:
-            logger.error(f"Failed to send no-update notification: {str(e)}")
+            await processing_msg.edit(content=f"⏳ Queued: position {position} ({running} job{'s' if running != 1 else ''} running)")
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update queue position: {str(e)}")
+    
+    ticket = await job_queue.acquire(ctx.author.id, ctx.channel.id, sum(attachment.size for attachment in attachments), show_position)
+    if waited:
+        await processing_msg.edit(content=text)
+    return ticket
+
+async def compare_timeline(ctx, processing_msg: discord.Message, attachments: List[discord.Attachment]):
+    """!compare with more than two attachments: diff every consecutive pair plus first to last"""
+    try:
+        contents = await attachment_ingest.read_all(attachments)
+    except UploadRejected as e:
+        await processing_msg.edit(content=f"❌ {str(e)}")
+        return
+    labels = [attachment.filename for attachment in attachments]
+    
+    try:
+        timeline_json, changes_json = await job_pool.run(timeline_job, contents, labels, comparator_options(config_timeline.comparator))
+    except JobDecodeError as e:
+        await processing_msg.edit(content=f"❌ Error parsing JSON files: {str(e)}")
+        return
+    except JobTimeout:
+        await processing_msg.edit(content=f"⏱️ Comparing {len(attachments)} files took longer than {job_pool.timeout:g}s and was stopped")
+        return
+    timeline = json_codec.loads(timeline_json)
+    
+    embed = build_timeline_embed(timeline)
+    try:
+        digests = await job_pool.run(ingest_job, snapshot_store.root, contents, [snapshot_name(label) for label in labels])
+        embed.set_footer(text=f"Stored as {' → '.join(digest[:8] for digest in digests)}"[:2048])
+    except Exception as e:
+        logger.error(f"Error storing config snapshots: {str(e)}")
+    
+    changes = timeline["cumulative"]
+    view = changes_view(ctx, embed, changes)
+    await processing_msg.edit(content=None, embed=embed, view=view)
+    if view:
+        view.message = processing_msg
+    
+    if any([changes["added"], changes["removed"], changes["modified"], changes["other"]]):
+        # The newest version, with every item added since the oldest one flagged
+        files = await build_output_files(ctx, contents[-1], changes_json, content_hash(contents[0]), content_hash(contents[-1]))
+        await send_output(
+            ctx, files,
+            content=f"🔧 `{labels[-1]}` with `the secret object` added to {sum(len(items) for items in changes['added'].values())} items new since `{labels[0]}`"
+        )
+    
+    await refresh_item_index()
+
+async def refresh_item_index():
+    """Bring the !search index up to the newest stored storeConfig (only the changed items are re-indexed)"""
+    try:
+        # The diff (or a full rebuild) runs in a worker; only applying its result happens here
+        base = item_index.digest
+        update = await job_pool.run(
+            index_sync_job, snapshot_store.root, comparator_options(config_comparator), base,
+            list(item_index.sections), item_index.facet_fields
+        )
+        if update is None or item_index.digest != base:
+            # Current already, or another refresh got there first
+            return
+        digest, kind, payload = update
+        if kind == 'index':
+            item_index.replace(pickle.loads(payload))
+        else:
+            item_index.apply_changes(json_codec.loads(payload))
+        item_index.digest = digest
+        logger.info(f"Item index now at storeConfig {digest[:10]} ({len(item_index)} items)")
+    except Exception as e:
+        logger.error(f"Error updating item index: {str(e)}")
 
 @bot.command(name='compare')
 async def compare_configs(ctx):
     """
     Compare two config files [Add old file as attachment first then new file] to detect changes.
-    Usage: !compare (with two file attachments)
+    Usage: !compare (with two file attachments, or more for a version timeline, oldest first)
     """
-    if len(ctx.message.attachments) != 2:
+    if len(ctx.message.attachments) < 2:
         embed = discord.Embed(
             title="❌ Invalid Usage",
-            description="Please attach exactly 2 config files to compare.\n\n**Usage:** `!compare` with 2 file attachments",
+            description="Please attach at least 2 config files to compare.\n\n**Usage:** `!compare` with 2 file attachments (or more, oldest first)",
             color=0xff0000
         )
         embed.add_field(name="Expected Files", value="1️⃣ Old version config file\n2️⃣ New version config file", inline=False)
         await ctx.reply(embed=embed)
         return
     
+    if len(ctx.message.attachments) > 2:
+        if not all(attachment.filename.endswith('.json') for attachment in ctx.message.attachments):
+            await ctx.reply("❌ All files must be JSON files!")
+            return
+        ticket = None
+        try:
+            processing_msg = await ctx.reply(f"🔄 Processing and comparing {len(ctx.message.attachments)} configuration files...")
+            if not await check_upload_sizes(processing_msg, ctx.message.attachments):
+                return
+            ticket = await wait_for_turn(ctx, processing_msg, ctx.message.attachments)
+            await compare_timeline(ctx, processing_msg, ctx.message.attachments)
+        except QueueFull as e:
+            await processing_msg.edit(content=f"❌ {str(e)}")
+        except Exception as e:
+            logger.error(f"Error in compare command: {str(e)}")
+            await ctx.reply(f"❌ An error occurred while processing the files: {str(e)}")
+        finally:
+            if ticket:
+                job_queue.release(ticket)
+        return
+    
+    ticket = None
     try:
         # Download and parse the attached files
         old_attachment = ctx.message.attachments[0]
@@ -467,76 +476,74 @@ async def compare_configs(ctx):
         
         # Show processing message
         processing_msg = await ctx.reply("🔄 Processing and comparing configuration files...")
+        if not await check_upload_sizes(processing_msg, [old_attachment, new_attachment]):
+            return
+        ticket = await wait_for_turn(ctx, processing_msg, [old_attachment, new_attachment])
         
-        # Download files
-        old_content = await old_attachment.read()
-        new_content = await new_attachment.read()
+        # Download files, parsing them while they arrive
+        try:
+            old_content, new_content = await attachment_ingest.read_all([old_attachment, new_attachment])
+        except UploadRejected as e:
+            await processing_msg.edit(content=f"❌ {str(e)}")
+            return
+        
+        # Compare configurations item by item straight from the raw bytes,
+        # so neither file is ever fully decoded into a Python object.
+        # A pair compared before is answered from the diff cache.
+        old_digest, new_digest = content_hash(old_content), content_hash(new_content)
+        # The diff runs in a worker process; the processing message shows live progress meanwhile
+        phase = ""
+        first_changes = []
+        last_edit = time.monotonic()
+        
+        async def show_progress(event: Dict):
+            nonlocal phase, last_edit
+            if event["event"] == "progress":
+                phase = f"({PROGRESS_PHASES[event['pass']]}, {event['entries']:,} entries)"
+            elif len(first_changes) < 5:
+                entry = f"`{event['section']}`" + (f" `{event['id']}`" if event["id"] is not None else "")
+                first_changes.append(f"{CHANGE_ICONS[event['type']]} {entry}")
+            if time.monotonic() - last_edit >= PROGRESS_EDIT_INTERVAL:
+                last_edit = time.monotonic()
+                try:
+                    await processing_msg.edit(content=format_compare_progress(phase, event["counts"], first_changes))
+                except discord.HTTPException as e:
+                    logger.warning(f"Could not update progress message: {str(e)}")
         
-        # Parse JSON
         try:
-            old_config = json.loads(old_content.decode('utf-8'))
-            new_config = json.loads(new_content.decode('utf-8'))
-        except json.JSONDecodeError as e:
+            changes_json = await job_pool.run(
+                compare_job, old_content, new_content, comparator_options(config_comparator), old_digest, new_digest,
+                on_progress=show_progress
+            )
+        except JobDecodeError as e:
             await processing_msg.edit(content=f"❌ Error parsing JSON files: {str(e)}")
             return
+        except JobTimeout:
+            await processing_msg.edit(content=f"⏱️ The comparison took longer than {job_pool.timeout:g}s and was stopped")
+            return
+        changes = json_codec.loads(changes_json)
         
-        # Compare configurations
-        changes = config_comparator.compare_configs(old_config, new_config)
+        embed = build_changes_embed(changes)
         
-        # Create result embed
-        if not any([changes["added"], changes["removed"], changes["modified"]]):
-            embed = discord.Embed(
-                title="✅ No Changes Detected",
-                description="The two configuration files are identical.",
-                color=0x00ff00,
-                timestamp=datetime.now(timezone.utc)
-            )
-        else:
-            embed = discord.Embed(
-                title="🔍 Configuration Changes Detected",
-                description=f"Found {len(changes['summary'])} types of changes between the files.",
-                color=0xffa500,
-                timestamp=datetime.now(timezone.utc)
+        # Keep both versions so they can be compared again later with !diff
+        try:
+            await job_pool.run(
+                ingest_job, snapshot_store.root, [old_content, new_content],
+                [snapshot_name(old_attachment.filename), snapshot_name(new_attachment.filename)]
             )
-            
-            # Add summary
-            if changes["summary"]:
-                summary_text = "\n".join([f"• {item}" for item in changes["summary"]])
-                embed.add_field(name="📊 Summary", value=summary_text, inline=False)
-            
-            # Add detailed changes (limit to prevent embed overflow)
-            for section, items in changes["added"].items():
-                if len(items) <= 5:  # Show details for small changes
-                    item_details = []
-                    for item_id, item_data in list(items.items())[:5]:
-                        title = item_data.get('title', 'Unknown')
-                        rarity = item_data.get('rarity', 'Unknown')
-                        item_details.append(f"`{item_id}`: {title} (Rarity: {rarity})")
-                    embed.add_field(
-                        name=f"➕ Added {section.title()}",
-                        value="\n".join(item_details),
-                        inline=False
-                    )
-                else:
-                    embed.add_field(
-                        name=f"➕ Added {section.title()}",
-                        value=f"{len(items)} items added (too many to display)",
-                        inline=False
-                    )
+            embed.set_footer(text=f"Stored as {old_digest[:10]} → {new_digest[:10]} (see !snapshots, !diff)")
+        except Exception as e:
+            logger.error(f"Error storing config snapshots: {str(e)}")
         
-        await processing_msg.edit(content=None, embed=embed)
+        view = changes_view(ctx, embed, changes)
+        await processing_msg.edit(content=None, embed=embed, view=view)
+        if view:
+            view.message = processing_msg
         
         # Create and upload modified config if there are changes
-        if any([changes["added"], changes["removed"], changes["modified"]]):
-            modified_config = config_comparator.create_modified_config(new_config, changes)
-            
-            # Create file buffer
-            modified_json = json.dumps(modified_config, indent=2, ensure_ascii=False)
-            file_buffer = io.BytesIO(modified_json.encode('utf-8'))
-            file_buffer.seek(0)
-            
-            # Send modified config file
-            discord_file = discord.File(file_buffer, filename="modified_config.json")
+        if any([changes["added"], changes["removed"], changes["modified"], changes["other"]]):
+            # Modified config plus the field-level changes as a JSON Patch (RFC 6902) document
+            files = await build_output_files(ctx, new_content, changes_json, old_digest, new_digest)
             
             modify_embed = discord.Embed(
                 title="🔧 Modified Configuration File",
@@ -549,11 +556,131 @@ async def compare_configs(ctx):
                 inline=False
             )
             
-            await ctx.send(embed=modify_embed, file=discord_file)
+            await send_output(ctx, files, embed=modify_embed)
         
+        await refresh_item_index()
+        
+    except QueueFull as e:
+        await processing_msg.edit(content=f"❌ {str(e)}")
     except Exception as e:
         logger.error(f"Error in compare command: {str(e)}")
         await ctx.reply(f"❌ An error occurred while processing the files: {str(e)}")
+    finally:
+        if ticket:
+            job_queue.release(ticket)
+
+@bot.command(name='snapshots')
+async def list_snapshots(ctx, name: Optional[str] = None):
+    """
+    List the config versions kept from earlier comparisons.
+    Usage: !snapshots [name] (e.g. !snapshots storeConfig)
+    """
+    try:
+        versions = await asyncio.get_running_loop().run_in_executor(None, snapshot_store.versions, name, 15)
+        if not versions:
+            await ctx.reply("📭 No stored config versions yet. Use `!compare` to add some.")
+            return
+        
+        lines = []
+        for version in versions:
+            label = f" ({version['label']})" if version['label'] else ""
+            lines.append(
+                f"`{version['digest'][:10]}` {version['name']}{label} - {version['items']} items, "
+                f"{version['size'] / 1024 / 1024:.1f} MB, {version['ingested_at'][:16].replace('T', ' ')}"
+            )
+        embed = discord.Embed(
+            title="🗂️ Stored Config Versions",
+            description="\n".join(lines),
+            color=0x0099ff
+        )
+        embed.set_footer(text="Compare any two with !diff <old> <new>")
+        await ctx.reply(embed=embed)
+    except Exception as e:
+        logger.error(f"Error in snapshots command: {str(e)}")
+        await ctx.reply(f"❌ An error occurred while listing snapshots: {str(e)}")
+
+@bot.command(name='diff')
+async def diff_snapshots(ctx, *refs: str):
+    """
+    Compare stored config versions without re-uploading them.
+    Usage: !diff <old> <new> [newer ...] (digest prefix from !snapshots, or a label)
+    """
+    if len(refs) < 2:
+        await ctx.reply("❌ Usage: `!diff <old> <new> [newer ...]` (see `!snapshots` for stored versions)")
+        return
+    
+    try:
+        # Stored versions are diffed in a worker process, like uploaded ones
+        try:
+            result_json, patch_json = await job_pool.run(snapshot_diff_job, snapshot_store.root, refs, comparator_options(config_comparator))
+        except KeyError as e:
+            await ctx.reply(f"❌ {e.args[0]}")
+            return
+        except JobTimeout:
+            await ctx.reply(f"⏱️ The comparison took longer than {job_pool.timeout:g}s and was stopped")
+            return
+        if len(refs) > 2:
+            timeline = json_codec.loads(result_json)
+            changes = timeline["cumulative"]
+            embed = build_timeline_embed(timeline)
+        else:
+            changes = json_codec.loads(result_json)
+            embed = build_changes_embed(changes)
+        
+        if any([changes["added"], changes["removed"], changes["modified"], changes["other"]]):
+            patch_buffer = io.BytesIO(patch_json)
+            view = changes_view(ctx, embed, changes)
+            view.message = await ctx.reply(embed=embed, file=discord.File(patch_buffer, filename="config_changes.patch.json"), view=view)
+        else:
+            await ctx.reply(embed=embed)
+    except Exception as e:
+        logger.error(f"Error in diff command: {str(e)}")
+        await ctx.reply(f"❌ An error occurred while comparing snapshots: {str(e)}")
+
+@bot.command(name='search')
+async def search_items(ctx, *, query: Optional[str] = None):
+    """
+    Search the items of the newest stored storeConfig.
+    Usage: !search <title words> [rarity:epic] [hidden:true] [section:skins] [id:2050]
+    """
+    if not query:
+        embed = discord.Embed(
+            title="🔎 Item Search",
+            description="Search the newest stored storeConfig by title words and item fields.",
+            color=0x0099ff
+        )
+        embed.add_field(name="Usage", value="`!search <title words> [field:value ...]`", inline=False)
+        embed.add_field(name="Examples", value="`!search golden dragon`\n`!search rarity:legendary hidden:true`\n`!search section:hats neo`\n`!search id:2050`", inline=False)
+        embed.add_field(name="Fields", value=", ".join(f"`{field}`" for field in ("section", "id") + item_index.facet_fields), inline=False)
+        await ctx.reply(embed=embed)
+        return
+    
+    try:
+        await refresh_item_index()
+        if not len(item_index):
+            await ctx.reply("📭 No stored storeConfig yet. Use `!compare` to add one.")
+            return
+        
+        total, results = item_index.search(query, 15)
+        if not total:
+            await ctx.reply(f"🔎 No items match `{query}`")
+            return
+        
+        lines = [
+            f"`{item_id}` {item.get('title', 'Unknown')} ({section}, {item.get('rarity', 'Unknown')})"
+            for section, item_id, item in results
+        ]
+        embed = discord.Embed(
+            title=f"🔎 {total} item{'s' if total != 1 else ''} matching `{query}`"[:256],
+            description="\n".join(lines)[:4096],
+            color=0x0099ff
+        )
+        shown = f"Showing the first {len(results)} • " if total > len(results) else ""
+        embed.set_footer(text=f"{shown}storeConfig {item_index.digest[:10]}")
+        await ctx.reply(embed=embed)
+    except Exception as e:
+        logger.error(f"Error in search command: {str(e)}")
+        await ctx.reply(f"❌ An error occurred while searching: {str(e)}")
 
 @bot.command(name='modify')
 async def modify_config(ctx, *, item_ids=None):
@@ -584,6 +711,7 @@ async def modify_config(ctx, *, item_ids=None):
         await ctx.reply(embed=embed)
         return
     
+    ticket = None
     try:
         # Parse item IDs from various formats
         if ',' in item_ids:
@@ -609,34 +737,30 @@ async def modify_config(ctx, *, item_ids=None):
         
         # Show processing message
         processing_msg = await ctx.reply(f"🔄 Processing config file and applying the secret object to {len(ids_to_modify)} items...")
+        if not await check_upload_sizes(processing_msg, [attachment]):
+            return
+        ticket = await wait_for_turn(ctx, processing_msg, [attachment])
         
-        # Download file
-        content = await attachment.read()
+        # Download file, parsing it while it arrives
+        try:
+            content = await attachment_ingest.read(attachment)
+        except UploadRejected as e:
+            await processing_msg.edit(content=f"❌ {str(e)}")
+            return
         
-        # Parse JSON
+        # Parse, apply the secret object to the specified items (in every item section of the file)
+        # and re-serialize in a worker process
         try:
-            config_data = json.loads(content.decode('utf-8'))
-        except json.JSONDecodeError as e:
+            files, modified, not_found_items = await job_pool.run(
+                modify_ids_job, content, ids_to_modify, comparator_options(config_comparator), upload_limit(ctx)
+            )
+        except JobDecodeError as e:
             await processing_msg.edit(content=f"❌ Error parsing JSON file: {str(e)}")
             return
-        
-        # Apply the secret object to specified items
-        sections_to_check = ["animals", "skins", "hats", "glasses", "chests", "feet", "powerups"]
-        modified_items = []
-        not_found_items = []
-        
-        for item_id in ids_to_modify:
-            found = False
-            for section in sections_to_check:
-                if section in config_data and item_id in config_data[section]:
-                    config_data[section][item_id]["the secret object"] = True
-                    item_title = config_data[section][item_id].get('title', 'Unknown')
-                    modified_items.append(f"`{item_id}`: {item_title} ({section})")
-                    found = True
-                    break
-            
-            if not found:
-                not_found_items.append(item_id)
+        except JobTimeout:
+            await processing_msg.edit(content=f"⏱️ Modifying the file took longer than {job_pool.timeout:g}s and was stopped")
+            return
+        modified_items = [f"`{item_id}`: {item_title} ({section})" for item_id, item_title, section in modified]
         
         # Create result embed
         if modified_items:
@@ -684,24 +808,22 @@ async def modify_config(ctx, *, item_ids=None):
         
         # Create and upload modified config file if any items were modified
         if modified_items:
-            modified_json = json.dumps(config_data, indent=2, ensure_ascii=False)
-            file_buffer = io.BytesIO(modified_json.encode('utf-8'))
-            file_buffer.seek(0)
-            
-            # Send modified config file
-            discord_file = discord.File(file_buffer, filename="modified_config.json")
-            
             modify_embed = discord.Embed(
                 title="🔧 Modified Configuration File",
                 description=f"Here's your configuration file with `the secret object` applied to {len(modified_items)} items.",
                 color=0x00ff00
             )
             
-            await ctx.send(embed=modify_embed, file=discord_file)
+            await send_output(ctx, files, embed=modify_embed)
         
+    except QueueFull as e:
+        await processing_msg.edit(content=f"❌ {str(e)}")
     except Exception as e:
         logger.error(f"Error in modify command: {str(e)}")
         await ctx.reply(f"❌ An error occurred while processing the file: {str(e)}")
+    finally:
+        if ticket:
+            job_queue.release(ticket)
 
 @bot.command(name='test_notification')
 async def test_notification(ctx):
@@ -735,9 +857,7 @@ async def reset_version(ctx):
     This will make the bot think there's no current version, so the next check will trigger an update.
     """
     try:
-        store_monitor.current_versions = {'play_store': None, 'app_store': None}
-        if os.path.exists(store_monitor.version_file):
-            os.remove(store_monitor.version_file)
+        store_monitor.reset_version()
         
         embed = discord.Embed(
             title="🔄 Version Data Reset",
@@ -764,10 +884,7 @@ async def manual_update_check(ctx):
     
     try:
         results = await store_monitor.check_store_updates()
-        play_result = results['play_store']
-        has_update = play_result['has_update']
-        version = play_result['new_version']
-        info = play_result['info']
+        has_update, version, info = summarize_update_results(results)
         
         if has_update:
             embed = discord.Embed(
@@ -796,10 +913,6 @@ async def manual_update_check(ctx):
         logger.error(f"Error in manual update check: {str(e)}")
         await processing_msg.edit(content=f"❌ Error checking for updates: {str(e)}")
 
-@update_checker.before_loop
-async def before_update_checker():
-    await bot.wait_until_ready()
-
 # Error handling
 @bot.event
 async def on_command_error(ctx, error):
@@ -815,10 +928,27 @@ async def on_command_error(ctx, error):
     )
     await ctx.reply(embed=embed)
 
+async def run_bot():
+    """Run the bot with the store monitor's pooled HTTP session open for its whole lifetime"""
+    async with bot:
+        await store_monitor.start()
+        try:
+            await bot.start(config['discord_token'])
+        finally:
+            # Queued notifications can only go out while the connection is still open
+            await notifications.close(timeout=0 if bot.is_closed() else 10)
+            await store_monitor.close()
+            await attachment_ingest.close()
+            config_comparator.close()
+            job_pool.close()
+            snapshot_store.close()
+
 # Run the bot
 if __name__ == "__main__":
     try:
-        bot.run(config['discord_token'])
+        asyncio.run(run_bot())
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         logger.error(f"Failed to start bot: {str(e)}")
         print(f"Failed to start bot: {str(e)}")
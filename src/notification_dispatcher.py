@@ -0,0 +1,273 @@
+"""
+Notification Dispatcher Module
+Channel notifications through per-channel send queues: one edited status message, batched notes, paced sends
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Hashable, Iterable, List, Optional
+
+import discord
+
+logger = logging.getLogger('funrun_monitor')
+
+# Discord allows 5 messages per 5 seconds in a channel: one call per second never hits that bucket
+DEFAULT_MIN_INTERVAL = 1.0
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_CONTENT_CHARS = 2000
+MAX_EMBED_CHARS = 6000
+
+
+class ChannelOutbox:
+    def __init__(self, channel_id: int, status_message_id: Optional[int] = None):
+        """What is still to be sent to one channel, in the order its worker handles it"""
+        self.channel_id = channel_id
+        self.urgent: Deque[Dict[str, Any]] = deque()
+        self.batch: List[Dict[str, Any]] = []
+        self.batch_since = 0.0
+        # Only the newest status is kept: an edit that hasn't gone out yet is replaced
+        self.status: Optional[discord.Embed] = None
+        self.status_key: Optional[Hashable] = None
+        self.status_message_id = status_message_id
+        self.shown_key: Optional[Hashable] = None
+        self.shown_at = 0.0
+        self.last_call = 0.0
+        self.wake = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self.urgent or self.batch or self.status is not None)
+
+
+class NotificationDispatcher:
+    def __init__(self, client: discord.Client, channel_ids: Iterable[int], state_file: str = "notification_state.json",
+                 batch_seconds: float = 60.0, status_refresh: float = 3 * 3600,
+                 min_interval: float = DEFAULT_MIN_INTERVAL, max_retries: int = 3):
+        """
+        Sends the bot's channel notifications, replacing a new message per check with
+        edits of one status message per channel.
+
+        Every channel has a queue worked by its own task, so channels are served
+        concurrently while each one sees at most one call per min_interval. Within a
+        channel, urgent messages go first, then the status edit, then batched notes.
+        discord.py still handles 429 responses and shared buckets itself; failed calls
+        with a server error are retried here with backoff.
+
+        Args:
+            client: The bot
+            channel_ids: Channels to notify (in any number of guilds)
+            state_file: Where the status message of each channel is remembered across restarts
+            batch_seconds: Non-urgent messages are held this long and sent together
+            status_refresh: An unchanged status is only re-edited after this many seconds
+            min_interval: Seconds between two calls to the same channel
+            max_retries: Attempts after a server error before a message is dropped
+        """
+        self.client = client
+        self.state_file = state_file
+        self.batch_seconds = batch_seconds
+        self.status_refresh = status_refresh
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.calls: Counter = Counter()
+        state = self.load_state()
+        self.outboxes: Dict[int, ChannelOutbox] = {
+            channel_id: ChannelOutbox(channel_id, state.get(str(channel_id)))
+            for channel_id in dict.fromkeys(int(channel_id) for channel_id in channel_ids)
+        }
+
+    @classmethod
+    def from_config(cls, client: discord.Client, config: Dict[str, Any]) -> 'NotificationDispatcher':
+        """Channels from channel_id plus notify_channel_ids; notify_batch_seconds, status_refresh_minutes"""
+        return cls(
+            client,
+            [config['channel_id'], *config.get('notify_channel_ids', [])],
+            batch_seconds=float(config.get('notify_batch_seconds', 60)),
+            status_refresh=float(config.get('status_refresh_minutes', 180)) * 60
+        )
+
+    @property
+    def running(self) -> bool:
+        return any(outbox.task is not None and not outbox.task.done() for outbox in self.outboxes.values())
+
+    def load_state(self) -> Dict[str, int]:
+        """Status message id of each channel, from the state file"""
+        try:
+            with open(self.state_file, 'r') as f:
+                return {key: int(value) for key, value in json.load(f).get('status_messages', {}).items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable {self.state_file}: {str(e)}")
+            return {}
+
+    def save_state(self):
+        state = {'status_messages': {
+            str(outbox.channel_id): outbox.status_message_id
+            for outbox in self.outboxes.values() if outbox.status_message_id
+        }}
+        tmp = f"{self.state_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp, self.state_file)
+        except OSError as e:
+            logger.error(f"Could not save {self.state_file}: {str(e)}")
+
+    def start(self):
+        """Start a worker per channel (again, if one has stopped)"""
+        for outbox in self.outboxes.values():
+            if outbox.task is None or outbox.task.done():
+                outbox.task = asyncio.create_task(self._work(outbox))
+
+    def notify(self, content: Optional[str] = None, embed: Optional[discord.Embed] = None, urgent: bool = False):
+        """
+        Queue a message for every channel. Urgent messages are sent right away,
+        others are held up to batch_seconds and sent together with other notes.
+        """
+        message = {'content': content, 'embed': embed}
+        now = time.monotonic()
+        for outbox in self.outboxes.values():
+            if urgent:
+                outbox.urgent.append(message)
+            else:
+                if not outbox.batch:
+                    outbox.batch_since = now
+                outbox.batch.append(message)
+            outbox.idle.clear()
+            outbox.wake.set()
+
+    def set_status(self, embed: discord.Embed, key: Hashable):
+        """
+        Show `embed` in the status message of every channel. `key` identifies what the
+        status says: while it stays the same, the message is only edited every status_refresh seconds.
+        """
+        now = time.monotonic()
+        for outbox in self.outboxes.values():
+            if key == outbox.shown_key and now - outbox.shown_at < self.status_refresh:
+                outbox.status = None
+                self.calls['skipped'] += 1
+                continue
+            outbox.status, outbox.status_key = embed, key
+            outbox.idle.clear()
+            outbox.wake.set()
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Send everything queued now, batched notes included, and wait until it's out"""
+        for outbox in self.outboxes.values():
+            if outbox.batch:
+                outbox.batch_since = 0.0
+            outbox.wake.set()
+        waits = [outbox.idle.wait() for outbox in self.outboxes.values() if outbox.pending and outbox.task and not outbox.task.done()]
+        if waits:
+            await asyncio.wait_for(asyncio.gather(*waits), timeout)
+
+    async def close(self, timeout: float = 10.0):
+        """Flush (for at most `timeout` seconds), then stop the workers"""
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Notifications still queued at shutdown were dropped")
+        for outbox in self.outboxes.values():
+            if outbox.task is not None:
+                outbox.task.cancel()
+        await asyncio.gather(*(outbox.task for outbox in self.outboxes.values() if outbox.task), return_exceptions=True)
+        logger.info(f"Notification API calls: {dict(self.calls)}")
+
+    async def _channel(self, channel_id: int) -> Any:
+        return self.client.get_channel(channel_id) or await self.client.fetch_channel(channel_id)
+
+    async def _call(self, outbox: ChannelOutbox, kind: str, make_call) -> Any:
+        """One API call for a channel: paced, and retried with backoff on server errors"""
+        for attempt in range(self.max_retries + 1):
+            wait = outbox.last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            outbox.last_call = time.monotonic()
+            self.calls[kind] += 1
+            try:
+                return await make_call()
+            except discord.HTTPException as e:
+                if e.status < 500 or attempt == self.max_retries:
+                    raise
+                logger.warning(f"Discord error {e.status} in channel {outbox.channel_id}, retrying")
+                await asyncio.sleep(2 ** attempt)
+
+    async def _send_status(self, outbox: ChannelOutbox, channel: Any):
+        """Edit the channel's status message, or post one if there is none (anymore)"""
+        embed, key = outbox.status, outbox.status_key
+        outbox.status = None
+        edited = False
+        if outbox.status_message_id:
+            message = channel.get_partial_message(outbox.status_message_id)
+            try:
+                await self._call(outbox, 'edit', lambda: message.edit(content=None, embed=embed))
+                edited = True
+            except discord.NotFound:
+                logger.info(f"Status message in channel {outbox.channel_id} is gone, posting a new one")
+        if not edited:
+            message = await self._call(outbox, 'send', lambda: channel.send(embed=embed))
+            outbox.status_message_id = message.id
+            self.save_state()
+        outbox.shown_key, outbox.shown_at = key, time.monotonic()
+
+    def _take_batch(self, outbox: ChannelOutbox) -> Dict[str, Any]:
+        """As many held notes as fit in one message"""
+        contents: List[str] = []
+        embeds: List[discord.Embed] = []
+        embed_chars = 0
+        while outbox.batch:
+            message = outbox.batch[0]
+            content, embed = message['content'], message['embed']
+            if contents or embeds:
+                if content and len("\n".join(contents + [content])) > MAX_CONTENT_CHARS:
+                    break
+                if embed is not None and (len(embeds) >= MAX_EMBEDS_PER_MESSAGE or embed_chars + len(embed) > MAX_EMBED_CHARS):
+                    break
+            outbox.batch.pop(0)
+            if content:
+                contents.append(content)
+            if embed is not None:
+                embeds.append(embed)
+                embed_chars += len(embed)
+        return {'content': "\n".join(contents)[:MAX_CONTENT_CHARS] or None, 'embeds': embeds}
+
+    async def _work(self, outbox: ChannelOutbox):
+        while True:
+            now = time.monotonic()
+            batch_due = bool(outbox.batch) and now >= outbox.batch_since + self.batch_seconds
+            if not (outbox.urgent or outbox.status is not None or batch_due):
+                if not outbox.pending:
+                    outbox.idle.set()
+                timeout = outbox.batch_since + self.batch_seconds - now if outbox.batch else None
+                try:
+                    await asyncio.wait_for(outbox.wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                outbox.wake.clear()
+                continue
+
+            try:
+                channel = await self._channel(outbox.channel_id)
+                if outbox.urgent:
+                    message = outbox.urgent.popleft()
+                    await self._call(outbox, 'send', lambda: channel.send(**message))
+                elif outbox.status is not None:
+                    await self._send_status(outbox, channel)
+                else:
+                    message = self._take_batch(outbox)
+                    await self._call(outbox, 'send', lambda: channel.send(**message))
+            except asyncio.CancelledError:
+                raise
+            except (discord.NotFound, discord.Forbidden) as e:
+                logger.error(f"Channel {outbox.channel_id} not found or bot doesn't have access, dropping its notifications: {str(e)}")
+                outbox.urgent.clear()
+                outbox.batch.clear()
+                outbox.status = None
+            except Exception as e:
+                # The message is dropped; a failed status edit is tried again on the next set_status
+                logger.error(f"Failed to send notification to channel {outbox.channel_id}: {str(e)}")
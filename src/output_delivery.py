@@ -0,0 +1,106 @@
+"""
+Output Delivery Module
+Packs generated files into Discord uploads: zip-compressed while serializing, compact JSON and split parts as fallbacks
+"""
+import io
+import zipfile
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Upload limit without a server boost (discord.py reports the real one as Guild.filesize_limit)
+DEFAULT_UPLOAD_LIMIT = 10 * 1024 * 1024
+# Files up to this size are sent as they are, larger ones zipped
+RAW_MAX_BYTES = 1024 * 1024
+MAX_FILES_PER_MESSAGE = 10
+# Room left for the multipart request around the files
+UPLOAD_OVERHEAD = 64 * 1024
+# Text chunks are batched to this size before compressing
+WRITE_BATCH_BYTES = 256 * 1024
+PART_SUFFIX = ".part"
+
+Upload = Tuple[str, bytes]
+
+
+def zip_chunks(member: str, chunks: Iterable[Union[str, bytes]], level: int = 6) -> bytes:
+    """A zip archive holding one file, compressed as its chunks are produced"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+        with archive.open(member, 'w') as f:
+            batch, batch_size = [], 0
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                batch.append(chunk)
+                batch_size += len(chunk)
+                if batch_size >= WRITE_BATCH_BYTES:
+                    f.write(b"".join(batch))
+                    batch, batch_size = [], 0
+            f.write(b"".join(batch))
+    return buffer.getvalue()
+
+
+def zipped_size(archive: bytes) -> int:
+    """Uncompressed size of the file in a zip_chunks() archive"""
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipped:
+        return zipped.infolist()[0].file_size
+
+
+def unzip(archive: bytes) -> bytes:
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipped:
+        return zipped.read(zipped.infolist()[0])
+
+
+def package_file(filename: str, archive: bytes, limit: int = DEFAULT_UPLOAD_LIMIT,
+                 compact: Optional[Callable[[], bytes]] = None, raw_max: int = RAW_MAX_BYTES) -> List[Upload]:
+    """
+    Uploads for one generated file, given as a zip_chunks() archive:
+        the plain file if it's small,
+        else the zip if it fits the upload limit,
+        else the zipped compact (unindented) JSON from `compact` if that fits,
+        else the smallest zip split into parts that each fit.
+    """
+    limit -= UPLOAD_OVERHEAD
+    if zipped_size(archive) <= min(raw_max, limit):
+        return [(filename, unzip(archive))]
+    stem = filename[:-len(".json")] if filename.endswith(".json") else filename
+    zip_name = f"{stem}.zip"
+    if len(archive) <= limit:
+        return [(zip_name, archive)]
+    if compact is not None:
+        compact_archive = zip_chunks(f"{stem}.min.json", [compact()])
+        zip_name = f"{stem}.min.zip"
+        if len(compact_archive) <= limit:
+            return [(zip_name, compact_archive)]
+        archive = min(archive, compact_archive, key=len)
+        if archive is not compact_archive:
+            zip_name = f"{stem}.zip"
+    return [
+        (f"{zip_name}{PART_SUFFIX}{index + 1:02d}", archive[offset:offset + limit])
+        for index, offset in enumerate(range(0, len(archive), limit))
+    ]
+
+
+def group_uploads(files: Sequence[Upload], limit: int = DEFAULT_UPLOAD_LIMIT) -> List[List[Upload]]:
+    """Files per message: in order, at most MAX_FILES_PER_MESSAGE and `limit` bytes each"""
+    limit -= UPLOAD_OVERHEAD
+    groups: List[List[Upload]] = []
+    size = 0
+    for upload in files:
+        if not groups or len(groups[-1]) >= MAX_FILES_PER_MESSAGE or size + len(upload[1]) > limit:
+            groups.append([])
+            size = 0
+        groups[-1].append(upload)
+        size += len(upload[1])
+    return groups
+
+
+def split_note(files: Sequence[Upload]) -> Optional[str]:
+    """How to put split files back together, if any file was split"""
+    archives = sorted({name.rsplit(PART_SUFFIX, 1)[0] for name, _ in files if PART_SUFFIX in name})
+    if not archives:
+        return None
+    names = ", ".join(f"`{name}`" for name in archives)
+    example = archives[0]
+    return (
+        f"📦 Too large for one upload, split into parts: {names}. Join the parts, then unzip:\n"
+        f"Windows: `copy /b {example}{PART_SUFFIX}* {example}` • Linux/macOS: `cat {example}{PART_SUFFIX}* > {example}`"
+    )
@@ -0,0 +1,144 @@
+"""
+Poll Scheduler Module
+Adaptive polling intervals with error backoff, jitter and release-window boost
+"""
+import asyncio
+import random
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 7 * 24
+
+
+class PollScheduler:
+    def __init__(self, base_interval: float = 900, min_interval: float = 120, max_interval: float = 3600,
+                 max_backoff: float = 3600, jitter: float = 0.1, boost_factor: float = 0.25,
+                 quiet_factor: float = 2.0, window_hours: int = 1, min_history: int = 3):
+        """
+        Initialize the poll scheduler.
+
+        Args:
+            base_interval: Normal seconds between checks
+            min_interval: Lower bound for any delay (before jitter)
+            max_interval: Upper bound for the delay outside error backoff
+            max_backoff: Upper bound for the delay while checks keep failing
+            jitter: Random spread applied to every delay, as a fraction (0.1 = +/-10%)
+            boost_factor: Multiplier applied to the base interval inside a release window
+            quiet_factor: Multiplier applied to the base interval outside release windows
+            window_hours: How many hours around an observed release count as its window
+            min_history: Releases needed before windows are trusted to slow polling down
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.boost_factor = boost_factor
+        self.quiet_factor = quiet_factor
+        self.window_hours = window_hours
+        self.min_history = min_history
+        self.consecutive_failures = 0
+        self.release_slots: Counter = Counter()
+        self.release_count = 0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'PollScheduler':
+        """Build a scheduler from the check_*_minutes keys in config.json"""
+        return cls(
+            base_interval=float(config.get('check_interval_minutes', 15)) * 60,
+            min_interval=float(config.get('min_check_interval_minutes', 2)) * 60,
+            max_interval=float(config.get('max_check_interval_minutes', 60)) * 60
+        )
+
+    @staticmethod
+    def _slot(moment: datetime) -> int:
+        """Hour-of-week slot (0-167, UTC) for a timestamp"""
+        moment = moment.astimezone(timezone.utc)
+        return moment.weekday() * 24 + moment.hour
+
+    def learn_release_times(self, timestamps: Iterable[datetime]):
+        """Rebuild the hour-of-week release histogram from observed update times"""
+        self.release_slots = Counter(self._slot(moment) for moment in timestamps)
+        self.release_count = sum(self.release_slots.values())
+        logger.debug(f"Learned {self.release_count} release times across {len(self.release_slots)} weekly slots")
+
+    def in_release_window(self, now: Optional[datetime] = None) -> bool:
+        """True if an update has previously dropped within window_hours of this hour-of-week"""
+        if not self.release_slots:
+            return False
+        slot = self._slot(now or datetime.now(timezone.utc))
+        return any(
+            self.release_slots[(slot + offset) % HOURS_PER_WEEK]
+            for offset in range(-self.window_hours, self.window_hours + 1)
+        )
+
+    def record_success(self):
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+
+    def next_delay(self, now: Optional[datetime] = None) -> float:
+        """Seconds to wait before the next check"""
+        if self.consecutive_failures:
+            # Exponential backoff while the stores keep failing
+            delay = min(self.base_interval * (2 ** self.consecutive_failures), self.max_backoff)
+        elif self.in_release_window(now):
+            delay = min(max(self.base_interval * self.boost_factor, self.min_interval), self.max_interval)
+        elif self.release_count >= self.min_history:
+            delay = min(max(self.base_interval * self.quiet_factor, self.min_interval), self.max_interval)
+        else:
+            delay = min(max(self.base_interval, self.min_interval), self.max_interval)
+
+        if self.jitter:
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return delay
+
+    def complete(self, success: bool, now: Optional[datetime] = None) -> float:
+        """Record the outcome of a check and return the delay until the next one"""
+        if success:
+            self.record_success()
+        else:
+            self.record_failure()
+        delay = self.next_delay(now)
+        logger.info(f"Next update check in {delay / 60:.1f} minutes (failures={self.consecutive_failures})")
+        return delay
+
+    async def run(self, check: Callable[[], Awaitable[bool]], stop_event: Optional[asyncio.Event] = None):
+        """
+        Run check() forever on the current event loop.
+        check() returns True on success; exceptions count as failures.
+        """
+        while stop_event is None or not stop_event.is_set():
+            try:
+                success = await check()
+            except Exception as e:
+                logger.error(f"Scheduled check failed: {str(e)}")
+                success = False
+            delay = self.complete(success)
+            if stop_event is None:
+                await asyncio.sleep(delay)
+            else:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def run_blocking(self, check: Callable[[], bool], stop_event: threading.Event,
+                     on_delay: Optional[Callable[[float], None]] = None):
+        """Thread-based variant of run() for callers without an event loop (the GUI)"""
+        while not stop_event.is_set():
+            try:
+                success = check()
+            except Exception as e:
+                logger.error(f"Scheduled check failed: {str(e)}")
+                success = False
+            delay = self.complete(success)
+            if on_delay:
+                on_delay(delay)
+            stop_event.wait(delay)
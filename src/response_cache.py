@@ -0,0 +1,170 @@
+"""
+Response Cache Module
+On-disk HTTP response cache with conditional request support for store lookups
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str = "http_cache", ttl_seconds: float = 60.0, max_bytes: int = 20 * 1024 * 1024):
+        """
+        Initialize the response cache.
+        Changes to the index are kept in memory until flush() writes them, so callers
+        can write once per batch of lookups (and off the event loop).
+
+        Args:
+            cache_dir: Directory holding the cache index and response bodies
+            ttl_seconds: How long an entry is served without contacting the server at all
+            max_bytes: Upper bound for the total size of stored response bodies
+        """
+        self.cache_dir = cache_dir
+        self.index_file = os.path.join(cache_dir, "index.json")
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Set when the index changed since it was last written
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.load_index()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def body_hash(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def _body_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self._key(url)}.body")
+
+    def load_index(self):
+        """Load cache metadata from disk"""
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+                logger.info(f"Loaded {len(self.entries)} cached responses")
+        except Exception as e:
+            logger.error(f"Error loading response cache: {str(e)}")
+            self.entries = {}
+
+    def save_index(self):
+        """Write cache metadata to disk atomically"""
+        with self.lock:
+            data = json.dumps(self.entries)
+            self.dirty = False
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            self.dirty = True
+            logger.error(f"Error saving response cache: {str(e)}")
+
+    def flush(self):
+        """Write cache metadata if it changed since the last write"""
+        if self.dirty:
+            self.save_index()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(url)
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """True if the entry is younger than the TTL and can be used without revalidation"""
+        return time.time() - entry.get('validated_at', 0) < self.ttl_seconds
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from a cached entry"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read_body(self, url: str) -> Optional[bytes]:
+        """Return the stored body for a URL, if still on disk"""
+        try:
+            with open(self._body_path(url), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Mark an entry as revalidated (after a 304 or an unchanged body)"""
+        with self.lock:
+            entry = self.entries.get(url)
+            if not entry:
+                return
+            entry['validated_at'] = time.time()
+            if etag:
+                entry['etag'] = etag
+            if last_modified:
+                entry['last_modified'] = last_modified
+            self.dirty = True
+
+    def store(self, url: str, body: bytes, parsed: Any, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a fresh response body and its parsed result"""
+        now = time.time()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._body_path(url), 'wb') as f:
+                f.write(body)
+        except OSError as e:
+            logger.error(f"Error writing cached response for {url}: {str(e)}")
+            return
+
+        with self.lock:
+            self.entries[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body_hash': self.body_hash(body),
+                'size': len(body),
+                'parsed': parsed,
+                'fetched_at': now,
+                'validated_at': now
+            }
+            self.evict()
+            self.dirty = True
+
+    def evict(self):
+        """Drop the least recently validated entries until the store fits in max_bytes"""
+        with self.lock:
+            total = sum(entry.get('size', 0) for entry in self.entries.values())
+            if total <= self.max_bytes:
+                return
+
+            for url in sorted(self.entries, key=lambda u: self.entries[u].get('validated_at', 0)):
+                if total <= self.max_bytes:
+                    break
+                total -= self.entries[url].get('size', 0)
+                del self.entries[url]
+                try:
+                    os.remove(self._body_path(url))
+                except OSError:
+                    pass
+                logger.debug(f"Evicted cached response for {url}")
+            self.dirty = True
+
+    def clear(self):
+        """Remove every cached response"""
+        with self.lock:
+            for url in list(self.entries):
+                try:
+                    os.remove(self._body_path(url))
+                except OSError:
+                    pass
+            self.entries = {}
+        self.save_index()
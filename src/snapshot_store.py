@@ -0,0 +1,564 @@
+"""
+Snapshot Store Module
+Content-addressed repository of ingested config versions with delta-compressed manifests
+"""
+import os
+import re
+import json
+import zlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from config_stream import (
+    ConfigSource, ConfigShapeError, START_SECTION, ITEM, END_SECTION, VALUE,
+    iter_events, iter_dump_config, load_source
+)
+from config_fingerprint import ConfigFingerprint, FingerprintCache, item_hash, content_hash
+import json_codec
+
+logger = logging.getLogger('funrun_monitor')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    digest TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    label TEXT,
+    ingested_at TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    items INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    base TEXT,
+    depth INTEGER NOT NULL,
+    manifest BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_name_seq ON snapshots (name, seq);
+"""
+
+# Objects are written and looked up in batches of this many
+BATCH_SIZE = 500
+# Shortest digest prefix accepted as a snapshot reference
+MIN_PREFIX_LENGTH = 4
+DIGEST_PREFIX = re.compile(rf'^[0-9a-f]{{{MIN_PREFIX_LENGTH},}}$')
+
+
+def snapshot_name(filename: str) -> str:
+    """Series name for a config file: 'storeConfig', or 'BattlePass/1' for files in a BattlePass folder"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    parent = os.path.basename(os.path.dirname(os.path.abspath(filename))) if os.path.dirname(filename) else ''
+    return f"{parent}/{stem}" if parent == "BattlePass" else stem
+
+
+def _pack(data: Any) -> bytes:
+    # exact: stored objects must round-trip losslessly, whatever backend reads them back
+    return zlib.compress(json_codec.dumps(data, exact=True), 6)
+
+
+def _unpack(blob: bytes) -> Any:
+    return json_codec.loads(zlib.decompress(blob))
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    """
+    A full manifest lists every top-level key of a config and the content hash of each entry:
+        names: top-level keys in document order
+        items: {section: {item_id: hash}} for object sections, in document order
+        values: {name: hash} for top-level values that aren't objects
+        mixed: object sections holding entries that aren't objects
+        root: hash of the whole document when it isn't an object at all (names etc. are empty)
+    """
+    return {'names': [], 'items': {}, 'values': {}, 'mixed': [], 'root': None}
+
+
+def encode_delta(base: Dict[str, Any], full: Dict[str, Any]) -> Dict[str, Any]:
+    """Describe a full manifest as changes against its base manifest"""
+    sections = {}
+    for name, entries in full['items'].items():
+        base_entries = base['items'].get(name)
+        if base_entries is not None and list(base_entries.items()) == list(entries.items()):
+            continue
+        base_entries = base_entries or {}
+        change = {
+            'set': {item_id: hashed for item_id, hashed in entries.items() if base_entries.get(item_id) != hashed},
+            'remove': [item_id for item_id in base_entries if item_id not in entries]
+        }
+        # Order is only stored when it isn't "base order, then new items appended"
+        derived = [item_id for item_id in base_entries if item_id in entries]
+        derived += [item_id for item_id in entries if item_id not in base_entries]
+        if derived != list(entries):
+            change['order'] = list(entries)
+        sections[name] = change
+    return {
+        'names': full['names'], 'values': full['values'], 'mixed': full['mixed'], 'root': full['root'],
+        'sections': sections
+    }
+
+
+def apply_delta(base: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a full manifest from its base and a delta made by encode_delta()"""
+    full = {
+        'names': delta['names'], 'values': delta['values'], 'mixed': delta['mixed'], 'root': delta['root'],
+        'items': {}
+    }
+    for name in delta['names']:
+        if name in delta['values']:
+            continue
+        change = delta['sections'].get(name)
+        if change is None:
+            full['items'][name] = base['items'][name]
+            continue
+        removed = set(change['remove'])
+        entries = {item_id: hashed for item_id, hashed in base['items'].get(name, {}).items() if item_id not in removed}
+        entries.update(change['set'])
+        if 'order' in change:
+            entries = {item_id: entries[item_id] for item_id in change['order']}
+        full['items'][name] = entries
+    return full
+
+
+def manifest_fingerprint(manifest: Dict[str, Any]) -> ConfigFingerprint:
+    """The ConfigFingerprint of a stored version (manifests hold the same item hashes)"""
+    fingerprint = ConfigFingerprint(manifest['items'])
+    fingerprint.values = dict(manifest['values'])
+    fingerprint.mixed_sections = set(manifest['mixed'])
+    return fingerprint
+
+
+class SnapshotStore:
+    def __init__(self, root: str = "snapshots", keyframe_interval: int = 10, cache_size: int = 4):
+        """
+        Open (or create) the snapshot repository.
+
+        Every distinct item is stored once, compressed and keyed by its content hash,
+        so a new version only adds the items that changed. Each version's manifest
+        (item id -> hash) is either a keyframe or a delta against the previous version
+        of the same file, with a keyframe every keyframe_interval versions.
+
+        Args:
+            root: Directory holding the database (fingerprints are cached next to it)
+            keyframe_interval: Longest delta chain before a full manifest is stored again
+            cache_size: Number of resolved manifests kept in memory
+        """
+        self.root = root
+        self.keyframe_interval = keyframe_interval
+        self.cache_size = cache_size
+        os.makedirs(root, exist_ok=True)
+        self.fingerprints = FingerprintCache(os.path.join(root, "fingerprints"))
+        self.lock = threading.RLock()
+        self.manifest_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.conn = sqlite3.connect(os.path.join(root, "snapshots.db"), check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # Objects
+
+    def _store_objects(self, pending: Dict[str, Any]):
+        """Write the values in {hash: value} that aren't stored yet"""
+        if not pending:
+            return
+        hashes = list(pending)
+        placeholders = ','.join('?' * len(hashes))
+        existing = {
+            row['hash'] for row in self.conn.execute(f"SELECT hash FROM objects WHERE hash IN ({placeholders})", hashes)
+        }
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO objects (hash, data) VALUES (?, ?)",
+            [(hashed, _pack(value)) for hashed, value in pending.items() if hashed not in existing]
+        )
+        pending.clear()
+
+    def load_objects(self, hashes: Iterable[str]) -> Dict[str, Any]:
+        """Fetch stored values by content hash"""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self.lock:
+            for start in range(0, len(hashes), BATCH_SIZE):
+                batch = hashes[start:start + BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                for row in self.conn.execute(f"SELECT hash, data FROM objects WHERE hash IN ({placeholders})", batch):
+                    found[row['hash']] = _unpack(row['data'])
+        missing = [hashed for hashed in hashes if hashed not in found]
+        if missing:
+            raise KeyError(f"Snapshot store is missing {len(missing)} objects (e.g. {missing[0]})")
+        return found
+
+    # Ingest
+
+    def ingest(self, source: ConfigSource, name: str = "storeConfig", label: Optional[str] = None) -> str:
+        """
+        Store a config version, streaming it item by item.
+
+        Args:
+            source: Path, bytes or binary stream of the config file
+            name: Series the version belongs to (deltas are made against the previous version of it)
+            label: Optional human-readable tag (e.g. the game version)
+
+        Returns: The version's digest (SHA-256 of the file bytes); ingesting it again is a no-op
+        """
+        digest = content_hash(source)
+        with self.lock:
+            row = self.conn.execute("SELECT label FROM snapshots WHERE digest = ?", (digest,)).fetchone()
+            if row:
+                if label and not row['label']:
+                    self.conn.execute("UPDATE snapshots SET label = ? WHERE digest = ?", (label, digest))
+                return digest
+
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                manifest, size, item_count = self._ingest_objects(source)
+                previous = self.conn.execute(
+                    "SELECT digest, seq FROM snapshots WHERE name = ? ORDER BY seq DESC LIMIT 1", (name,)
+                ).fetchone()
+                seq = previous['seq'] + 1 if previous else 0
+                base, depth, blob = self._encode(manifest, previous['digest'] if previous else None, seq)
+                self.conn.execute(
+                    "INSERT INTO snapshots (digest, name, label, ingested_at, size, items, seq, base, depth, manifest) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (digest, name, label, datetime.now(timezone.utc).isoformat(), size, item_count, seq, base, depth, blob)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        self._remember(digest, manifest)
+        self.fingerprints.put(digest, manifest_fingerprint(manifest))
+        logger.info(f"Stored snapshot {digest[:12]} of {name} ({item_count} items, {'delta' if base else 'keyframe'})")
+        return digest
+
+    def _ingest_objects(self, source: ConfigSource) -> Tuple[Dict[str, Any], int, int]:
+        """Store every entry of a source and return (manifest, size in bytes, entry count)"""
+        manifest = _empty_manifest()
+        pending: Dict[str, Any] = {}
+        mixed: Set[str] = set()
+        count = 0
+        try:
+            for kind, section, item_id, value in iter_events(source):
+                if kind == START_SECTION:
+                    manifest['names'].append(section)
+                    manifest['items'][section] = {}
+                elif kind == ITEM:
+                    hashed = item_hash(value)
+                    manifest['items'][section][item_id] = hashed
+                    if not isinstance(value, dict):
+                        mixed.add(section)
+                    pending[hashed] = value
+                    count += 1
+                elif kind == VALUE:
+                    hashed = item_hash(value)
+                    manifest['names'].append(section)
+                    manifest['values'][section] = hashed
+                    pending[hashed] = value
+                    count += 1
+                if len(pending) >= BATCH_SIZE:
+                    self._store_objects(pending)
+        except ConfigShapeError:
+            # Not a top-level object (e.g. a BattlePass list): store the document as one object
+            document = load_source(source)
+            manifest = _empty_manifest()
+            manifest['root'] = item_hash(document)
+            pending = {manifest['root']: document}
+            count = 1
+        self._store_objects(pending)
+        manifest['mixed'] = sorted(mixed)
+
+        if isinstance(source, str):
+            size = os.path.getsize(source)
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            size = len(source)
+        else:
+            stream = source() if callable(source) else source
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
+            if callable(source):
+                stream.close()
+        return manifest, size, count
+
+    def _encode(self, manifest: Dict[str, Any], previous: Optional[str], seq: int) -> Tuple[Optional[str], int, bytes]:
+        """Pick keyframe or delta for a new manifest; returns (base digest, chain depth, blob)"""
+        keyframe = _pack(manifest)
+        if previous is None or seq % self.keyframe_interval == 0 or manifest['root'] is not None:
+            return None, 0, keyframe
+        base_manifest = self.manifest(previous)
+        if base_manifest['root'] is not None:
+            return None, 0, keyframe
+        delta = _pack(encode_delta(base_manifest, manifest))
+        if len(delta) >= len(keyframe) // 2:
+            # Most of the file changed; a delta wouldn't save much
+            return None, 0, keyframe
+        depth = self.conn.execute("SELECT depth FROM snapshots WHERE digest = ?", (previous,)).fetchone()['depth']
+        return previous, depth + 1, delta
+
+    # Lookup
+
+    def _remember(self, digest: str, manifest: Dict[str, Any]):
+        with self.lock:
+            self.manifest_cache[digest] = manifest
+            self.manifest_cache.move_to_end(digest)
+            while len(self.manifest_cache) > self.cache_size:
+                self.manifest_cache.popitem(last=False)
+
+    def resolve(self, ref: str) -> str:
+        """
+        Find a stored version by full digest, label (latest wins) or unique digest
+        prefix of at least MIN_PREFIX_LENGTH hex characters. A label that happens to be
+        hex isn't hidden by digests starting with it.
+        """
+        ref = ref.strip()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest FROM snapshots WHERE digest = ?", (ref.lower(),)
+            ).fetchone() or self.conn.execute(
+                "SELECT digest FROM snapshots WHERE label = ? ORDER BY ingested_at DESC LIMIT 1", (ref,)
+            ).fetchone()
+            if row:
+                return row['digest']
+            if not DIGEST_PREFIX.match(ref.lower()):
+                raise KeyError(f"No snapshot matches {ref!r} (use a label or at least {MIN_PREFIX_LENGTH} hex digits of a digest)")
+            prefix = ref.lower()
+            rows = self.conn.execute(
+                "SELECT digest FROM snapshots WHERE substr(digest, 1, ?) = ? ORDER BY seq", (len(prefix), prefix)
+            ).fetchall()
+        if len(rows) > 1:
+            raise KeyError(f"Snapshot reference {ref!r} is ambiguous ({len(rows)} matches)")
+        if not rows:
+            raise KeyError(f"No snapshot matches {ref!r}")
+        return rows[0]['digest']
+
+    def versions(self, name: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored versions, newest first"""
+        query = "SELECT digest, name, label, ingested_at, size, items, base, depth FROM snapshots"
+        params: List[Any] = []
+        if name:
+            query += " WHERE name = ?"
+            params.append(name)
+        query += " ORDER BY ingested_at DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+
+    def manifest(self, digest: str) -> Dict[str, Any]:
+        """Full manifest of a version, replaying deltas from the nearest keyframe"""
+        with self.lock:
+            cached = self.manifest_cache.get(digest)
+            if cached is not None:
+                self.manifest_cache.move_to_end(digest)
+                return cached
+
+            chain = []
+            current = digest
+            while current is not None:
+                if current in self.manifest_cache:
+                    manifest = self.manifest_cache[current]
+                    break
+                row = self.conn.execute("SELECT base, manifest FROM snapshots WHERE digest = ?", (current,)).fetchone()
+                if row is None:
+                    raise KeyError(f"No snapshot {current}")
+                if row['base'] is None:
+                    manifest = _unpack(row['manifest'])
+                    break
+                chain.append(row['manifest'])
+                current = row['base']
+
+            for blob in reversed(chain):
+                manifest = apply_delta(manifest, _unpack(blob))
+        self._remember(digest, manifest)
+        return manifest
+
+    def fingerprint(self, digest: str) -> ConfigFingerprint:
+        return manifest_fingerprint(self.manifest(digest))
+
+    def iter_events(self, digest: str) -> Iterator[Tuple[str, str, Optional[str], Any]]:
+        """Parse events of a stored object-shaped version, loading items a batch at a time"""
+        manifest = self.manifest(digest)
+        for name in manifest['names']:
+            if name in manifest['values']:
+                yield VALUE, name, None, self.load_objects([manifest['values'][name]])[manifest['values'][name]]
+                continue
+            yield START_SECTION, name, None, None
+            entries = list(manifest['items'][name].items())
+            for start in range(0, len(entries), BATCH_SIZE):
+                batch = entries[start:start + BATCH_SIZE]
+                values = self.load_objects(hashed for _, hashed in batch)
+                for item_id, hashed in batch:
+                    yield ITEM, name, item_id, values[hashed]
+            yield END_SECTION, name, None, None
+
+    def load(self, digest: str) -> Any:
+        """A stored version as a Python object"""
+        manifest = self.manifest(digest)
+        if manifest['root'] is not None:
+            return self.load_objects([manifest['root']])[manifest['root']]
+        config = {}
+        for kind, section, item_id, value in self.iter_events(digest):
+            if kind == START_SECTION:
+                config[section] = {}
+            elif kind == ITEM:
+                config[section][item_id] = value
+            elif kind == VALUE:
+                config[section] = value
+        return config
+
+    def iter_dump(self, digest: str) -> Iterator[str]:
+        """A stored version as JSON text (json.dumps(indent=2) layout), streamed"""
+        manifest = self.manifest(digest)
+        if manifest['root'] is not None:
+            yield json.dumps(self.load(digest), indent=2, ensure_ascii=False)
+            return
+        yield from iter_dump_config(self.iter_events(digest))
+
+    # Diff
+
+    def diff(self, old_ref: str, new_ref: str, comparator) -> Dict[str, Any]:
+        """
+        Compare two stored versions, loading only the items whose hashes differ.
+
+        Args:
+            old_ref, new_ref: Digests, digest prefixes or labels
+            comparator: ConfigComparator used to assemble the change set
+        """
+        old_digest, new_digest = self.resolve(old_ref), self.resolve(new_ref)
+        # Stored digests are content hashes, so results are shared with file comparisons
+        return comparator.cached_changes(old_digest, new_digest, lambda: self._diff(old_digest, new_digest, comparator))
+
+    def _diff(self, old_digest: str, new_digest: str, comparator) -> Dict[str, Any]:
+        old_manifest, new_manifest = self.manifest(old_digest), self.manifest(new_digest)
+        if old_manifest['root'] is not None or new_manifest['root'] is not None:
+            return comparator.compare_configs(self.load(old_digest), self.load(new_digest))
+
+        old_fingerprint = manifest_fingerprint(old_manifest)
+        new_fingerprint = manifest_fingerprint(new_manifest)
+        wanted = None if comparator.discover else set(comparator.sections_to_compare)
+
+        # Work out which entries changed from the hashes alone
+        added, removed, modified = [], [], []
+        for name in old_fingerprint.names() | new_fingerprint.names():
+            if wanted is not None and name not in wanted:
+                continue
+            if old_fingerprint.section_unchanged(new_fingerprint, name):
+                continue
+            old_entries = dict(old_manifest['items'].get(name, {}))
+            new_entries = dict(new_manifest['items'].get(name, {}))
+            if name in old_manifest['values']:
+                old_entries[None] = old_manifest['values'][name]
+            if name in new_manifest['values']:
+                new_entries[None] = new_manifest['values'][name]
+            added += [(name, key, hashed) for key, hashed in new_entries.items() if key not in old_entries]
+            for key, hashed in old_entries.items():
+                if key not in new_entries:
+                    removed.append((name, key, hashed))
+                elif new_entries[key] != hashed:
+                    modified.append((name, key, hashed, new_entries[key]))
+
+        values = self.load_objects(
+            [hashed for _, _, hashed in added] + [hashed for _, _, hashed in removed] +
+            [old_hash for _, _, old_hash, _ in modified] + [new_hash for _, _, _, new_hash in modified]
+        )
+        records = [{'type': 'added', 'section': name, 'id': key, 'item': values[hashed]} for name, key, hashed in added]
+        records += [
+            {'type': 'removed', 'section': name, 'id': key, 'item': values[hashed]} for name, key, hashed in removed
+        ]
+        for name, key, old_hash, new_hash in modified:
+            if values[old_hash] != values[new_hash]:
+                records.append({'type': 'modified', 'section': name, 'id': key,
+                                'old': values[old_hash], 'new': values[new_hash]})
+        # Additions in new-file order, then removals and modifications in old-file order, like stream_diff
+        old_positions, new_positions = self._positions(old_manifest), self._positions(new_manifest)
+        records.sort(key=lambda record: (
+            (0, new_positions[(record['section'], record['id'])]) if record['type'] == 'added'
+            else (1, old_positions[(record['section'], record['id'])])
+        ))
+        return comparator.build_changes(records, old_fingerprint, new_fingerprint)
+
+    @staticmethod
+    def _positions(manifest: Dict[str, Any]) -> Dict[Tuple[str, Optional[str]], int]:
+        """Document position of every entry (top-level values use the id None)"""
+        positions = {}
+        for name in manifest['names']:
+            for key in (manifest['items'][name] if name in manifest['items'] else [None]):
+                positions[(name, key)] = len(positions)
+        return positions
+
+    # Maintenance
+
+    def compact(self, keep_per_name: Optional[int] = None, drop: Iterable[str] = ()) -> Dict[str, int]:
+        """
+        Drop old or unwanted versions, rebuild every delta chain from fresh keyframes,
+        delete objects no remaining version uses and reclaim the space.
+
+        Args:
+            keep_per_name: Keep only this many of the newest versions of each file (all if None)
+            drop: Digests to remove regardless
+        """
+        drop = set(drop)
+        with self.lock:
+            rows = self.conn.execute("SELECT digest, name, seq FROM snapshots ORDER BY name, seq").fetchall()
+            series: Dict[str, List[str]] = {}
+            for row in rows:
+                series.setdefault(row['name'], []).append(row['digest'])
+
+            removed = 0
+            referenced: Set[str] = set()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name, digests in series.items():
+                    kept = [digest for digest in digests if digest not in drop]
+                    if keep_per_name is not None:
+                        kept = kept[-keep_per_name:] if keep_per_name > 0 else []
+                    # Resolve everything that stays before any base disappears
+                    manifests = [self.manifest(digest) for digest in kept]
+
+                    for digest in set(digests) - set(kept):
+                        self.conn.execute("DELETE FROM snapshots WHERE digest = ?", (digest,))
+                        self.manifest_cache.pop(digest, None)
+                        removed += 1
+
+                    previous = None
+                    for seq, (digest, manifest) in enumerate(zip(kept, manifests)):
+                        base, depth, blob = self._encode(manifest, previous, seq)
+                        self.conn.execute(
+                            "UPDATE snapshots SET seq = ?, base = ?, depth = ?, manifest = ? WHERE digest = ?",
+                            (seq, base, depth, blob, digest)
+                        )
+                        previous = digest
+                        if manifest['root'] is not None:
+                            referenced.add(manifest['root'])
+                        referenced.update(manifest['values'].values())
+                        for entries in manifest['items'].values():
+                            referenced.update(entries.values())
+
+                self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (hash TEXT PRIMARY KEY)")
+                self.conn.execute("DELETE FROM live")
+                self.conn.executemany("INSERT INTO live (hash) VALUES (?)", ((hashed,) for hashed in referenced))
+                orphaned = self.conn.execute(
+                    "DELETE FROM objects WHERE hash NOT IN (SELECT hash FROM live)"
+                ).rowcount
+                self.conn.execute("DROP TABLE live")
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("VACUUM")
+
+        logger.info(f"Compacted snapshot store: removed {removed} versions and {orphaned} objects")
+        return {'removed_versions': removed, 'removed_objects': orphaned, 'kept_versions': len(rows) - removed}
+
+    def remove(self, ref: str) -> Dict[str, int]:
+        """Delete one stored version (versions built on it are re-encoded first)"""
+        return self.compact(drop=[self.resolve(ref)])
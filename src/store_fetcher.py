@@ -0,0 +1,229 @@
+"""
+Store Fetcher Module
+Async fetch layer for Google Play and App Store version lookups
+"""
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import json
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+from google_play_scraper import app
+from response_cache import ResponseCache
+
+try:
+    # Page URL builder and HTML parser behind google_play_scraper.app(); used so the
+    # Play Store page can go through the pooled session and the response cache
+    from google_play_scraper.constants.request import Formats
+    from google_play_scraper.features.app import parse_dom
+except ImportError:
+    Formats = None
+    parse_dom = None
+
+logger = logging.getLogger(__name__)
+
+PLAY_STORE = 'play_store'
+APP_STORE = 'app_store'
+
+DEFAULT_TIMEOUTS = {
+    PLAY_STORE: 20.0,
+    APP_STORE: 10.0
+}
+
+DEFAULT_HEADERS = {
+    'Accept': 'application/json',
+    'User-Agent': 'Mozilla/5.0'
+}
+
+
+class StoreFetcher:
+    def __init__(self, max_workers: int = 4, timeouts: Optional[Dict[str, float]] = None,
+                 connection_limit: int = 20, connections_per_host: int = 8,
+                 dns_cache_ttl: int = 300, keepalive_timeout: float = 60.0,
+                 cache: Optional[ResponseCache] = None):
+        """
+        Initialize the store fetcher.
+
+        Args:
+            max_workers: Maximum number of threads used for blocking scraper calls
+            timeouts: Per-source timeouts in seconds (keys: 'play_store', 'app_store')
+            connection_limit: Maximum number of pooled connections in total
+            connections_per_host: Maximum number of pooled connections per host
+            dns_cache_ttl: Seconds to cache DNS lookups
+            keepalive_timeout: Seconds an idle connection is kept open for reuse
+            cache: Response cache used for conditional requests (a default one is created if omitted)
+        """
+        self.max_workers = max_workers
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.connection_limit = connection_limit
+        self.connections_per_host = connections_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = cache or ResponseCache()
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self) -> aiohttp.ClientSession:
+        """
+        Open the pooled HTTP session and scraper thread pool.
+        Safe to call repeatedly; fetchers call it lazily if the owner didn't.
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='store-fetch')
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self.session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS)
+            logger.info("Opened pooled store HTTP session")
+        return self.session
+
+    async def close(self):
+        """Close the pooled HTTP session and release the scraper thread pool"""
+        self.cache.flush()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+            logger.info("Closed pooled store HTTP session")
+        self.session = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    async def flush_cache(self):
+        """Write the response cache index once for a batch of lookups, in the scraper thread pool"""
+        if self.cache.dirty:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.cache.flush)
+
+    async def fetch_cached(self, url: str, parse: Callable[[bytes], Any], headers: Optional[Dict[str, str]] = None,
+                           parse_in_executor: bool = False) -> Any:
+        """
+        Fetch a URL through the response cache and return its parsed result.
+        Fresh entries are served without a request, stale ones are revalidated with
+        ETag/Last-Modified, and parsing is skipped when the body hash is unchanged.
+        """
+        entry = self.cache.get(url)
+        if entry and entry.get('parsed') is not None and self.cache.is_fresh(entry):
+            logger.debug(f"Serving fresh cached response for {url}")
+            return entry['parsed']
+
+        request_headers = dict(headers or {})
+        request_headers.update(self.cache.conditional_headers(entry))
+        session = await self.open()
+
+        async with session.get(url, headers=request_headers) as response:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if response.status == 304 and entry:
+                body = None
+            elif response.status != 200:
+                logger.warning(f"Failed to fetch {url}. Status: {response.status}")
+                return None
+            else:
+                body = await response.read()
+
+        if entry and entry.get('parsed') is not None:
+            if body is None or self.cache.body_hash(body) == entry['body_hash']:
+                logger.debug(f"Response for {url} unchanged, skipping parse")
+                self.cache.touch(url, etag, last_modified)
+                return entry['parsed']
+
+        if body is None:
+            # 304 for an entry we never managed to parse; fall back to the stored body
+            body = self.cache.read_body(url)
+            if body is None:
+                return None
+
+        if parse_in_executor:
+            loop = asyncio.get_running_loop()
+            parsed = await loop.run_in_executor(self.executor, parse, body)
+        else:
+            parsed = parse(body)
+
+        self.cache.store(url, body, parsed, etag, last_modified)
+        return parsed
+
+    async def fetch_play_store_version(self, package_name: str, lang: str = 'en', country: str = 'us') -> Optional[str]:
+        """Get the current version from Google Play Store without blocking the event loop"""
+        await self.open()
+
+        if Formats is None or parse_dom is None:
+            # Scraper internals unavailable; run the blocking scraper without caching
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self.executor,
+                functools.partial(app, package_name, lang=lang, country=country)
+            )
+            version = result.get('version')
+        else:
+            url = Formats.Detail.build(app_id=package_name, lang=lang, country=country)
+            version = await self.fetch_cached(
+                url,
+                functools.partial(_parse_play_store_page, package_name=package_name, url=url),
+                headers={'Accept': 'text/html'},
+                parse_in_executor=True
+            )
+
+        logger.info(f"Play Store version: {version}")
+        return version
+
+    async def fetch_app_store_version(self, app_store_id: str, country: str = 'us') -> Optional[str]:
+        """Get the current version from iOS App Store"""
+        url = f"https://itunes.apple.com/lookup?id={app_store_id}&country={country}"
+        version = await self.fetch_cached(url, _parse_app_store_lookup)
+        if version:
+            logger.info(f"App Store version: {version}")
+        return version
+
+    async def fetch_target_version(self, store: str, app_id: str, country: str = 'us') -> Optional[str]:
+        """Look up one (app, store, country) target with the store's timeout applied"""
+        if store == PLAY_STORE:
+            coro = self.fetch_play_store_version(app_id, country=country)
+        elif store == APP_STORE:
+            coro = self.fetch_app_store_version(app_id, country=country)
+        else:
+            raise ValueError(f"Unknown store: {store}")
+        return await self.guarded(store, coro)
+
+    async def fetch_versions(self, package_name: str, app_store_id: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """
+        Look up both stores concurrently.
+        Returns: dict mapping source name to version (None if the lookup failed or timed out)
+        """
+        jobs = {PLAY_STORE: self.fetch_play_store_version(package_name)}
+        if app_store_id:
+            jobs[APP_STORE] = self.fetch_app_store_version(app_store_id)
+
+        versions = await asyncio.gather(*(self.guarded(source, coro) for source, coro in jobs.items()))
+        return dict(zip(jobs.keys(), versions))
+
+    async def guarded(self, source: str, coro) -> Optional[str]:
+        """Run a single lookup with its per-source timeout, logging instead of raising"""
+        try:
+            return await asyncio.wait_for(coro, timeout=self.timeouts[source])
+        except asyncio.TimeoutError:
+            logger.warning(f"{source} lookup timed out after {self.timeouts[source]}s")
+        except Exception as e:
+            logger.error(f"Error getting {source} version: {str(e)}")
+        return None
+
+
+def _parse_play_store_page(body: bytes, package_name: str, url: str) -> Optional[str]:
+    """Extract the version from a Play Store details page"""
+    result = parse_dom(dom=body.decode('utf-8'), app_id=package_name, url=url)
+    return result.get('version')
+
+
+def _parse_app_store_lookup(body: bytes) -> Optional[str]:
+    """Extract the version from an iTunes lookup response"""
+    data = json.loads(body)
+    if data.get('resultCount', 0) > 0:
+        return data['results'][0].get('version')
+    logger.warning("No results found for App Store ID")
+    return None
@@ -0,0 +1,285 @@
+"""
+Tree Diff Module
+Diff two game_data folders file by file, skipping files whose content did not change
+
+Usage:
+    python src/tree_diff.py old_game_data new_game_data [--report report.json]
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config_comparator import ConfigComparator
+from config_fingerprint import FingerprintCache, content_hash
+from diff_cache import DiffCache
+import json_codec
+
+logger = logging.getLogger('funrun_monitor')
+
+# Bumped whenever the manifest layout changes; older manifests are ignored
+MANIFEST_VERSION = 1
+
+# Below this many changed bytes in total, changed files are diffed in-process
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+FileEntry = Dict[str, Any]
+
+
+def diff_file_pair(old_path: str, new_path: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Diff two config files with the given comparator options. Module-level so it can run in a worker process."""
+    comparator = ConfigComparator(
+        owned_flag=options["owned_flag"],
+        discover_sections=options["discover"],
+        # Already in a worker: never start a nested pool
+        parallel_threshold=sys.maxsize
+    )
+    comparator.sections_to_compare = list(options["sections"])
+    return comparator.compare_config_streams(old_path, new_path)
+
+
+def tree_files(root: str) -> List[str]:
+    """Relative paths ('/'-separated) of every .json file under root, hidden folders skipped"""
+    paths = []
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+        for name in sorted(files):
+            if name.lower().endswith('.json'):
+                paths.append(os.path.relpath(os.path.join(folder, name), root).replace(os.sep, '/'))
+    return paths
+
+
+def has_changes(changes: Dict[str, Any]) -> bool:
+    return any([changes["added"], changes["removed"], changes["modified"], changes["other"]])
+
+
+class TreeDiff:
+    def __init__(self, comparator, manifest_dir: str = os.path.join("snapshots", "manifests"),
+                 max_workers: Optional[int] = None):
+        """
+        Compare whole data folders (storeConfig.json, BattlePass/*.json, ...).
+
+        Each folder gets a manifest of (path, size, mtime, content hash); a file whose size
+        and mtime match the last scan is not hashed again, files with equal hashes on both
+        sides are never parsed, and pairs diffed before come from the comparator's diff cache.
+
+        Args:
+            comparator: ConfigComparator whose options, diff cache and worker pool are used
+            manifest_dir: Where the manifest of every scanned folder is kept (None to keep none)
+            max_workers: Threads hashing new or touched files (defaults to the CPU count)
+        """
+        self.comparator = comparator
+        self.manifest_dir = manifest_dir
+        self.max_workers = max_workers or os.cpu_count() or 2
+
+    def _manifest_path(self, root: str) -> str:
+        name = hashlib.blake2b(os.path.abspath(root).encode('utf-8'), digest_size=12).hexdigest()
+        return os.path.join(self.manifest_dir, f"{name}.json")
+
+    def load_manifest(self, root: str) -> Dict[str, FileEntry]:
+        """The files recorded by the last scan of a folder, or {}"""
+        if not self.manifest_dir:
+            return {}
+        try:
+            with open(self._manifest_path(root), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != MANIFEST_VERSION or data.get('root') != os.path.abspath(root):
+                return {}
+            return data['files']
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable manifest for {root}: {str(e)}")
+            return {}
+
+    def save_manifest(self, root: str, files: Dict[str, FileEntry]):
+        if not self.manifest_dir:
+            return
+        try:
+            os.makedirs(self.manifest_dir, exist_ok=True)
+            path = self._manifest_path(root)
+            with open(path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump({'version': MANIFEST_VERSION, 'root': os.path.abspath(root), 'files': files}, f, separators=(',', ':'))
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.error(f"Error saving manifest for {root}: {str(e)}")
+
+    def scan(self, root: str) -> Tuple[Dict[str, FileEntry], int]:
+        """
+        Manifest of a folder: {relative path: {'size', 'mtime_ns', 'digest'}}.
+        Returns: (manifest, number of files that had to be hashed)
+        """
+        if not os.path.isdir(root):
+            raise FileNotFoundError(f"Not a folder: {root}")
+        previous = self.load_manifest(root)
+        files: Dict[str, FileEntry] = {}
+        to_hash = []
+        for path in tree_files(root):
+            stat = os.stat(os.path.join(root, path))
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': None}
+            known = previous.get(path)
+            if known and known['size'] == entry['size'] and known['mtime_ns'] == entry['mtime_ns']:
+                entry['digest'] = known['digest']
+            else:
+                to_hash.append(path)
+            files[path] = entry
+
+        if to_hash:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as threads:
+                digests = threads.map(lambda path: content_hash(os.path.join(root, path)), to_hash)
+                for path, digest in zip(to_hash, digests):
+                    files[path]['digest'] = digest
+        if to_hash or set(files) != set(previous):
+            self.save_manifest(root, files)
+        return files, len(to_hash)
+
+    def _diff_changed(self, old_root: str, new_root: str, pairs: List[Tuple[str, FileEntry, FileEntry]]) -> Iterable[Tuple[str, Any]]:
+        """(path, change set or exception) for each changed file, in worker processes when large enough"""
+        if len(pairs) < 2 or sum(new['size'] for _, _, new in pairs) < PARALLEL_MIN_BYTES:
+            for path, old, new in pairs:
+                try:
+                    yield path, self.comparator.compare_config_streams(
+                        os.path.join(old_root, path), os.path.join(new_root, path), old['digest'], new['digest'])
+                except Exception as e:
+                    yield path, e
+            return
+
+        options = {
+            "owned_flag": self.comparator.owned_flag,
+            "discover": self.comparator.discover,
+            "sections": self.comparator.sections_to_compare
+        }
+        pool = self.comparator.pool()
+        futures = [
+            (path, old, new, pool.submit(diff_file_pair, os.path.join(old_root, path), os.path.join(new_root, path), options))
+            for path, old, new in pairs
+        ]
+        for path, old, new, future in futures:
+            try:
+                changes = future.result()
+            except Exception as e:
+                yield path, e
+                continue
+            if self.comparator.diff_cache:
+                self.comparator.diff_cache.put(self.comparator.cache_key(old['digest'], new['digest']), changes)
+            yield path, changes
+
+    def diff(self, old_root: str, new_root: str) -> Dict[str, Any]:
+        """
+        Diff every .json file of two folders, matched by relative path.
+
+        Returns: {
+            'old_root', 'new_root',
+            'added': [paths only in new_root], 'removed': [paths only in old_root],
+            'unchanged': [paths with identical (or equivalent) content],
+            'modified': {path: change set},
+            'errors': {path: message},             # files that could not be parsed
+            'stats': {'files', 'hashed', 'diffed', 'cached'}
+        }
+        """
+        old_files, old_hashed = self.scan(old_root)
+        new_files, new_hashed = self.scan(new_root)
+        report = {
+            'old_root': old_root,
+            'new_root': new_root,
+            'added': sorted(set(new_files) - set(old_files)),
+            'removed': sorted(set(old_files) - set(new_files)),
+            'unchanged': [],
+            'modified': {},
+            'errors': {},
+            'stats': {'files': len(set(old_files) | set(new_files)), 'hashed': old_hashed + new_hashed, 'diffed': 0, 'cached': 0}
+        }
+
+        results = {}
+        pending = []
+        for path in sorted(set(old_files) & set(new_files)):
+            old, new = old_files[path], new_files[path]
+            if old['digest'] == new['digest']:
+                report['unchanged'].append(path)
+                continue
+            cache = self.comparator.diff_cache
+            cached = cache.get(self.comparator.cache_key(old['digest'], new['digest'])) if cache else None
+            if cached is not None:
+                results[path] = cached
+                report['stats']['cached'] += 1
+            else:
+                pending.append((path, old, new))
+
+        for path, changes in self._diff_changed(old_root, new_root, pending):
+            if isinstance(changes, Exception):
+                report['errors'][path] = str(changes)
+            else:
+                results[path] = changes
+                report['stats']['diffed'] += 1
+
+        for path in sorted(results):
+            if has_changes(results[path]):
+                report['modified'][path] = results[path]
+            else:
+                # Reformatted only
+                report['unchanged'].append(path)
+        report['unchanged'].sort()
+        stats = report['stats']
+        logger.info(
+            f"Tree diff of {stats['files']} files: {len(report['modified'])} modified, {len(report['added'])} added, "
+            f"{len(report['removed'])} removed ({stats['hashed']} hashed, {stats['diffed']} diffed, {stats['cached']} cached)"
+        )
+        return report
+
+
+def format_report(report: Dict[str, Any], max_lines: int = 10) -> str:
+    """Plain-text summary of a tree diff, up to max_lines summary lines per file"""
+    stats = report['stats']
+    lines = [
+        f"TREE DIFF: {report['old_root']} -> {report['new_root']}",
+        f"{stats['files']} files: {len(report['modified'])} modified, {len(report['added'])} added, "
+        f"{len(report['removed'])} removed, {len(report['unchanged'])} unchanged",
+        f"({stats['hashed']} hashed, {stats['diffed']} diffed, {stats['cached']} from cache)",
+        ""
+    ]
+    for path, changes in report['modified'].items():
+        lines.append(f"~ {path}")
+        summary = changes['summary']
+        lines.extend(f"    {line}" for line in summary[:max_lines])
+        if len(summary) > max_lines:
+            lines.append(f"    ... and {len(summary) - max_lines} more")
+    lines.extend(f"+ {path}" for path in report['added'])
+    lines.extend(f"- {path}" for path in report['removed'])
+    lines.extend(f"! {path}: {message}" for path, message in report['errors'].items())
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Diff every config file of two game_data folders")
+    parser.add_argument("old_root", help="Folder with the old version")
+    parser.add_argument("new_root", help="Folder with the new version")
+    parser.add_argument("--report", help="Also write the full report (with every change set) to this JSON file")
+    parser.add_argument("--workers", type=int, help="Worker processes for diffing large files")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore manifests and cached diffs from earlier runs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    comparator = ConfigComparator(
+        max_workers=args.workers,
+        fingerprint_cache=None if args.no_cache else FingerprintCache(),
+        diff_cache=None if args.no_cache else DiffCache()
+    )
+    try:
+        report = TreeDiff(comparator, manifest_dir=None if args.no_cache else os.path.join("snapshots", "manifests"),
+                          max_workers=args.workers).diff(args.old_root, args.new_root)
+    finally:
+        comparator.close()
+
+    print(format_report(report), end="")
+    if args.report:
+        with open(args.report, 'wb') as f:
+            f.write(json_codec.dumps(report, indent=2))
+    return 1 if report['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
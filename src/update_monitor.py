@@ -1,236 +1,344 @@
-"""
-Uptodown Monitor Module
-Handles checking for Fun Run 4 updates on Uptodown
-"""
-import os
-import json
-import aiohttp
-from datetime import datetime, timezone
-from typing import Tuple, Optional
-from google_play_scraper import app
-import logging
-
-logger = logging.getLogger(__name__)
-
-def compare_versions(version1, version2):
-    """Compare two version strings. Returns 1 if v1 > v2, -1 if v1 < v2, 0 if equal"""
-    v1_parts = [int(x) for x in version1.split('.')]
-    v2_parts = [int(x) for x in version2.split('.')]
-    
-    # Pad shorter version with zeros
-    max_len = max(len(v1_parts), len(v2_parts))
-    v1_parts.extend([0] * (max_len - len(v1_parts)))
-    v2_parts.extend([0] * (max_len - len(v2_parts)))
-    
-    for v1, v2 in zip(v1_parts, v2_parts):
-        if v1 > v2:
-            return 1
-        elif v1 < v2:
-            return -1
-    return 0
-
-class StoreMonitor:
-    def __init__(self, package_name: str, app_store_id: Optional[str] = None):
-        """
-        Initialize the store monitor.
-        
-        Args:
-            package_name: Google Play package name (e.g., 'com.dirtybit.fra')
-            app_store_id: iOS App Store ID (optional, e.g., '1451163837')
-        """
-        self.version_file = "version_data.json"
-        self.package_name = package_name
-        self.app_store_id = app_store_id
-        self.current_versions = {
-            'play_store': None,
-            'app_store': None
-        }
-        self.last_check = None
-        self.load_version_data()
-    
-    def load_version_data(self):
-        """Load the last known versions from disk"""
-        try:
-            if os.path.exists(self.version_file):
-                with open(self.version_file, 'r') as f:
-                    data = json.load(f)
-                    self.current_versions = data.get('versions', {
-                        'play_store': None,
-                        'app_store': None
-                    })
-                    self.last_check = data.get('last_check')
-                    logger.info(f"Loaded version data: Play Store={self.current_versions.get('play_store')}, App Store={self.current_versions.get('app_store')} (last check: {self.last_check})")
-            else:
-                logger.info("No version data file found, starting fresh")
-        except Exception as e:
-            logger.error(f"Error loading version data: {str(e)}")
-    
-    def save_version_data(self):
-        """Save the current version data to disk"""
-        try:
-            data = {
-                'versions': self.current_versions,
-                'last_check': datetime.now(timezone.utc).isoformat()
-            }
-            with open(self.version_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Saved version data: {self.current_versions}")
-        except Exception as e:
-            logger.error(f"Error saving version data: {str(e)}")
-    
-    async def get_play_store_version(self) -> Optional[str]:
-        """Get the current version from Google Play Store"""
-        try:
-            result = app(self.package_name, lang='en', country='us')
-            version = result.get('version')
-            logger.info(f"Play Store version: {version}")
-            return version
-        except Exception as e:
-            logger.error(f"Error getting Play Store version: {str(e)}")
-            return None
-    
-    async def get_app_store_version(self) -> Optional[str]:
-        """Get the current version from iOS App Store"""
-        if not self.app_store_id:
-            return None
-        
-        try:
-            url = f"https://itunes.apple.com/lookup?id={self.app_store_id}"
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        logger.warning(f"Failed to fetch from App Store. Status: {response.status}")
-                        return None
-                    
-                    data = await response.json()
-                    if data.get('resultCount', 0) > 0:
-                        version = data['results'][0].get('version')
-                        logger.info(f"App Store version: {version}")
-                        return version
-                    else:
-                        logger.warning("No results found for App Store ID")
-                        return None
-        except Exception as e:
-            logger.error(f"Error getting App Store version: {str(e)}")
-            return None
-    
-    async def check_store_updates(self) -> dict:
-        """
-        Check both stores for updates.
-        Returns: dict with update information for each store
-        """
-        results = {
-            'play_store': {'has_update': False, 'new_version': None, 'info': None},
-            'app_store': {'has_update': False, 'new_version': None, 'info': None}
-        }
-        
-        # Check Play Store
-        play_version = await self.get_play_store_version()
-        if play_version:
-            if self.current_versions['play_store'] is None:
-                # First time detection
-                self.current_versions['play_store'] = play_version
-                results['play_store'] = {
-                    'has_update': False,
-                    'new_version': play_version,
-                    'info': f"Initial Play Store version detected: {play_version}"
-                }
-                logger.info(f"Initial Play Store version detected: {play_version}")
-            elif play_version != self.current_versions['play_store']:
-                # New version detected
-                old_version = self.current_versions['play_store']
-                self.current_versions['play_store'] = play_version
-                results['play_store'] = {
-                    'has_update': True,
-                    'new_version': play_version,
-                    'info': f"Play Store version updated from {old_version} to {play_version}"
-                }
-                logger.info(f"New Play Store version detected: {old_version} -> {play_version}")
-            else:
-                results['play_store'] = {
-                    'has_update': False,
-                    'new_version': play_version,
-                    'info': "No Play Store update available"
-                }
-        else:
-            results['play_store']['info'] = "Could not retrieve Play Store version"
-        
-        # Check App Store
-        if self.app_store_id:
-            app_version = await self.get_app_store_version()
-            if app_version:
-                if self.current_versions['app_store'] is None:
-                    # First time detection
-                    self.current_versions['app_store'] = app_version
-                    results['app_store'] = {
-                        'has_update': False,
-                        'new_version': app_version,
-                        'info': f"Initial App Store version detected: {app_version}"
-                    }
-                    logger.info(f"Initial App Store version detected: {app_version}")
-                elif app_version != self.current_versions['app_store']:
-                    # New version detected
-                    old_version = self.current_versions['app_store']
-                    self.current_versions['app_store'] = app_version
-                    results['app_store'] = {
-                        'has_update': True,
-                        'new_version': app_version,
-                        'info': f"App Store version updated from {old_version} to {app_version}"
-                    }
-                    logger.info(f"New App Store version detected: {old_version} -> {app_version}")
-                else:
-                    results['app_store'] = {
-                        'has_update': False,
-                        'new_version': app_version,
-                        'info': "No App Store update available"
-                    }
-            else:
-                results['app_store']['info'] = "Could not retrieve App Store version"
-        
-        # Save version data after checking
-        self.save_version_data()
-        
-        return results
-    
-    async def check_update(self) -> Tuple[bool, Optional[str], Optional[str]]:
-        """
-        Legacy method to maintain compatibility with old code.
-        Checks Play Store only and returns in the old format.
-        Returns: (has_update, new_version, update_info)
-        """
-        play_version = await self.get_play_store_version()
-        
-        if play_version:
-            if self.current_versions['play_store'] is None:
-                self.current_versions['play_store'] = play_version
-                self.save_version_data()
-                logger.info(f"Initial version detected: {play_version}")
-                return False, play_version, "Initial version detection"
-            
-            if play_version != self.current_versions['play_store']:
-                old_version = self.current_versions['play_store']
-                self.current_versions['play_store'] = play_version
-                self.save_version_data()
-                logger.info(f"New version detected: {old_version} -> {play_version}")
-                return True, play_version, f"Version updated from {old_version} to {play_version}"
-            
-            return False, play_version, "No update available"
-        else:
-            logger.warning("Could not retrieve version information from Play Store")
-            return False, None, "Could not retrieve version information"
-
-
-# Example usage:
-# For Fun Run 4
-# monitor = StoreMonitor(
-#     package_name='com.dirtybit.fra',  # Fun Run 4 package name
-#     app_store_id='1451163837'         # Fun Run 4 App Store ID (optional)
-# )
-# results = await monitor.check_store_updates()
-    
-    def reset_version(self):
-        """Reset version data for testing"""
-        self.current_version = None
-        if os.path.exists(self.version_file):
-            os.remove(self.version_file)
-        logger.info("Version data reset")
+"""
+Uptodown Monitor Module
+Handles checking for Fun Run 4 updates on Uptodown
+"""
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import logging
+from store_fetcher import StoreFetcher, PLAY_STORE, APP_STORE
+from version_history import VersionHistory, OUTCOME_INITIAL, OUTCOME_UPDATE, OUTCOME_UNCHANGED, OUTCOME_ERROR
+
+logger = logging.getLogger(__name__)
+
+STORE_LABELS = {
+    PLAY_STORE: "Play Store",
+    APP_STORE: "App Store"
+}
+
+class MonitorTarget(NamedTuple):
+    """One (app, store, country) combination to monitor"""
+    app: str
+    store: str
+    country: str = 'us'
+    
+    @property
+    def key(self) -> str:
+        return f"{self.store}:{self.app}:{self.country}"
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'MonitorTarget':
+        return cls(app=str(data['app']), store=data['store'], country=data.get('country', 'us').lower())
+
+def new_target_state() -> Dict:
+    return {
+        'version': None,
+        'last_checked': None,
+        'last_update': None,
+        'last_error': None,
+        'consecutive_failures': 0,
+        'latency_ms': None
+    }
+
+def compare_versions(version1, version2):
+    """Compare two version strings. Returns 1 if v1 > v2, -1 if v1 < v2, 0 if equal"""
+    v1_parts = [int(x) for x in version1.split('.')]
+    v2_parts = [int(x) for x in version2.split('.')]
+    
+    # Pad shorter version with zeros
+    max_len = max(len(v1_parts), len(v2_parts))
+    v1_parts.extend([0] * (max_len - len(v1_parts)))
+    v2_parts.extend([0] * (max_len - len(v2_parts)))
+    
+    for v1, v2 in zip(v1_parts, v2_parts):
+        if v1 > v2:
+            return 1
+        elif v1 < v2:
+            return -1
+    return 0
+
+class StoreMonitor:
+    def __init__(self, package_name: str, app_store_id: Optional[str] = None, fetcher: Optional[StoreFetcher] = None,
+                 targets: Optional[List[MonitorTarget]] = None, max_concurrency: int = 4, stagger_seconds: float = 0.25,
+                 result_ttl: float = 30.0, history: Optional[VersionHistory] = None):
+        """
+        Initialize the store monitor.
+        
+        Args:
+            package_name: Google Play package name (e.g., 'com.dirtybit.fra')
+            app_store_id: iOS App Store ID (optional, e.g., '1451163837')
+            fetcher: Async fetch layer used for store lookups (a default one is created if omitted)
+            targets: Extra (app, store, country) targets to monitor besides the two primary ones
+            max_concurrency: Maximum number of store lookups in flight at once
+            stagger_seconds: Delay between the start of consecutive target lookups
+            result_ttl: Seconds a finished check is reused for repeated check requests
+            history: Check history database (a default one is created if omitted)
+        """
+        self.version_file = "version_data.json"
+        self.package_name = package_name
+        self.app_store_id = app_store_id
+        self.fetcher = fetcher or StoreFetcher()
+        self.history = history or VersionHistory()
+        self.max_concurrency = max(1, max_concurrency)
+        self.stagger_seconds = stagger_seconds
+        
+        # The primary targets back the legacy 'play_store' / 'app_store' results
+        self.primary_targets = {PLAY_STORE: MonitorTarget(package_name, PLAY_STORE)}
+        if app_store_id:
+            self.primary_targets[APP_STORE] = MonitorTarget(str(app_store_id), APP_STORE)
+        self.targets: List[MonitorTarget] = list(self.primary_targets.values())
+        for target in targets or []:
+            if target not in self.targets:
+                self.targets.append(target)
+        
+        self.target_states: Dict[str, Dict] = {target.key: new_target_state() for target in self.targets}
+        self.release_history: List[datetime] = []
+        self.last_check = None
+        
+        # Single-flight state: concurrent callers share one check, recent results are reused
+        self.result_ttl = result_ttl
+        self._inflight: Optional[asyncio.Future] = None
+        self._last_results: Optional[dict] = None
+        self._last_results_at = 0.0
+        
+        self.load_version_data()
+    
+    @property
+    def current_versions(self) -> Dict[str, Optional[str]]:
+        """Last known version of each primary target, keyed by store"""
+        versions = {PLAY_STORE: None, APP_STORE: None}
+        for store, target in self.primary_targets.items():
+            versions[store] = self.target_states[target.key]['version']
+        return versions
+    
+    def load_version_data(self):
+        """Load the last known versions and release history from the history database"""
+        try:
+            states = self.history.load_states()
+            if not states:
+                # One-time import of the version_data.json used by older versions
+                primary_keys = {store: target.key for store, target in self.primary_targets.items()}
+                if self.history.import_legacy_file(self.version_file, primary_keys):
+                    states = self.history.load_states()
+            
+            for key, state in states.items():
+                if key in self.target_states:
+                    self.target_states[key].update(state)
+            self.last_check = self.history.last_check()
+            self.release_history = self.history.release_times()
+            logger.info(f"Loaded version data: Play Store={self.current_versions.get('play_store')}, App Store={self.current_versions.get('app_store')} (last check: {self.last_check})")
+        except Exception as e:
+            logger.error(f"Error loading version data: {str(e)}")
+    
+    async def record_results(self, target_results: Dict[str, dict]):
+        """Write one history row per target plus the updated states, atomically and off the event loop"""
+        self.last_check = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for result in target_results.values():
+            target = result['target']
+            rows.append({
+                'checked_at': result['checked_at'],
+                'target': target.key,
+                'store': target.store,
+                'app': target.app,
+                'country': target.country,
+                'version': result['new_version'],
+                'latency_ms': result['latency_ms'],
+                'outcome': result['outcome']
+            })
+        
+        try:
+            await self.history.record_checks(rows, self.target_states, self.last_check)
+            logger.info(f"Saved version data: {self.current_versions}")
+        except Exception as e:
+            logger.error(f"Error saving version data: {str(e)}")
+    
+    async def start(self):
+        """Open the pooled HTTP session used by the store fetchers"""
+        await self.fetcher.open()
+    
+    async def close(self):
+        """Close the pooled HTTP session and the history database"""
+        await self.fetcher.close()
+        self.history.close()
+    
+    async def get_play_store_version(self) -> Optional[str]:
+        """Get the current version from Google Play Store"""
+        return await self.fetcher.fetch_target_version(PLAY_STORE, self.package_name)
+    
+    async def get_app_store_version(self) -> Optional[str]:
+        """Get the current version from iOS App Store"""
+        if not self.app_store_id:
+            return None
+        
+        return await self.fetcher.fetch_target_version(APP_STORE, str(self.app_store_id))
+    
+    def target_label(self, target: MonitorTarget) -> str:
+        """Human readable name for a target; primary targets keep the plain store name"""
+        label = STORE_LABELS.get(target.store, target.store)
+        if self.primary_targets.get(target.store) == target:
+            return label
+        return f"{label} ({target.app}, {target.country.upper()})"
+    
+    def _apply_version(self, target: MonitorTarget, version: Optional[str], latency_ms: float) -> dict:
+        """Compare a fetched version against the target's stored one and build the result entry"""
+        state = self.target_states[target.key]
+        label = self.target_label(target)
+        checked_at = datetime.now(timezone.utc)
+        state['last_checked'] = checked_at.isoformat()
+        state['latency_ms'] = round(latency_ms, 1)
+        
+        if not version:
+            state['consecutive_failures'] += 1
+            state['last_error'] = state['last_checked']
+            result = {'has_update': False, 'new_version': None, 'info': f"Could not retrieve {label} version",
+                      'outcome': OUTCOME_ERROR}
+        elif state['version'] is None:
+            # First time detection
+            state['consecutive_failures'] = 0
+            state['version'] = version
+            logger.info(f"Initial {label} version detected: {version}")
+            result = {
+                'has_update': False,
+                'new_version': version,
+                'info': f"Initial {label} version detected: {version}",
+                'outcome': OUTCOME_INITIAL
+            }
+        elif version != state['version']:
+            # New version detected
+            state['consecutive_failures'] = 0
+            old_version = state['version']
+            state['version'] = version
+            state['last_update'] = state['last_checked']
+            self.release_history.append(checked_at)
+            logger.info(f"New {label} version detected: {old_version} -> {version}")
+            result = {
+                'has_update': True,
+                'new_version': version,
+                'old_version': old_version,
+                'info': f"{label} version updated from {old_version} to {version}",
+                'outcome': OUTCOME_UPDATE
+            }
+        else:
+            state['consecutive_failures'] = 0
+            result = {
+                'has_update': False,
+                'new_version': version,
+                'info': f"No {label} update available",
+                'outcome': OUTCOME_UNCHANGED
+            }
+        
+        result['checked_at'] = state['last_checked']
+        result['latency_ms'] = state['latency_ms']
+        return result
+    
+    async def check_target(self, target: MonitorTarget) -> dict:
+        """Check a single target and update its state"""
+        started = time.monotonic()
+        version = await self.fetcher.fetch_target_version(target.store, target.app, target.country)
+        result = self._apply_version(target, version, (time.monotonic() - started) * 1000)
+        result['target'] = target
+        return result
+    
+    async def check_targets(self, targets: Optional[List[MonitorTarget]] = None) -> Dict[str, dict]:
+        """
+        Check many targets concurrently.
+        Lookups start staggered so they don't burst, and at most max_concurrency run at once.
+        Returns: dict mapping target key to its result entry
+        """
+        targets = targets if targets is not None else self.targets
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run(index: int, target: MonitorTarget) -> dict:
+            await asyncio.sleep(index * self.stagger_seconds)
+            async with semaphore:
+                return await self.check_target(target)
+        
+        results = await asyncio.gather(*(run(index, target) for index, target in enumerate(targets)))
+        return {target.key: result for target, result in zip(targets, results)}
+    
+    async def check_store_updates(self, max_age: Optional[float] = None) -> dict:
+        """
+        Check every monitored target for updates.
+        Concurrent callers await the same in-flight check, and a result younger than
+        max_age (default: result_ttl) is returned without contacting the stores. A reused
+        result reports no updates: they were already reported to the caller that ran the check.
+        Returns: dict with update information for each primary store, plus every target under 'targets'
+        """
+        max_age = self.result_ttl if max_age is None else max_age
+        if self._last_results is not None and time.monotonic() - self._last_results_at < max_age:
+            logger.debug("Reusing update check result from the last few seconds")
+            return self._reused_results(self._last_results)
+        
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._run_store_check())
+        else:
+            logger.debug("Joining update check already in flight")
+        # Shield so one caller being cancelled doesn't cancel the check for everyone else
+        return await asyncio.shield(self._inflight)
+    
+    def _reused_results(self, results: dict) -> dict:
+        """A finished check's results for a later caller, with its updates shown as already known"""
+        def reused(entry: dict) -> dict:
+            if not entry.get('has_update'):
+                return entry
+            label = self.target_label(entry['target'])
+            entry = {key: value for key, value in entry.items() if key != 'old_version'}
+            return dict(entry, has_update=False, info=f"No {label} update available", outcome=OUTCOME_UNCHANGED)
+        
+        copied = {key: reused(entry) for key, entry in results.items() if key != 'targets'}
+        copied['targets'] = {key: reused(entry) for key, entry in results['targets'].items()}
+        return copied
+    
+    async def _run_store_check(self) -> dict:
+        """Run one full check of every target (use check_store_updates to get coalescing)"""
+        results = {
+            'play_store': {'has_update': False, 'new_version': None, 'info': None},
+            'app_store': {'has_update': False, 'new_version': None, 'info': None}
+        }
+        
+        target_results = await self.check_targets()
+        # Cached store responses revalidated by this check are written once, not per lookup
+        await self.fetcher.flush_cache()
+        for store, target in self.primary_targets.items():
+            results[store] = target_results[target.key]
+        results['targets'] = target_results
+        
+        # Record this check in the history database
+        await self.record_results(target_results)
+        
+        self._last_results = results
+        self._last_results_at = time.monotonic()
+        return results
+    
+    async def check_update(self) -> Tuple[bool, Optional[str], Optional[str]]:
+        """
+        Legacy method to maintain compatibility with old code.
+        Runs a (coalesced) full check and returns the Play Store result in the old format.
+        Returns: (has_update, new_version, update_info)
+        """
+        result = (await self.check_store_updates())[PLAY_STORE]
+        return result['has_update'], result['new_version'], result['info']
+    
+    def release_times(self) -> List[datetime]:
+        """Timestamps of every update observed across all targets"""
+        return list(self.release_history)
+    
+    def reset_version(self):
+        """Reset version data for testing (the check history is kept)"""
+        self.target_states = {target.key: new_target_state() for target in self.targets}
+        self.last_check = None
+        self._last_results = None
+        self.history.reset_states()
+        logger.info("Version data reset")
+
+
+# Example usage:
+# For Fun Run 4
+# monitor = StoreMonitor(
+#     package_name='com.dirtybit.fra',  # Fun Run 4 package name
+#     app_store_id='1451163837',        # Fun Run 4 App Store ID (optional)
+#     targets=[MonitorTarget('com.dirtybit.fra', 'play_store', 'gb')]
+# )
+# results = await monitor.check_store_updates()
@@ -0,0 +1,226 @@
+"""
+Version History Module
+SQLite-backed history of every store check, replacing version_data.json
+"""
+import os
+import json
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Outcomes recorded for each target check
+OUTCOME_INITIAL = 'initial'
+OUTCOME_UPDATE = 'update'
+OUTCOME_UNCHANGED = 'unchanged'
+OUTCOME_ERROR = 'error'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    checked_at TEXT NOT NULL,
+    target TEXT NOT NULL,
+    store TEXT NOT NULL,
+    app TEXT NOT NULL,
+    country TEXT NOT NULL,
+    version TEXT,
+    latency_ms REAL,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checks_target_time ON checks (target, checked_at);
+CREATE INDEX IF NOT EXISTS idx_checks_outcome_time ON checks (outcome, checked_at);
+CREATE TABLE IF NOT EXISTS target_state (
+    target TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class VersionHistory:
+    def __init__(self, db_path: str = "version_history.db"):
+        """
+        Open (or create) the history database.
+
+        Args:
+            db_path: Path of the SQLite database file
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        # One writer thread keeps database work off the event loop and in order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='version-history')
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+
+    def close(self):
+        """Finish pending writes and close the database"""
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self.conn.close()
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    # Writes
+
+    def write_checks(self, rows: List[Dict[str, Any]], states: Dict[str, Dict], last_check: Optional[str] = None):
+        """
+        Store a batch of check rows and the matching target states in one transaction.
+        Either everything from a check is written or nothing is.
+        """
+        with self.lock:
+            try:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.conn.executemany(
+                    "INSERT INTO checks (checked_at, target, store, app, country, version, latency_ms, outcome) "
+                    "VALUES (:checked_at, :target, :store, :app, :country, :version, :latency_ms, :outcome)",
+                    rows
+                )
+                self.conn.executemany(
+                    "INSERT INTO target_state (target, state) VALUES (?, ?) "
+                    "ON CONFLICT(target) DO UPDATE SET state = excluded.state",
+                    [(target, json.dumps(state)) for target, state in states.items()]
+                )
+                if last_check:
+                    self.conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('last_check', ?) "
+                        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                        (last_check,)
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    async def record_checks(self, rows: List[Dict[str, Any]], states: Dict[str, Dict], last_check: Optional[str] = None):
+        """Async wrapper for write_checks that runs on the history thread"""
+        await self._run(self.write_checks, rows, states, last_check)
+
+    def reset_states(self):
+        """Forget the known target states; the check history itself is kept"""
+        with self.lock:
+            self.conn.execute("DELETE FROM target_state")
+            self.conn.execute("DELETE FROM meta WHERE key = 'last_check'")
+
+    # Reads
+
+    def load_states(self) -> Dict[str, Dict]:
+        with self.lock:
+            rows = self.conn.execute("SELECT target, state FROM target_state").fetchall()
+        return {row['target']: json.loads(row['state']) for row in rows}
+
+    def last_check(self) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_check'").fetchone()
+        return row['value'] if row else None
+
+    def release_times(self, target: Optional[str] = None) -> List[datetime]:
+        """Timestamps of every detected update, oldest first"""
+        query = "SELECT checked_at FROM checks WHERE outcome = ?"
+        params: List[Any] = [OUTCOME_UPDATE]
+        if target:
+            query += " AND target = ?"
+            params.append(target)
+        with self.lock:
+            rows = self.conn.execute(query + " ORDER BY checked_at", params).fetchall()
+        return [datetime.fromisoformat(row['checked_at']) for row in rows]
+
+    def versions_between(self, start: datetime, end: datetime, target: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Every version seen between two dates.
+        Returns: list of {target, version, first_seen, last_seen, checks}, ordered by first_seen
+        """
+        query = (
+            "SELECT target, version, MIN(checked_at) AS first_seen, MAX(checked_at) AS last_seen, COUNT(*) AS checks "
+            "FROM checks WHERE outcome != ? AND version IS NOT NULL AND checked_at BETWEEN ? AND ?"
+        )
+        params: List[Any] = [OUTCOME_ERROR, start.isoformat(), end.isoformat()]
+        if target:
+            query += " AND target = ?"
+            params.append(target)
+        query += " GROUP BY target, version ORDER BY first_seen"
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def release_intervals(self, target: str) -> List[Dict[str, Any]]:
+        """
+        Time between consecutive releases of one target.
+        Returns: list of {version, released_at, since_previous} (since_previous is None for the first)
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT version, checked_at FROM checks WHERE target = ? AND outcome IN (?, ?) ORDER BY checked_at",
+                (target, OUTCOME_INITIAL, OUTCOME_UPDATE)
+            ).fetchall()
+
+        intervals = []
+        previous = None
+        for row in rows:
+            released_at = datetime.fromisoformat(row['checked_at'])
+            intervals.append({
+                'version': row['version'],
+                'released_at': released_at,
+                'since_previous': released_at - previous if previous else None
+            })
+            previous = released_at
+        return intervals
+
+    async def query_versions_between(self, start: datetime, end: datetime, target: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self._run(self.versions_between, start, end, target)
+
+    async def query_release_intervals(self, target: str) -> List[Dict[str, Any]]:
+        return await self._run(self.release_intervals, target)
+
+    # Migration
+
+    def import_legacy_file(self, version_file: str, primary_keys: Dict[str, str]) -> bool:
+        """
+        Import a version_data.json written by older versions, then rename it out of the way.
+
+        Args:
+            version_file: Path of the legacy JSON file
+            primary_keys: Map of legacy store name ('play_store'/'app_store') to target key
+        """
+        if not os.path.exists(version_file):
+            return False
+
+        try:
+            with open(version_file, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading legacy version data: {str(e)}")
+            return False
+
+        states = data.get('targets', {})
+        for store, version in data.get('versions', {}).items():
+            key = primary_keys.get(store)
+            if key and version and not states.get(key, {}).get('version'):
+                states.setdefault(key, {})['version'] = version
+
+        rows = []
+        for key, state in states.items():
+            store, app, country = key.split(':', 2)
+            for timestamp in state.pop('release_history', []):
+                rows.append({
+                    'checked_at': timestamp, 'target': key, 'store': store, 'app': app, 'country': country,
+                    'version': None, 'latency_ms': None, 'outcome': OUTCOME_UPDATE
+                })
+
+        self.write_checks(rows, states, data.get('last_check'))
+        os.replace(version_file, version_file + ".migrated")
+        logger.info(f"Imported legacy version data for {len(states)} targets from {version_file}")
+        return True
@@ -0,0 +1,105 @@
+"""
+Random JSON documents and config versions for the round-trip tests
+"""
+import copy
+import random
+from typing import Any, Dict
+
+# Keys that need escaping in JSON Pointers, or look like numbers
+KEYS = ["a", "b", "title", "price", "x/y", "m~n", "~1", "0", "12", "", "Été", "桜"]
+TITLE_WORDS = ["golden", "dragon", "neon", "frost", "pixel", "royal", "ninja", "star"]
+RARITIES = ["common", "rare", "epic", "legendary"]
+
+
+def random_scalar(rng: random.Random) -> Any:
+    return rng.choice([
+        None, True, False, rng.randint(-5, 5), rng.randint(0, 10 ** 6), rng.random(),
+        rng.choice(KEYS), "text with \"quotes\" and \\ and \n"
+    ])
+
+
+def random_value(rng: random.Random, depth: int = 0) -> Any:
+    kind = rng.random()
+    if depth >= 3 or kind < 0.4:
+        return random_scalar(rng)
+    if kind < 0.7:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {rng.choice(KEYS): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def mutate_value(rng: random.Random, value: Any, depth: int = 0) -> Any:
+    """A changed copy of a JSON value: some leaves changed, entries added and removed"""
+    if isinstance(value, dict) and depth < 3:
+        changed = {}
+        for key, child in value.items():
+            roll = rng.random()
+            if roll < 0.15:
+                continue
+            changed[key] = mutate_value(rng, child, depth + 1) if roll < 0.6 else child
+        if rng.random() < 0.3:
+            changed[rng.choice(KEYS)] = random_value(rng, depth + 1)
+        return changed
+    if isinstance(value, list) and depth < 3:
+        changed = [mutate_value(rng, child, depth + 1) if rng.random() < 0.4 else child
+                   for child in value if rng.random() > 0.15]
+        if rng.random() < 0.3:
+            changed.insert(rng.randint(0, len(changed)), random_value(rng, depth + 1))
+        return changed
+    return random_value(rng, depth) if rng.random() < 0.5 else value
+
+
+def random_item(rng: random.Random) -> Dict[str, Any]:
+    item = {
+        "title": " ".join(rng.sample(TITLE_WORDS, rng.randint(1, 3))),
+        "rarity": rng.choice(RARITIES),
+        "price": rng.randrange(50, 1000, 50),
+        "hidden": rng.random() < 0.3
+    }
+    if rng.random() < 0.3:
+        item["extra"] = random_value(rng, 1)
+    return item
+
+
+def random_section(rng: random.Random) -> Any:
+    """Mostly item maps, sometimes a mixed object, a list or a plain value"""
+    roll = rng.random()
+    if roll < 0.6:
+        return {str(rng.randint(1, 40)): random_item(rng) for _ in range(rng.randint(0, 8))}
+    if roll < 0.75:
+        return {str(index): random_item(rng) if rng.random() < 0.6 else random_scalar(rng) for index in range(rng.randint(1, 5))}
+    if roll < 0.9:
+        return [random_value(rng, 1) for _ in range(rng.randint(0, 3))]
+    return random_scalar(rng)
+
+
+def random_config(rng: random.Random) -> Dict[str, Any]:
+    names = ["skins", "hats", "pets", "settings", "version", "events", "x/y"]
+    return {name: random_section(rng) for name in names if rng.random() < 0.7}
+
+
+def next_version(rng: random.Random, config: Dict[str, Any]) -> Dict[str, Any]:
+    """The config's next release: items changed, added and removed, sections appearing, vanishing or changing shape"""
+    new = copy.deepcopy(config)
+    for name in list(new):
+        roll = rng.random()
+        if roll < 0.05:
+            del new[name]
+        elif roll < 0.1:
+            new[name] = random_section(rng)
+        elif isinstance(new[name], dict) and all(isinstance(item, dict) for item in new[name].values()):
+            section = new[name]
+            for item_id in list(section):
+                item_roll = rng.random()
+                if item_roll < 0.1:
+                    del section[item_id]
+                elif item_roll < 0.3:
+                    section[item_id]["price"] = rng.randrange(50, 1000, 50)
+                elif item_roll < 0.4:
+                    section[item_id] = mutate_value(rng, section[item_id])
+            for _ in range(rng.randint(0, 3)):
+                section[str(rng.randint(41, 80))] = random_item(rng)
+        elif rng.random() < 0.5:
+            new[name] = mutate_value(rng, new[name])
+    if rng.random() < 0.2:
+        new["added_section"] = random_section(rng)
+    return new
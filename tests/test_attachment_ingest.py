@@ -0,0 +1,55 @@
+import io
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from attachment_ingest import AttachmentIngest, ChunkFeed, UploadRejected, validate_config_stream
+from config_stream import ConfigShapeError
+
+MB = 1024 * 1024
+
+
+def test_objects_are_counted():
+    config = {"skins": {"1": {}, "2": {}}, "version": "1.0", "pets": {}}
+    assert validate_config_stream(io.BytesIO(json.dumps(config).encode('utf-8'))) == {'sections': 3, 'items': 2}
+
+
+def test_arrays_are_accepted():
+    assert validate_config_stream(io.BytesIO(b'[{"tier": 1}]')) == {'sections': 0, 'items': 0}
+
+
+@pytest.mark.parametrize("text", [b'42', b'"config"', b'null'])
+def test_scalars_are_refused(text):
+    with pytest.raises(ConfigShapeError):
+        validate_config_stream(io.BytesIO(text))
+
+
+@pytest.mark.parametrize("text", [b'{"skins": {"1": }}', b'[1, 2', b'\xff{}'])
+def test_malformed_json_is_refused(text):
+    with pytest.raises((json.JSONDecodeError, UnicodeDecodeError)):
+        validate_config_stream(io.BytesIO(text))
+
+
+def test_chunk_feed_is_read_while_it_arrives():
+    feed = ChunkFeed()
+    results = []
+    reader = threading.Thread(target=lambda: results.append(validate_config_stream(feed)))
+    reader.start()
+    for chunk in (b'{"skins": {"1"', b': {}, "2": {}', b'}}'):
+        feed.feed(chunk)
+    feed.finish()
+    reader.join(5)
+    assert results == [{'sections': 1, 'items': 2}]
+
+
+def test_sizes_are_checked_before_downloading():
+    ingest = AttachmentIngest(max_file_bytes=10 * MB, max_total_bytes=15 * MB)
+    ingest.check_sizes([SimpleNamespace(filename="a.json", size=9 * MB)])
+    with pytest.raises(UploadRejected):
+        ingest.check_sizes([SimpleNamespace(filename="a.json", size=11 * MB)])
+    with pytest.raises(UploadRejected):
+        ingest.check_sizes([SimpleNamespace(filename=name, size=8 * MB) for name in ("a.json", "b.json")])
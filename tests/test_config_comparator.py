@@ -0,0 +1,56 @@
+import copy
+import json
+import random
+
+import pytest
+
+from config_comparator import ConfigComparator
+from config_patch import apply_patch
+from random_configs import next_version, random_config
+
+
+def encode(document) -> bytes:
+    return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.fixture
+def comparator():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    yield comparator
+    comparator.close()
+
+
+def test_sections_are_discovered_known_ones_first(comparator):
+    config = {"pets": {"1": {}}, "skins": {"1": {}}, "emotes": {}, "version": "1.0", "tiers": [1, 2], "animals": {"1": {}}}
+    assert comparator.discover_sections(config) == ["animals", "skins", "emotes", "pets"]
+    known_only = ConfigComparator(discover_sections=False)
+    assert known_only.discover_sections(config) == ["animals", "skins"]
+
+
+def test_non_item_sections_get_a_patch(comparator):
+    old = {"skins": {"1": {"title": "Neon"}}, "settings": {"maxLevel": 50}}
+    new = {"skins": {"1": {"title": "Neon"}}, "settings": {"maxLevel": 60}, "pets": {"7": {"title": "Cat"}}}
+    changes = comparator.compare_configs(old, new)
+    assert changes["other"] == {"settings": [{"op": "replace", "path": "/settings/maxLevel", "value": 60}]}
+    assert changes["added"] == {"pets": {"7": {"title": "Cat"}}}
+    assert changes["new_sections"] == ["pets"]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_parallel_diff_matches_serial_diff(seed):
+    rng = random.Random(seed)
+    old = random_config(rng)
+    new = next_version(rng, old)
+    serial = ConfigComparator(parallel_threshold=10 ** 9)
+    parallel = ConfigComparator(parallel_threshold=0, max_workers=2)
+    try:
+        assert parallel.compare_configs(old, new) == serial.compare_configs(old, new)
+    finally:
+        parallel.close()
+
+
+def test_non_object_documents_are_diffed_whole(comparator):
+    old, new = [{"tier": 1, "reward": "hat"}], [{"tier": 1, "reward": "skin"}, {"tier": 2}]
+    changes = comparator.compare_config_streams(encode(old), encode(new))
+    assert list(changes["other"]) == [""]
+    assert apply_patch(copy.deepcopy(old), comparator.export_patch(changes)) == new
@@ -0,0 +1,50 @@
+import copy
+import random
+
+import pytest
+
+from config_comparator import ConfigComparator
+from config_patch import apply_patch, describe_operation, diff, escape_pointer_token, parse_pointer
+from random_configs import mutate_value, next_version, random_config, random_value
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_apply_patch_of_diff_gives_new_document(seed):
+    rng = random.Random(seed)
+    old = random_value(rng)
+    new = mutate_value(rng, old) if rng.random() < 0.7 else random_value(rng)
+    assert apply_patch(copy.deepcopy(old), diff(old, new)) == new
+
+
+def test_diff_of_equal_documents_is_empty():
+    document = {"skins": {"1": {"title": "Neon", "tags": ["a", "b"]}}, "version": "1.0"}
+    assert diff(document, copy.deepcopy(document)) == []
+
+
+def test_diff_paths_are_prefixed():
+    ops = diff({"price": 100}, {"price": 150}, "/skins/2050")
+    assert ops == [{"op": "replace", "path": "/skins/2050/price", "value": 150}]
+
+
+@pytest.mark.parametrize("token", ["plain", "x/y", "m~n", "~1", "", "0"])
+def test_pointer_tokens_round_trip(token):
+    assert parse_pointer("/" + escape_pointer_token(token)) == [token]
+
+
+def test_whole_document_replace():
+    assert apply_patch([1, 2], diff([1, 2], {"a": 1})) == {"a": 1}
+
+
+def test_describe_operation_shows_old_value():
+    assert describe_operation({"op": "replace", "path": "/price", "value": 150}, {"price": 100}) == "price: 100 → 150"
+    assert describe_operation({"op": "remove", "path": "/tags"}) == "tags: removed"
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_export_patch_turns_old_config_into_new(seed):
+    rng = random.Random(seed)
+    old = random_config(rng)
+    new = next_version(rng, old)
+    comparator = ConfigComparator()
+    changes = comparator.compare_configs(old, new)
+    assert apply_patch(copy.deepcopy(old), comparator.export_patch(changes)) == new
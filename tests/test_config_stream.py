@@ -0,0 +1,118 @@
+import io
+import json
+import random
+
+import pytest
+
+from config_comparator import ConfigComparator
+from config_stream import ConfigEventReader, ConfigShapeError, iter_events, load_source, END_SECTION, ITEM, START_SECTION, VALUE
+from random_configs import next_version, random_config
+
+
+def encode(document) -> bytes:
+    return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.fixture
+def comparator():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    yield comparator
+    comparator.close()
+
+
+def random_pair(seed):
+    rng = random.Random(seed)
+    old = random_config(rng)
+    return old, next_version(rng, old)
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_stream_compare_matches_in_memory_compare(comparator, seed):
+    old, new = random_pair(seed)
+    assert comparator.compare_config_streams(encode(old), encode(new)) == comparator.compare_configs(old, new)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_streamed_modified_config_matches_json_dumps(comparator, seed):
+    old, new = random_pair(seed)
+    changes = comparator.compare_configs(old, new)
+    expected = json.dumps(comparator.create_modified_config(new, changes), indent=2, ensure_ascii=False)
+    assert "".join(comparator.iter_modified_config(encode(new), changes)) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64, 65536])
+def test_event_reader_reassembles_document(chunk_size):
+    document = random_config(random.Random(7))
+    document["long number"] = 12345678901234567890
+    rebuilt = {}
+    for kind, section, item_id, value in ConfigEventReader(io.BytesIO(encode(document)), chunk_size).events():
+        if kind == START_SECTION:
+            rebuilt[section] = {}
+        elif kind == ITEM:
+            rebuilt[section][item_id] = value
+        elif kind == VALUE:
+            rebuilt[section] = value
+        else:
+            assert kind == END_SECTION
+    assert rebuilt == document
+
+
+@pytest.mark.parametrize("text", [b'{"a": {"1": {}', b'{"a": 1,}', b'{"a": 1} x'])
+def test_event_reader_rejects_malformed_json(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_events(text))
+
+
+def test_event_reader_refuses_arrays_but_reads_them_whole():
+    reader = ConfigEventReader(io.BytesIO(b' [1, {"a": 2}] '), 2)
+    with pytest.raises(ConfigShapeError):
+        list(reader.events())
+    assert reader.document() == [1, {"a": 2}]
+    assert load_source(b'\xef\xbb\xbf[1]') == [1]
+
+
+def test_document_rejects_extra_data():
+    reader = ConfigEventReader(io.BytesIO(b'[1] [2]'), 2)
+    with pytest.raises(ConfigShapeError):
+        list(reader.events())
+    with pytest.raises(json.JSONDecodeError):
+        reader.document()
+
+
+class CountingDecoder(json.JSONDecoder):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def raw_decode(self, s, idx=0):
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+
+def test_large_value_is_not_decoded_once_per_chunk():
+    tiers = [{"tier": tier, "xp": tier * 150, "reward": {"type": "coins", "amount": tier}} for tier in range(40000)]
+    text = encode({"version": "1.0", "tiers": tiers})
+    assert len(text) > 4 * 1024 * 1024
+    reader = ConfigEventReader(io.BytesIO(text), 64 * 1024)
+    reader.json_decoder = CountingDecoder()
+    assert [value for kind, section, _, value in reader.events() if section == "tiers"] == [tiers]
+    # 64 chunks: reads double while the value is incomplete, so ~log2(64) attempts
+    assert reader.json_decoder.calls <= 12
+
+
+def test_error_inside_a_large_value_is_raised_without_reading_the_rest():
+    text = b'{"tiers": [1, x, ' + b'2, ' * 1024 * 1024 + b'3]}'
+    stream = io.BytesIO(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(ConfigEventReader(stream, 64 * 1024).events())
+    assert stream.tell() <= 64 * 1024
+
+
+@pytest.mark.parametrize("value", ['true', 'false', 'null', '-12.5e+3', '"a\\u00e9\\ud83d\\ude00b"', '[1e5, "x"]'])
+def test_values_cut_at_every_chunk_boundary(value):
+    text = f'{{"a": {value}, "b": {{"1": {value}}}}}'.encode('utf-8')
+    expected = json.loads(text)
+    for chunk_size in range(1, len(text) + 1):
+        events = list(ConfigEventReader(io.BytesIO(text), chunk_size).events())
+        assert events[0] == (VALUE, "a", None, expected["a"])
+        assert events[2] == (ITEM, "b", "1", expected["b"]["1"])
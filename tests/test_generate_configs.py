@@ -0,0 +1,30 @@
+import json
+
+from config_comparator import ConfigComparator
+from generate_configs import generate_battle_pass, generate_store_config, mutate_config
+
+
+def encode(document) -> bytes:
+    return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def test_generated_configs_are_reproducible():
+    assert generate_store_config(500, seed=3) == generate_store_config(500, seed=3)
+    assert mutate_config(generate_store_config(500), seed=4) == mutate_config(generate_store_config(500), seed=4)
+    assert generate_battle_pass(10, seed=1) != generate_battle_pass(10, seed=2)
+
+
+def test_generated_release_has_every_kind_of_change():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    old = generate_store_config(2000, seed=3)
+    new = mutate_config(old, change_rate=0.05, seed=4)
+    assert sum(len(section) for section in old.values() if isinstance(section, dict)) >= 2000
+    changes = comparator.compare_config_streams(encode(old), encode(new))
+    assert changes == comparator.compare_configs(old, new)
+    assert changes["added"] and changes["removed"] and changes["modified"]
+    assert list(changes["other"]) == ["version"]
+    added = sum(len(items) for items in changes["added"].values())
+    assert added == int(2000 * 0.05 / 4)
+    modified_config = comparator.create_modified_config(new, changes)
+    flagged = sum(1 for section in changes["item_sections"] for item in modified_config[section].values() if item.get("preOwned"))
+    assert flagged == added
@@ -0,0 +1,72 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+from config_comparator import ConfigComparator
+from random_configs import next_version, random_config
+
+
+def encode(document) -> bytes:
+    return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.fixture
+def comparator():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    yield comparator
+    comparator.close()
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_change_events_add_up_to_the_final_change_set(comparator, seed):
+    rng = random.Random(seed)
+    old = random_config(rng)
+    new = next_version(rng, old)
+    events = list(comparator.iter_changes(encode(old), encode(new), progress_every=3))
+    done = events[-1]
+    assert done["event"] == "done" and all(event["event"] != "done" for event in events[:-1])
+    assert done["changes"] == comparator.compare_configs(old, new)
+
+    changes = done["changes"]
+    for kind in ("added", "removed", "modified"):
+        found = {(event["section"], event["id"]) for event in events if event["event"] == "change" and event["type"] == kind
+                 and event["section"] in changes["item_sections"]}
+        assert found == {(section, item_id) for section, items in changes[kind].items() for item_id in items}
+    last_counts = [event["counts"] for event in events if event["event"] != "done"]
+    for before, after in zip(last_counts, last_counts[1:]):
+        assert all(after[kind] >= before[kind] for kind in before)
+
+
+def test_progress_is_reported_in_passes(comparator):
+    old = {"skins": {str(index): {"title": f"Skin {index}"} for index in range(20)}}
+    new = {"skins": {str(index): {"title": f"Skin {index}"} for index in range(5, 25)}}
+    events = list(comparator.iter_changes(encode(old), encode(new), progress_every=5))
+    passes = [event["pass"] for event in events if event["event"] == "progress"]
+    assert passes == sorted(passes) and set(passes) <= {1, 2, 3} and passes
+    assert events[-1]["counts"] == {"added": 5, "removed": 5, "modified": 0, "other": 0}
+
+
+def test_async_iteration_matches(comparator):
+    old = {"skins": {"1": {"title": "Neon"}, "2": {"title": "Frost"}}}
+    new = {"skins": {"1": {"title": "Neon Star"}, "3": {"title": "Pixel"}}}
+
+    async def collect():
+        return [event async for event in comparator.aiter_changes(encode(old), encode(new))]
+
+    events = asyncio.run(collect())
+    assert [event["event"] for event in events] == ["change", "change", "change", "done"]
+    assert events[-1]["changes"] == comparator.compare_configs(old, new)
+
+
+def test_stopping_early_is_allowed(comparator):
+    old = {"skins": {str(index): {"title": "a"} for index in range(100)}}
+    new = {"skins": {str(index): {"title": "b"} for index in range(100)}}
+
+    async def first_change():
+        async for event in comparator.aiter_changes(encode(old), encode(new)):
+            if event["event"] == "change":
+                return event
+
+    assert asyncio.run(first_change())["type"] == "modified"
@@ -0,0 +1,86 @@
+import json
+import random
+
+import pytest
+
+from config_comparator import ConfigComparator
+from item_index import ItemIndex
+from snapshot_store import SnapshotStore
+from random_configs import TITLE_WORDS, next_version, random_config
+
+QUERIES = TITLE_WORDS + ["rarity:epic", "hidden:true", "section:skins", "id:7", "gol", "golden d"]
+
+CONFIG = {
+    "skins": {
+        "1": {"title": "Golden Dragon", "rarity": "Epic", "hidden": True},
+        "2": {"title": "Golden Goose", "rarity": "rare"},
+        "3": {"title": "Neon Dragon", "rarity": "epic", "hidden": False}
+    },
+    "hats": {
+        "1": {"title": "Dragon Hat", "rarity": "epic"}
+    },
+    "settings": {"maxLevel": 50}
+}
+
+
+def ids(results):
+    return [(section, item_id) for section, item_id, _ in results]
+
+
+@pytest.fixture
+def index():
+    return ItemIndex.from_config(CONFIG, ["skins", "hats"])
+
+
+def test_words_are_combined(index):
+    total, results = index.search("golden dragon")
+    assert total == 1 and ids(results) == [("skins", "1")]
+
+
+def test_last_word_is_a_prefix(index):
+    assert ids(index.search("dra")[1]) == [("skins", "1"), ("skins", "3"), ("hats", "1")]
+    assert index.search("golden dra")[0] == 1
+
+
+def test_facets_are_case_insensitive(index):
+    assert ids(index.search("rarity:EPIC hidden:true")[1]) == [("skins", "1")]
+    assert ids(index.search("dragon section:hats")[1]) == [("hats", "1")]
+    assert ids(index.search("id:1")[1]) == [("skins", "1"), ("hats", "1")]
+
+
+def test_limit_keeps_total(index):
+    total, results = index.search("dragon", limit=2)
+    assert total == 3 and len(results) == 2
+
+
+def test_changed_items_keep_their_place(index):
+    index.add("skins", "1", {"title": "Frost Dragon", "rarity": "epic"})
+    assert index.search("golden")[0] == 1
+    assert ids(index.search("dragon")[1])[0] == ("skins", "1")
+    index.remove("skins", "1")
+    assert index.search("frost") == (0, [])
+    assert len(index) == 3
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_incremental_sync_matches_full_rebuild(tmp_path, seed):
+    rng = random.Random(seed)
+    comparator = ConfigComparator(owned_flag="preOwned")
+    store = SnapshotStore(str(tmp_path / "snapshots"))
+    index = ItemIndex()
+    config = random_config(rng)
+    try:
+        for _ in range(5):
+            store.ingest(json.dumps(config).encode('utf-8'))
+            index.sync(store, comparator)
+            rebuilt = ItemIndex.from_config(config, comparator.discover_sections(config))
+            assert len(index) == len(rebuilt)
+            for query in QUERIES:
+                total, results = index.search(query, 1000)
+                expected_total, expected = rebuilt.search(query, 1000)
+                assert total == expected_total, query
+                assert sorted(ids(results)) == sorted(ids(expected)), query
+            config = next_version(rng, config)
+    finally:
+        store.close()
+        comparator.close()
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import pickle
+import time
+
+import pytest
+
+from config_comparator import ConfigComparator
+from item_index import ItemIndex
+from job_pool import (
+    JobDecodeError, JobPool, JobTimeout, comparator_options, compare_job, index_sync_job, ingest_job, modify_ids_job,
+    snapshot_diff_job
+)
+from snapshot_store import SnapshotStore
+
+CONFIG = {
+    "skins": {"1": {"title": "Golden Dragon"}, "2": {"title": "Neon"}},
+    "pets": {"9": {"title": "Cat"}},
+    "version": "1.0"
+}
+
+
+@pytest.fixture
+def comparator():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    yield comparator
+    comparator.close()
+
+
+def test_modify_job_matches_the_comparator(comparator):
+    ids = ["2", "9", "404"]
+    files, flagged, not_found = modify_ids_job(json.dumps(CONFIG).encode('utf-8'), ids, comparator_options(comparator))
+    modified_config, modified_items, expected_not_found = comparator.modify_config_by_ids(CONFIG, ids)
+    assert [f"{item_id}: {title} ({section})" for item_id, title, section in flagged] == modified_items
+    assert not_found == expected_not_found == ["404"]
+    assert [name for name, _ in files] == ["modified_config.json"]
+    assert json.loads(files[0][1]) == modified_config
+
+
+def test_modify_job_without_matches_has_no_file(comparator):
+    assert modify_ids_job(b'[1, 2]', ["1"], comparator_options(comparator)) == ([], [], ["1"])
+
+
+def sleep_job(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_jobs_run_in_workers(comparator):
+    async def scenario():
+        pool = JobPool(max_workers=2, timeout=30)
+        try:
+            changes = json.loads(await pool.run(compare_job, b'{"skins": {}}', b'{"skins": {"1": {}}}', comparator_options(comparator)))
+            assert changes["added"] == {"skins": {"1": {}}}
+            with pytest.raises(JobDecodeError) as error:
+                await pool.run(compare_job, b'{"skins": ' + b' ' * 1024 * 1024 + b'x}', b'{}', comparator_options(comparator))
+            # Only the message and position come back from the worker, not the input
+            assert len(pickle.dumps(error.value)) < 1024
+            with pytest.raises(JobTimeout):
+                await pool.run(sleep_job, 10, timeout=0.5)
+            assert await pool.run(sleep_job, 0) == 0
+        finally:
+            pool.close()
+    asyncio.run(scenario())
+
+
+def test_snapshot_jobs_match_the_store(tmp_path, comparator):
+    root = str(tmp_path / "snapshots")
+    versions = [
+        {"skins": {"1": {"title": "Golden Dragon"}}},
+        {"skins": {"1": {"title": "Golden Dragon"}, "2": {"title": "Neon"}}},
+        {"skins": {"2": {"title": "Neon Star"}}, "version": "2"}
+    ]
+    digests = ingest_job(root, [json.dumps(version).encode('utf-8') for version in versions], ["storeConfig"] * 3)
+    store = SnapshotStore(root)
+    try:
+        assert [store.load(digest) for digest in digests] == versions
+        changes_json, patch_json = snapshot_diff_job(root, digests[:2], comparator_options(comparator))
+        assert json.loads(changes_json) == store.diff(digests[0], digests[1], comparator)
+        timeline_json, patch_json = snapshot_diff_job(root, [digest[:8] for digest in digests], comparator_options(comparator))
+        timeline = json.loads(timeline_json)
+        assert len(timeline["steps"]) == 2
+        assert timeline["cumulative"] == store.diff(digests[0], digests[2], comparator)
+        assert json.loads(patch_json) == comparator.export_patch(store.diff(digests[0], digests[2], comparator))
+        with pytest.raises(KeyError):
+            snapshot_diff_job(root, ["nope", digests[0]], comparator_options(comparator))
+    finally:
+        store.close()
+
+
+def test_index_sync_job_follows_the_newest_version(tmp_path, comparator):
+    root = str(tmp_path / "snapshots")
+    options = comparator_options(comparator)
+    index = ItemIndex()
+
+    def sync():
+        update = index_sync_job(root, options, index.digest, list(index.sections), index.facet_fields)
+        if update is None:
+            return None
+        digest, kind, payload = update
+        if kind == 'index':
+            index.replace(pickle.loads(payload))
+        else:
+            index.apply_changes(json.loads(payload))
+        index.digest = digest
+        return kind
+
+    ingest_job(root, [json.dumps({"skins": {"1": {"title": "Golden Dragon"}}}).encode('utf-8')], ["storeConfig"])
+    assert sync() == 'index' and sync() is None
+    assert index.search("golden")[0] == 1
+    ingest_job(root, [json.dumps({"skins": {"1": {"title": "Frost Dragon"}, "2": {"title": "Golden Goose"}}}).encode('utf-8')], ["storeConfig"])
+    assert sync() == 'changes'
+    assert [item_id for _, item_id, _ in index.search("golden")[1]] == ["2"]
+    assert index.search("frost")[0] == 1
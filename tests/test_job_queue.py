@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from job_queue import JobQueue, QueueFull
+
+MB = 1024 * 1024
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def settle():
+    """Let every task that can make progress do so"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def start_job(queue, started, name, user, channel, size=0):
+    ticket = await queue.acquire(user, channel, size)
+    started.append(name)
+    return ticket
+
+
+def test_running_jobs_are_bounded():
+    async def scenario():
+        queue = JobQueue(max_running=2, per_user=5, per_channel=5)
+        started = []
+        tasks = [asyncio.create_task(start_job(queue, started, index, f"user{index}", "channel")) for index in range(5)]
+        await settle()
+        assert started == [0, 1] and queue.running == 2
+        queue.release(await tasks[0])
+        await settle()
+        assert started == [0, 1, 2]
+        for task in tasks[1:3]:
+            queue.release(await task)
+        await settle()
+        assert started == [0, 1, 2, 3, 4]
+        for task in tasks[3:]:
+            queue.release(await task)
+        assert queue.running == 0 and not queue.running_by_user and not queue.running_by_channel
+    run(scenario())
+
+
+def test_one_user_does_not_block_others():
+    async def scenario():
+        queue = JobQueue(max_running=2, per_user=1, per_channel=5)
+        started = []
+        first = asyncio.create_task(start_job(queue, started, "a1", "a", "channel"))
+        second = asyncio.create_task(start_job(queue, started, "a2", "a", "channel"))
+        other = asyncio.create_task(start_job(queue, started, "b1", "b", "channel"))
+        await settle()
+        # a2 waits for a1, so b1 takes the free slot although it came later
+        assert started == ["a1", "b1"]
+        assert queue.position(queue.waiting[0]) == 1
+        queue.release(await first)
+        await settle()
+        assert started == ["a1", "b1", "a2"]
+        queue.release(await second)
+        queue.release(await other)
+    run(scenario())
+
+
+def test_channel_limit():
+    async def scenario():
+        queue = JobQueue(max_running=3, per_user=3, per_channel=1)
+        started = []
+        tasks = [
+            asyncio.create_task(start_job(queue, started, "x1", "a", "x")),
+            asyncio.create_task(start_job(queue, started, "x2", "b", "x")),
+            asyncio.create_task(start_job(queue, started, "y1", "c", "y"))
+        ]
+        await settle()
+        assert started == ["x1", "y1"]
+        queue.release(await tasks[0])
+        await settle()
+        assert started == ["x1", "y1", "x2"]
+        for task in tasks[1:]:
+            queue.release(await task)
+    run(scenario())
+
+
+def test_too_many_waiting_jobs_are_refused():
+    async def scenario():
+        queue = JobQueue(max_running=1, per_user=1, max_waiting_per_user=2)
+        running = await queue.acquire("a", "channel")
+        waiting = [asyncio.create_task(queue.acquire("a", "channel")) for _ in range(2)]
+        await settle()
+        with pytest.raises(QueueFull):
+            await queue.acquire("a", "channel")
+        queue.release(running)
+        for task in waiting:
+            queue.release(await task)
+    run(scenario())
+
+
+def test_small_jobs_go_first_until_a_large_one_waited_long_enough():
+    async def scenario(max_priority_wait):
+        queue = JobQueue(max_running=1, per_user=5, per_channel=5, small_job_bytes=8 * MB,
+                         max_priority_wait=max_priority_wait)
+        started = []
+        running = await queue.acquire("a", "channel")
+        large = asyncio.create_task(start_job(queue, started, "large", "b", "channel", 100 * MB))
+        await settle()
+        small = asyncio.create_task(start_job(queue, started, "small", "c", "channel", 1 * MB))
+        await settle()
+        queue.release(running)
+        await settle()
+        first = started[0]
+        queue.release(await (large if first == "large" else small))
+        queue.release(await (small if first == "large" else large))
+        return started
+
+    assert run(scenario(60)) == ["small", "large"]
+    assert run(scenario(0)) == ["large", "small"]
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        queue = JobQueue(max_running=1)
+        running = await queue.acquire("a", "channel")
+        waiter = asyncio.create_task(queue.acquire("b", "channel"))
+        await settle()
+        assert len(queue.waiting) == 1
+        waiter.cancel()
+        await settle()
+        assert not queue.waiting
+        queue.release(running)
+        assert queue.running == 0
+    run(scenario())
+
+
+def test_slot_releases_on_error():
+    async def scenario():
+        queue = JobQueue(max_running=1)
+        with pytest.raises(RuntimeError):
+            async with queue.slot("a", "channel"):
+                raise RuntimeError("job failed")
+        assert queue.running == 0
+        # Releasing twice is harmless
+        ticket = await queue.acquire("a", "channel")
+        queue.release(ticket)
+        queue.release(ticket)
+        assert queue.running == 0
+    run(scenario())
+
+
+def test_position_updates_are_reported():
+    async def scenario():
+        queue = JobQueue(max_running=1, per_user=5, per_channel=5)
+        positions = []
+
+        async def on_position(position, running):
+            positions.append((position, running))
+
+        running = await queue.acquire("a", "channel")
+        waiting = asyncio.create_task(queue.acquire("b", "channel", on_position=on_position))
+        await settle()
+        queue.release(running)
+        queue.release(await waiting)
+        return positions
+
+    assert run(scenario()) == [(1, 1)]
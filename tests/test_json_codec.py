@@ -0,0 +1,40 @@
+import json
+
+import pytest
+
+import json_codec
+from config_comparator import ConfigComparator
+from job_pool import comparator_options, modify_ids_job
+
+# Values whose spelling differs between orjson and the standard library
+DOCUMENT = {
+    "skins": {"1": {"title": "Été 桜", "price": 1e16, "weight": 2.5e-07, "ratio": 0.1, "big": 12345678901234567890}},
+    "version": "1.0"
+}
+
+
+def baseline(value, indent=2) -> bytes:
+    return json.dumps(value, indent=indent, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_loads_round_trips(indent):
+    assert json_codec.loads(json_codec.dumps(DOCUMENT, indent)) == DOCUMENT
+    assert json_codec.loads(b'\xef\xbb\xbf' + baseline(DOCUMENT)) == DOCUMENT
+
+
+def test_exact_output_matches_json_dumps():
+    assert json_codec.dumps(DOCUMENT, indent=2, exact=True) == baseline(DOCUMENT)
+    assert json_codec.dumps(DOCUMENT, exact=True) == json.dumps(DOCUMENT, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def test_modified_configs_match_the_baseline_output():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    files, _, _ = modify_ids_job(baseline(DOCUMENT), ["1"], comparator_options(comparator))
+    modified_config, _, _ = comparator.modify_config_by_ids(DOCUMENT, ["1"])
+    assert files == [("modified_config.json", baseline(modified_config))]
+
+    changes = comparator.compare_configs({"skins": {}}, DOCUMENT)
+    streamed = "".join(comparator.iter_modified_config(baseline(DOCUMENT), changes)).encode('utf-8')
+    assert streamed == baseline(comparator.create_modified_config(DOCUMENT, changes))
+    assert baseline(modified_config) == streamed
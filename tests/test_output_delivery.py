@@ -0,0 +1,54 @@
+import json
+import os
+
+from output_delivery import PART_SUFFIX, UPLOAD_OVERHEAD, group_uploads, package_file, split_note, unzip, zip_chunks
+
+KB = 1024
+
+
+def test_zip_chunks_round_trip():
+    chunks = ["{\n", '  "a": "Été"', b"\n}"] * 50000
+    assert unzip(zip_chunks("config.json", chunks)) == b"".join(
+        chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in chunks)
+
+
+def test_small_file_is_sent_as_is():
+    data = json.dumps({"a": 1}).encode('utf-8')
+    assert package_file("config.json", zip_chunks("config.json", [data])) == [("config.json", data)]
+
+
+def test_large_file_is_zipped():
+    data = json.dumps({"a": "x" * 2 * KB * KB}).encode('utf-8')
+    archive = zip_chunks("config.json", [data])
+    assert package_file("config.json", archive, raw_max=KB) == [("config.zip", archive)]
+
+
+def test_compact_json_is_used_when_the_zip_is_too_large():
+    document = {str(index): {"title": os.urandom(8).hex()} for index in range(2000)}
+    archive = zip_chunks("config.json", [json.dumps(document, indent=8)])
+    compact = json.dumps(document, separators=(',', ':')).encode('utf-8')
+    compact_size = len(zip_chunks("config.min.json", [compact]))
+    uploads = package_file("config.json", archive, limit=compact_size + UPLOAD_OVERHEAD, compact=lambda: compact, raw_max=0)
+    assert [name for name, _ in uploads] == ["config.min.zip"]
+    assert unzip(uploads[0][1]) == compact
+
+
+def test_split_parts_join_back_into_the_archive():
+    data = os.urandom(300 * KB)
+    archive = zip_chunks("config.json", [data])
+    uploads = package_file("config.json", archive, limit=100 * KB + UPLOAD_OVERHEAD, raw_max=0)
+    assert [name for name, _ in uploads] == [f"config.zip{PART_SUFFIX}{index:02d}" for index in range(1, 5)]
+    assert all(len(part) <= 100 * KB for _, part in uploads)
+    assert unzip(b"".join(part for _, part in uploads)) == data
+    note = split_note(uploads)
+    assert "`config.zip`" in note and f"config.zip{PART_SUFFIX}*" in note
+
+
+def test_uploads_are_grouped_by_count_and_size():
+    limit = 100 * KB + UPLOAD_OVERHEAD
+    files = [(f"file{index}", b"x" * 30 * KB) for index in range(8)] + [(f"tiny{index}", b"x") for index in range(12)]
+    groups = group_uploads(files, limit)
+    assert [upload for group in groups for upload in group] == files
+    assert all(len(group) <= 10 and sum(len(data) for _, data in group) <= 100 * KB for group in groups)
+    assert [len(group) for group in groups] == [3, 3, 10, 4]
+    assert split_note(files) is None
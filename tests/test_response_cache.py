@@ -0,0 +1,30 @@
+import os
+
+from response_cache import ResponseCache
+
+URL = "https://itunes.apple.com/lookup?id=1&country=us"
+
+
+def test_index_is_written_on_flush_only(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_seconds=60)
+    cache.store(URL, b'{"results": []}', "1.0", etag='"a"')
+    cache.touch(URL, etag='"b"')
+    assert not os.path.exists(cache.index_file) and cache.dirty
+    cache.flush()
+    assert not cache.dirty
+    reloaded = ResponseCache(str(tmp_path))
+    assert reloaded.get(URL)["etag"] == '"b"' and reloaded.get(URL)["parsed"] == "1.0"
+    assert reloaded.read_body(URL) == b'{"results": []}'
+    mtime = os.stat(cache.index_file).st_mtime_ns
+    cache.flush()
+    assert os.stat(cache.index_file).st_mtime_ns == mtime
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=10)
+    cache.store("a", b"123456", 1)
+    cache.store("b", b"123456", 2)
+    assert cache.get("a") is None and cache.get("b")["parsed"] == 2
+    assert cache.read_body("a") is None
+    cache.flush()
+    assert list(ResponseCache(str(tmp_path)).entries) == ["b"]
@@ -0,0 +1,101 @@
+import json
+import random
+
+import pytest
+
+from config_comparator import ConfigComparator
+from snapshot_store import SnapshotStore
+from random_configs import next_version, random_config
+
+
+def encode(document) -> bytes:
+    return json.dumps(document, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+@pytest.fixture
+def store(tmp_path):
+    # A short keyframe interval, so versions are stored as keyframes and as delta chains
+    store = SnapshotStore(str(tmp_path / "snapshots"), keyframe_interval=3, cache_size=2)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def comparator():
+    comparator = ConfigComparator(owned_flag="preOwned")
+    yield comparator
+    comparator.close()
+
+
+def ingest_series(store, seed, count=6):
+    rng = random.Random(seed)
+    versions = [random_config(rng)]
+    while len(versions) < count:
+        versions.append(next_version(rng, versions[-1]))
+    return versions, [store.ingest(encode(version)) for version in versions]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_versions_load_back_unchanged(store, seed):
+    versions, digests = ingest_series(store, seed)
+    for version, digest in zip(versions, digests):
+        assert store.load(digest) == version
+        assert "".join(store.iter_dump(digest)) == json.dumps(version, indent=2, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_stored_diff_matches_file_compare(store, comparator, seed):
+    versions, digests = ingest_series(store, seed)
+    for index in range(len(versions) - 1):
+        old, new = versions[index], versions[index + 1]
+        assert store._diff(digests[index], digests[index + 1], comparator) == comparator.compare_configs(old, new)
+    assert store._diff(digests[0], digests[-1], comparator) == comparator.compare_configs(versions[0], versions[-1])
+
+
+def test_ingest_is_idempotent(store):
+    document = {"skins": {"1": {"title": "Neon"}}}
+    assert store.ingest(encode(document)) == store.ingest(encode(document))
+    assert len(store.versions()) == 1
+
+
+def test_non_object_documents_are_stored_whole(store, comparator):
+    old = store.ingest(encode([{"tier": 1}]), name="BattlePass")
+    new = store.ingest(encode([{"tier": 1}, {"tier": 2}]), name="BattlePass")
+    assert store.load(new) == [{"tier": 1}, {"tier": 2}]
+    assert store._diff(old, new, comparator) == comparator.compare_configs([{"tier": 1}], [{"tier": 1}, {"tier": 2}])
+
+
+def test_removing_a_base_version_keeps_later_ones(store):
+    versions, digests = ingest_series(store, 99, count=5)
+    store.remove(digests[1])
+    assert [version["digest"] for version in store.versions()].count(digests[1]) == 0
+    for version, digest in zip(versions, digests):
+        if digest != digests[1]:
+            assert store.load(digest) == version
+
+
+class TestResolve:
+    def test_full_digest_prefix_and_label(self, store):
+        digest = store.ingest(encode({"skins": {}}), label="4.2.0")
+        assert store.resolve(digest) == digest
+        assert store.resolve(digest[:4]) == digest
+        assert store.resolve(digest[:8].upper()) == digest
+        assert store.resolve("4.2.0") == digest
+
+    @pytest.mark.parametrize("ref", ["", "_", "%", "%%%%", "____", "abc"])
+    def test_wildcards_and_short_prefixes_match_nothing(self, store, ref):
+        store.ingest(encode({"skins": {}}))
+        with pytest.raises(KeyError):
+            store.resolve(ref)
+
+    def test_remove_refuses_wildcards(self, store):
+        digest = store.ingest(encode({"skins": {}}))
+        with pytest.raises(KeyError):
+            store.remove("%")
+        assert store.resolve(digest) == digest
+
+    def test_hex_label_is_not_hidden_by_a_digest_prefix(self, store):
+        digest = store.ingest(encode({"skins": {}}))
+        labelled = store.ingest(encode({"skins": {"1": {}}}), label=digest[:6])
+        assert store.resolve(digest[:6]) == labelled
+        assert store.resolve(digest[:5]) == digest
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("google_play_scraper")
+
+from store_fetcher import PLAY_STORE
+from update_monitor import StoreMonitor
+from version_history import VersionHistory
+
+
+class FakeFetcher:
+    def __init__(self, version):
+        self.version = version
+        self.calls = 0
+
+    async def fetch_target_version(self, store, app, country):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return self.version
+
+    async def flush_cache(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def monitor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    history = VersionHistory(str(tmp_path / "history.db"))
+    yield StoreMonitor("com.example.game", fetcher=FakeFetcher("1.0"), history=history, stagger_seconds=0)
+    history.close()
+
+
+def test_concurrent_checks_share_one_lookup(monitor):
+    async def scenario():
+        return await asyncio.gather(*(monitor.check_store_updates() for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert monitor.fetcher.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_reused_result_does_not_report_the_update_again(monitor):
+    async def scenario():
+        await monitor.check_store_updates()
+        monitor.fetcher.version = "1.1"
+        fresh = await monitor.check_store_updates(max_age=0)
+        reused = await monitor.check_store_updates()
+        return fresh, reused
+
+    fresh, reused = asyncio.run(scenario())
+    assert fresh[PLAY_STORE]["has_update"] and fresh[PLAY_STORE]["new_version"] == "1.1"
+    assert monitor.fetcher.calls == 2
+    assert not reused[PLAY_STORE]["has_update"] and reused[PLAY_STORE]["new_version"] == "1.1"
+    assert not any(result["has_update"] for result in reused["targets"].values())
+    # The result handed to the caller that ran the check is left as it was
+    assert fresh[PLAY_STORE]["has_update"]